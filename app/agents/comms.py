@@ -1,4 +1,5 @@
 from typing import Dict, Optional
+from dataclasses import asdict, is_dataclass
 from app.utils.audit import append_audit
 from app.utils.gemini_email import generate_customer_email
 
@@ -128,8 +129,10 @@ def _create_customer_notification(refund: Dict, p004: Dict, p008: Dict, elig: Op
     customer_record = None
     if csv_validation and csv_validation.get("customer"):
         customer_record = csv_validation["customer"]
-        # Handle both dict and object types
-        if hasattr(customer_record, "__dict__"):
+        # Handle both dict and object types (repository entities are slotted dataclasses)
+        if is_dataclass(customer_record):
+            customer_record = asdict(customer_record)
+        elif hasattr(customer_record, "__dict__"):
             customer_record = customer_record.__dict__
         elif not isinstance(customer_record, dict):
             customer_record = None
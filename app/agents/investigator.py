@@ -1,4 +1,5 @@
 from typing import Dict
+from dataclasses import asdict
 from app.utils.xml_parsers import parse_pacs004, parse_pacs008
 from app.utils.sqlite_repositories import create_repositories
 from app.utils.audit import append_audit
@@ -11,8 +12,8 @@ AUTO_REFUND_FX_LOSS_AUD_LIMIT = 300.0
 
 
 def run_investigator(state: Dict) -> Dict:
-    p004_xml: str = state.get("pacs004_xml", "")
-    p008_xml: str = state.get("pacs008_xml", "")
+    p004_xml: str | bytes = state.get("pacs004_xml", "")
+    p008_xml: str | bytes = state.get("pacs008_xml", "")
     ui_fx_loss_aud: float = float(state.get("fx_loss_aud", 0.0) or 0.0)
     non_branch: bool = bool(state.get("non_branch", False))
     sanctions_ok: bool = bool(state.get("sanctions", True))
@@ -39,7 +40,7 @@ def run_investigator(state: Dict) -> Dict:
     customer = customer_repo.get_customer_by_iban(p008.get("dbtr_iban", ""))
     csv_check = {
         "ok": customer is not None and customer.account_status == "Active",
-        "customer": customer.__dict__ if customer else None,
+        "customer": asdict(customer) if customer else None,
         "iban": p008.get("dbtr_iban"),
         "holder_name": p008.get("dbtr_name"),
         "ccy": p008.get("ccy")
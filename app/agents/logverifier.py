@@ -41,8 +41,7 @@ def run_log_verifier(state: Dict) -> Dict:
         report_path = audit_repo.save_run_report(run_id, report_data)
 
         # Add audit events to audit log
-        for event in audit_events:
-            audit_repo.add_audit_event(event)
+        audit_repo.add_audit_events(audit_events)
 
         # Update state
         state["log_verifier"] = {
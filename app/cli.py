@@ -21,9 +21,9 @@ def run():
 @click.option("--sanctions/--no-sanctions", "sanctions", default=True, help="Sanctions screening passed/failed")
 @click.option("--html-report", type=click.Path(dir_okay=False), default=None, help="Write HTML report to this file")
 def run_flow(pacs004_path: str, pacs008_path: str, customers_csv: str, fx_loss_aud: float, non_branch: bool, sanctions: bool, html_report: str | None):
-    with open(pacs004_path, "r", encoding="utf-8") as f:
+    with open(pacs004_path, "rb") as f:
         pacs004_xml = f.read()
-    with open(pacs008_path, "r", encoding="utf-8") as f:
+    with open(pacs008_path, "rb") as f:
         pacs008_xml = f.read()
 
     graph = build_graph()
@@ -0,0 +1,68 @@
+"""bank_accounts.csv loading and lookup indices for the refund decision engine."""
+import csv
+import sys
+from typing import Dict, List, Optional, Tuple
+
+AccountRow = Dict[Optional[str], object]
+
+
+def _column(account: AccountRow, key: str) -> str:
+    value = account.get(key, '')
+    return value if isinstance(value, str) else ''
+
+
+def _parse_balance(account: AccountRow) -> Optional[float]:
+    """Parse 'Opening Balance' (e.g. 'USD 69,940.00') like CSVReconciliationEngine.parse_balance."""
+    balance = account.get('Opening Balance', '0')
+    if not isinstance(balance, str):
+        return None
+    try:
+        return float(balance.replace(',', '').replace('AUD ', '').replace(
+            'USD ', '').replace('EUR ', '').replace('SGD ', ''))
+    except ValueError:
+        return None
+
+
+def build_indices(file_path: str) -> Tuple[List[AccountRow], Dict[str, AccountRow], Dict[str, List[AccountRow]]]:
+    """
+    Load bank accounts and build the engine's lookup indices in one pass.
+
+    Each row gets interned, normalized '_type', '_ccy' and '_status' columns, and
+    '_balance' holding the parsed opening balance (None if it cannot be parsed).
+
+    Args:
+        file_path: Path to bank_accounts.csv
+
+    Returns:
+        Tuple of (rows, rows by account number, nostro rows by currency with active accounts first)
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            accounts: List[AccountRow] = list(csv.DictReader(f))
+    except FileNotFoundError:
+        accounts = []
+    except Exception as e:
+        raise Exception(f"Error loading {file_path}: {str(e)}")
+
+    # Index by account number (first row wins, as with a linear scan)
+    by_number: Dict[str, AccountRow] = {}
+    nostro_by_ccy: Dict[str, List[AccountRow]] = {}
+    for account in accounts:
+        account_type = sys.intern(_column(account, 'Account Type').strip().lower())
+        currency = sys.intern(_column(account, 'Currency').strip().upper())
+        account['_type'] = account_type
+        account['_ccy'] = currency
+        account['_status'] = sys.intern(_column(account, 'Account Status').strip().lower())
+        account['_balance'] = _parse_balance(account)
+
+        number = account.get('Account Number', '')
+        if isinstance(number, str) and number not in by_number:
+            by_number[number] = account
+        if account_type == 'nostro':
+            nostro_by_ccy.setdefault(currency, []).append(account)
+
+    # Active nostros first; the stable sort keeps file order otherwise
+    for candidates in nostro_by_ccy.values():
+        candidates.sort(key=lambda a: a['_status'] != 'active')
+
+    return accounts, by_number, nostro_by_ccy
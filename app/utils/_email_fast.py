@@ -0,0 +1,122 @@
+"""String helpers for rendering generated emails as HTML."""
+import html as html_escape
+import re
+from typing import Tuple
+
+# Markdown patterns, compiled once. The italic patterns use lookarounds, which are
+# slow in sre, so callers only run them when the marker character is present.
+_MD_BOLD_STAR_RE = re.compile(r'\*\*(.+?)\*\*')
+_MD_BOLD_UNDERSCORE_RE = re.compile(r'__(.+?)__')
+_MD_ITALIC_STAR_RE = re.compile(r'(?<!\*)\*(?!\*)([^*]+?)(?<!\*)\*(?!\*)')
+_MD_ITALIC_UNDERSCORE_RE = re.compile(r'(?<!_)_(?!_)([^_]+?)(?<!_)_(?!_)')
+_MD_CODE_RE = re.compile(r'`([^`]+?)`')
+_MD_HEADER_RE = re.compile(r'^#+\s+', re.MULTILINE)
+_MD_BULLET_RE = re.compile(r'^\s*[-*+]\s+', re.MULTILINE)
+_MD_NUMBERED_RE = re.compile(r'^\s*\d+\.\s+', re.MULTILINE)
+_MD_LINK_RE = re.compile(r'\[([^\]]+)\]\([^\)]+\)')
+_MD_RULE_RE = re.compile(r'^[-*_]{3,}$', re.MULTILINE)
+
+_HTML_BOLD_STAR_RE = re.compile(r'\*\*([^*]+?)\*\*')
+_HTML_BOLD_UNDERSCORE_RE = re.compile(r'__([^_]+?)__')
+_HTML_ITALIC_STAR_RE = re.compile(r'(?<!\*)\*([^*]+?)\*(?!\*)')
+_HTML_ITALIC_UNDERSCORE_RE = re.compile(r'(?<!_)_([^_]+?)_(?!_)')
+
+
+def _clean_markdown(text: str) -> str:
+    """Remove markdown formatting symbols from text and convert to plain text."""
+    if not text:
+        return text
+
+    has_star = '*' in text
+    has_underscore = '_' in text
+
+    # Remove markdown bold (**text** or __text__) - keep the text, we'll handle bold in HTML conversion
+    # For now, just remove the markers but preserve the text content
+    if has_star:
+        text = _MD_BOLD_STAR_RE.sub(r'\1', text)
+    if has_underscore:
+        text = _MD_BOLD_UNDERSCORE_RE.sub(r'\1', text)
+
+    # Remove markdown italic (*text* or _text_) - keep the text
+    if has_star:
+        text = _MD_ITALIC_STAR_RE.sub(r'\1', text)
+    if has_underscore:
+        text = _MD_ITALIC_UNDERSCORE_RE.sub(r'\1', text)
+
+    # Remove markdown code blocks (`text`)
+    if '`' in text:
+        text = _MD_CODE_RE.sub(r'\1', text)
+
+    # Remove markdown headers (# Header)
+    if '#' in text:
+        text = _MD_HEADER_RE.sub('', text)
+
+    # Handle markdown lists - convert to plain text with line breaks
+    # Bullet lists (* item, - item, + item) - remove markers but keep text
+    text = _MD_BULLET_RE.sub('', text)
+    # Numbered lists (1. item, 2. item) - remove markers but keep text
+    text = _MD_NUMBERED_RE.sub('', text)
+
+    # Remove markdown links [text](url) -> text
+    if '[' in text:
+        text = _MD_LINK_RE.sub(r'\1', text)
+
+    # Remove horizontal rules
+    text = _MD_RULE_RE.sub('', text)
+
+    return text.strip()
+
+
+def _convert_markdown_to_html(text: str) -> str:
+    """Convert markdown-formatted text to HTML, preserving formatting."""
+    has_star = '*' in text
+    has_underscore = '_' in text
+
+    # Handle bold text (**text** or __text__) - non-greedy match
+    if has_star:
+        text = _HTML_BOLD_STAR_RE.sub(r'<strong>\1</strong>', text)
+    if has_underscore:
+        text = _HTML_BOLD_UNDERSCORE_RE.sub(r'<strong>\1</strong>', text)
+
+    # Handle italic text (*text* or _text_) - but avoid conflicts with bold
+    # Only match single * if not part of **
+    if has_star:
+        text = _HTML_ITALIC_STAR_RE.sub(r'<em>\1</em>', text)
+    if has_underscore:
+        text = _HTML_ITALIC_UNDERSCORE_RE.sub(r'<em>\1</em>', text)
+
+    # Handle inline code (`text`)
+    if '`' in text:
+        text = _MD_CODE_RE.sub(r'<code>\1</code>', text)
+
+    # Convert markdown list items (* item, - item) to HTML list items
+    # But we'll handle this in the paragraph processing to preserve structure
+
+    return text
+
+
+# HTML tags added by _convert_markdown_to_html that must survive escaping
+_PROTECTED_TAGS: Tuple[Tuple[str, str], ...] = (
+    ('<strong>', '___STRONG_OPEN___'),
+    ('</strong>', '___STRONG_CLOSE___'),
+    ('<em>', '___EM_OPEN___'),
+    ('</em>', '___EM_CLOSE___'),
+    ('<code>', '___CODE_OPEN___'),
+    ('</code>', '___CODE_CLOSE___'),
+)
+
+
+def _escape_html_preserve_tags(text: str) -> str:
+    """Escape HTML special characters but preserve HTML tags we added (like <strong>, <em>, etc.)."""
+    # First, protect our HTML tags by replacing them with placeholders
+    for tag, placeholder in _PROTECTED_TAGS:
+        text = text.replace(tag, placeholder)
+
+    # Escape HTML
+    text = html_escape.escape(text)
+
+    # Restore tags
+    for tag, placeholder in _PROTECTED_TAGS:
+        text = text.replace(placeholder, tag)
+
+    return text
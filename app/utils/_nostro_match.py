@@ -0,0 +1,56 @@
+"""Nostro statement matching by reference, UETR, amount and currency for the CSV statement repository."""
+from typing import Dict, List, Sequence, Tuple
+
+MatchKey = Tuple[str, str]
+
+
+def extract_field(description: str, marker: str) -> str:
+    """Value after an MT940-style marker such as '/TRN/' up to the next '/', or ''."""
+    if marker in description:
+        parts = description.split(marker)
+        if len(parts) > 1:
+            return parts[1].split('/')[0]
+    return ''
+
+
+def bucket_by_key(references: Sequence[str]) -> Dict[MatchKey, List[int]]:
+    """
+    Group statement rows by the (reference, UETR) extracted from their reference field.
+
+    Args:
+        references: Reference column of a nostro statement
+
+    Returns:
+        Dict of (reference, uetr) -> row indices in statement order
+    """
+    buckets: Dict[MatchKey, List[int]] = {}
+    for index, entry_reference in enumerate(references):
+        key = (extract_field(entry_reference, '/TRN/'), extract_field(entry_reference, '/UETR/'))
+        rows = buckets.get(key)
+        if rows is None:
+            buckets[key] = [index]
+        else:
+            rows.append(index)
+    return buckets
+
+
+def find_match(indices: List[int], amounts: Sequence[str], currencies: Sequence[str],
+               dr_crs: Sequence[str], amount: float, currency: str) -> Tuple[int, bool]:
+    """
+    Pick the matching row among statement rows whose reference and UETR already agree.
+
+    An exact match (same amount and currency, credit) wins over a partial one
+    (any credit); within each kind the first row in statement order is used.
+
+    Returns:
+        Tuple of (row index or -1, whether the match is exact)
+    """
+    for index in indices:
+        if float(amounts[index]) == amount and currencies[index] == currency and dr_crs[index] == 'CR':
+            return index, True
+
+    for index in indices:
+        if dr_crs[index] == 'CR':
+            return index, False
+
+    return -1, False
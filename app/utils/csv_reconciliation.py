@@ -9,6 +9,11 @@ from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime
 from dataclasses import dataclass
 
+# Column order of bank_accounts.csv when it is rewritten
+BANK_ACCOUNT_FIELDS = ['Account Number', 'Account Name', 'Account Type', 'Currency', 'Country',
+                       'Debit/Credit Authority', 'Reconciliation Type', 'GL Code', 'Opening Balance',
+                       'Last Reconciled Date', 'Cost Center', 'Account Status']
+
 
 @dataclass
 class ReconciliationResult:
@@ -54,6 +59,15 @@ class CSVReconciliationEngine:
         except Exception as e:
             raise Exception(f"Error saving {file_path}: {str(e)}")
 
+    def parse_balance(self, balance: str) -> float:
+        """Parse a CSV balance such as 'USD 69,940.00' into a float."""
+        return float(balance.replace(',', '').replace('AUD ', '').replace(
+            'USD ', '').replace('EUR ', '').replace('SGD ', ''))
+
+    def format_balance(self, currency: str, balance: float) -> str:
+        """Format a balance the way it is stored in the CSV files."""
+        return f"{currency} {balance:,.2f}"
+
     def extract_reference_from_description(self, description: str) -> Optional[str]:
         """Extract reference from MT940-like description."""
         if not description:
@@ -325,14 +339,11 @@ class CSVReconciliationEngine:
         """Update bank account balance (debit/credit)."""
         try:
             accounts_data = self.load_csv_data(self.bank_accounts_path)
-            fieldnames = ['Account Number', 'Account Name', 'Account Type', 'Currency', 'Country',
-                          'Debit/Credit Authority', 'Reconciliation Type', 'GL Code', 'Opening Balance',
-                          'Last Reconciled Date', 'Cost Center', 'Account Status']
 
             for account in accounts_data:
                 if account.get('Account Number', '') == account_number:
-                    current_balance = float(account.get('Opening Balance', '0').replace(',', '').replace(
-                        'AUD ', '').replace('USD ', '').replace('EUR ', '').replace('SGD ', ''))
+                    current_balance = self.parse_balance(
+                        account.get('Opening Balance', '0'))
 
                     if operation == 'debit':
                         new_balance = current_balance - amount
@@ -343,18 +354,59 @@ class CSVReconciliationEngine:
 
                     # Update balance with currency prefix
                     currency = account.get('Currency', 'AUD')
-                    account['Opening Balance'] = f"{currency} {new_balance:,.2f}"
+                    account['Opening Balance'] = self.format_balance(
+                        currency, new_balance)
                     account['Last Reconciled Date'] = datetime.now().strftime(
                         '%Y-%m-%d')
                     break
 
             self.save_csv_data(self.bank_accounts_path,
-                               accounts_data, fieldnames)
+                               accounts_data, BANK_ACCOUNT_FIELDS)
             return True
         except Exception as e:
             print(f"Error updating bank account balance: {e}")
             return False
 
+    def apply_updates_batch(self, updates: List[Tuple[str, float, str]]) -> bool:
+        """
+        Apply several bank account balance updates with one CSV read and one write.
+
+        Args:
+            updates: (account_number, amount, operation) tuples applied in order;
+                operation is 'debit' or 'credit'
+
+        Returns:
+            True if the updated accounts were saved
+        """
+        try:
+            accounts_data = self.load_csv_data(self.bank_accounts_path)
+
+            # First row wins, as in update_bank_account_balance
+            by_number: Dict[str, Dict] = {}
+            for account in accounts_data:
+                by_number.setdefault(account.get('Account Number', ''), account)
+
+            reconciled_date = datetime.now().strftime('%Y-%m-%d')
+            for account_number, amount, operation in updates:
+                account = by_number.get(account_number)
+                if account is None or operation not in ('debit', 'credit'):
+                    continue
+
+                current_balance = self.parse_balance(
+                    account.get('Opening Balance', '0'))
+                new_balance = current_balance - amount if operation == 'debit' else current_balance + amount
+
+                account['Opening Balance'] = self.format_balance(
+                    account.get('Currency', 'AUD'), new_balance)
+                account['Last Reconciled Date'] = reconciled_date
+
+            self.save_csv_data(self.bank_accounts_path,
+                               accounts_data, BANK_ACCOUNT_FIELDS)
+            return True
+        except Exception as e:
+            print(f"Error applying bank account balance updates: {e}")
+            return False
+
     def update_customer_balance(self, account_number: str, amount: float, operation: str) -> bool:
         """Update customer account balance."""
         try:
@@ -366,8 +418,8 @@ class CSVReconciliationEngine:
                 if customer.get('Account Number', '') == account_number:
                     # Update both ledger and available balance
                     for balance_field in ['Ledger Balance', 'Available Balance']:
-                        current_balance = float(customer.get(balance_field, '0').replace(',', '').replace(
-                            'AUD ', '').replace('USD ', '').replace('EUR ', '').replace('SGD ', ''))
+                        current_balance = self.parse_balance(
+                            customer.get(balance_field, '0'))
 
                         if operation == 'debit':
                             new_balance = current_balance - amount
@@ -385,7 +437,8 @@ class CSVReconciliationEngine:
                         elif 'SGD' in customer.get('Account Type', ''):
                             currency = 'SGD'
 
-                        customer[balance_field] = f"{currency} {new_balance:,.2f}"
+                        customer[balance_field] = self.format_balance(
+                            currency, new_balance)
                     break
 
             self.save_csv_data(self.customer_data_path,
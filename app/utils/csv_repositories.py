@@ -5,24 +5,128 @@ CSV implementations of repository interfaces.
 import csv
 import json
 import os
+import sys
 import uuid
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, Iterator, List, Optional, Any, cast
 from datetime import datetime
 
 from .repositories import (
     AccountRepository, StatementRepository, LedgerRepository,
     CustomerRepository, AuditRepository,
-    Account, StatementEntry, LedgerEntry, Customer
+    Account, StatementEntry, LedgerEntry, Customer, ColumnBatch, IndexedLookupMixin,
+    NostroMatchQuery, to_minor_units, format_minor_units, dump_run_report, load_run_report,
+    write_report_checksum, verify_report_checksum
 )
+from ._nostro_match import bucket_by_key, find_match
+
+# Repository field -> CSV header, in dataclass field order
+_ACCOUNT_COLUMNS = {
+    'account_number': 'Account Number',
+    'account_name': 'Account Name',
+    'account_type': 'Account Type',
+    'currency': 'Currency',
+    'country': 'Country',
+    'debit_credit_authority': 'Debit/Credit Authority',
+    'reconciliation_type': 'Reconciliation Type',
+    'gl_code': 'GL Code',
+    'opening_balance': 'Opening Balance',
+    'last_reconciled_date': 'Last Reconciled Date',
+    'cost_center': 'Cost Center',
+    'account_status': 'Account Status',
+}
+_STATEMENT_COLUMNS = {
+    'statement_id': 'Statement ID',
+    'value_date': 'Value Date',
+    'currency': 'Currency',
+    'amount': 'Amount',
+    'dr_cr': 'DR / CR',
+    'description': 'Description',
+    'reference': 'Reference',
+}
+_LEDGER_COLUMNS = {
+    'transaction_id': 'Transaction ID',
+    'value_date': 'Value Date',
+    'currency': 'Currency',
+    'amount': 'Amount',
+    'counterparty': 'Counterparty',
+    'reference': 'Reference',
+    'return_reason': 'Return Reason',
+}
+_CUSTOMER_COLUMNS = {
+    'customer_name': 'Customer Name',
+    'account_name': 'Account Name',
+    'account_number': 'Account Number',
+    'account_type': 'Account Type',
+    'ledger_balance': 'Ledger Balance',
+    'available_balance': 'Available Balance',
+    'account_status': 'Account Status',
+    'email': 'e-mail',
+}
+
+
+# Low-cardinality columns; each distinct value is interned so rows share one string
+_INTERNED_FIELDS = frozenset({'account_type', 'currency', 'country', 'dr_cr', 'account_status'})
+
+
+def _file_version(file_path: str) -> Optional[tuple]:
+    """Stat signature of a CSV file, used to notice rewrites by other components."""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _read_columns(file_path: str, columns: Dict[str, str]) -> ColumnBatch:
+    """
+    Read CSV columns without building a dict per row.
 
+    Values match csv.DictReader + row.get(header, ''): a header missing from the
+    file reads as '' and a short row reads as None.
 
-class CSVAccountRepository(AccountRepository):
+    Args:
+        file_path: CSV file to read
+        columns: Field name -> CSV header, in the order the batch should use
+
+    Returns:
+        Field name -> column values in file order
+    """
+    rows: List[List[Optional[str]]] = []
+    header: List[str] = []
+    if os.path.exists(file_path):
+        with open(file_path, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            # Typed as Optional so short rows can be padded with None below
+            rows = cast(List[List[Optional[str]]], [row for row in reader if row])
+
+    width = len(header)
+    if any(len(row) != width for row in rows):
+        rows = [row[:width] + [None] * (width - len(row)) for row in rows]
+    transposed = list(zip(*rows)) if rows else [()] * width
+
+    # Duplicate headers resolve to the last column, as in DictReader
+    positions = {name: index for index, name in enumerate(header)}
+    empty = ('',) * len(rows)
+    batch: ColumnBatch = {}
+    for field, name in columns.items():
+        values = transposed[positions[name]] if name in positions else empty
+        if field in _INTERNED_FIELDS and name in positions:
+            values = tuple(sys.intern(v) if v is not None else v for v in values)
+        batch[field] = values
+    return batch
+
+
+class CSVAccountRepository(IndexedLookupMixin, AccountRepository):
     """CSV implementation of AccountRepository."""
 
     def __init__(self, data_dir: str = "data"):
         self.data_dir = data_dir
         self.accounts_file = os.path.join(data_dir, "bank_accounts.csv")
 
+    def _index_version(self) -> Optional[tuple]:
+        return _file_version(self.accounts_file)
+
     def _load_accounts(self) -> List[Dict[str, str]]:
         """Load accounts from CSV file."""
         if not os.path.exists(self.accounts_file):
@@ -52,60 +156,22 @@ class CSVAccountRepository(AccountRepository):
 
     def get_account(self, account_number: str) -> Optional[Account]:
         """Get account by account number."""
-        accounts = self._load_accounts()
-        for account_data in accounts:
-            if account_data.get('Account Number', '') == account_number:
-                return Account(
-                    account_number=account_data.get('Account Number', ''),
-                    account_name=account_data.get('Account Name', ''),
-                    account_type=account_data.get('Account Type', ''),
-                    currency=account_data.get('Currency', ''),
-                    country=account_data.get('Country', ''),
-                    debit_credit_authority=account_data.get(
-                        'Debit/Credit Authority', ''),
-                    reconciliation_type=account_data.get(
-                        'Reconciliation Type', ''),
-                    gl_code=account_data.get('GL Code', ''),
-                    opening_balance=account_data.get('Opening Balance', ''),
-                    last_reconciled_date=account_data.get(
-                        'Last Reconciled Date', ''),
-                    cost_center=account_data.get('Cost Center', ''),
-                    account_status=account_data.get('Account Status', '')
-                )
-        return None
+        by_number = self._ensure_index(
+            'account_number', self.get_all_accounts, lambda a: a.account_number)
+        return by_number.get(account_number)
 
     def get_accounts_by_type(self, account_type: str) -> List[Account]:
         """Get all accounts of a specific type."""
-        accounts = self._load_accounts()
-        result = []
-        for account_data in accounts:
-            if account_data.get('Account Type', '') == account_type:
-                result.append(Account(
-                    account_number=account_data.get('Account Number', ''),
-                    account_name=account_data.get('Account Name', ''),
-                    account_type=account_data.get('Account Type', ''),
-                    currency=account_data.get('Currency', ''),
-                    country=account_data.get('Country', ''),
-                    debit_credit_authority=account_data.get(
-                        'Debit/Credit Authority', ''),
-                    reconciliation_type=account_data.get(
-                        'Reconciliation Type', ''),
-                    gl_code=account_data.get('GL Code', ''),
-                    opening_balance=account_data.get('Opening Balance', ''),
-                    last_reconciled_date=account_data.get(
-                        'Last Reconciled Date', ''),
-                    cost_center=account_data.get('Cost Center', ''),
-                    account_status=account_data.get('Account Status', '')
-                ))
-        return result
+        by_type = self._group_index(
+            'account_type', self.get_all_accounts, lambda a: a.account_type)
+        return list(by_type.get(account_type, ()))
 
     def get_nostro_account_for_currency(self, currency: str) -> Optional[str]:
         """Get nostro account number for a currency."""
-        nostro_accounts = self.get_accounts_by_type('Nostro')
-        for account in nostro_accounts:
-            if account.currency == currency:
-                return account.account_number
-        return None
+        nostro_by_currency = self._ensure_index(
+            'nostro_currency', lambda: self.get_accounts_by_type('Nostro'), lambda a: a.currency)
+        account = nostro_by_currency.get(currency)
+        return account.account_number if account else None
 
     def get_customer_accounts(self, customer_iban: str) -> List[Dict[str, str]]:
         """Get all accounts for a specific customer by IBAN."""
@@ -130,28 +196,28 @@ class CSVAccountRepository(AccountRepository):
                 current_balance = account_data.get('Opening Balance', '0')
                 balance_before = current_balance
                 
-                # Parse balance (handle currency prefixes and commas)
-                balance_str = current_balance.replace(',', '').replace(
-                    account_data.get('Currency', ''), '').strip()
-                try:
-                    current_amount = float(balance_str)
-                except ValueError:
-                    current_amount = 0.0
-
                 if operation == 'debit':
-                    new_amount = current_amount - amount
+                    sign = -1
                 elif operation == 'credit':
-                    new_amount = current_amount + amount
+                    sign = 1
                 else:
                     return False
 
-                # Format new balance with currency
+                # Parse balance (handle currency prefixes and commas) into minor units
                 currency = account_data.get('Currency', '')
-                balance_after = f"{currency} {new_amount:,.2f}"
+                try:
+                    current_minor = to_minor_units(current_balance.replace(currency, ''))
+                except ValueError:
+                    current_minor = 0
+                new_minor = current_minor + sign * to_minor_units(amount)
+
+                # Format new balance with currency
+                balance_after = f"{currency} {format_minor_units(new_minor)}"
                 account_data['Opening Balance'] = balance_after
                 
                 # Save updated accounts
                 success = self._save_accounts(accounts)
+                self._invalidate_indexes()
                 
                 # Record transaction history if audit repository is provided
                 if success and audit_repo and transaction_id:
@@ -172,27 +238,12 @@ class CSVAccountRepository(AccountRepository):
 
     def get_all_accounts(self) -> List[Account]:
         """Get all accounts."""
-        accounts = self._load_accounts()
-        result = []
-        for account_data in accounts:
-            result.append(Account(
-                account_number=account_data.get('Account Number', ''),
-                account_name=account_data.get('Account Name', ''),
-                account_type=account_data.get('Account Type', ''),
-                currency=account_data.get('Currency', ''),
-                country=account_data.get('Country', ''),
-                debit_credit_authority=account_data.get(
-                    'Debit/Credit Authority', ''),
-                reconciliation_type=account_data.get(
-                    'Reconciliation Type', ''),
-                gl_code=account_data.get('GL Code', ''),
-                opening_balance=account_data.get('Opening Balance', ''),
-                last_reconciled_date=account_data.get(
-                    'Last Reconciled Date', ''),
-                cost_center=account_data.get('Cost Center', ''),
-                account_status=account_data.get('Account Status', '')
-            ))
-        return result
+        columns = self.get_all_accounts_columns()
+        return [Account(*values) for values in zip(*columns.values())]
+
+    def get_all_accounts_columns(self) -> ColumnBatch:
+        """Get all accounts as columns keyed by Account field name."""
+        return _read_columns(self.accounts_file, _ACCOUNT_COLUMNS)
 
 
 class CSVStatementRepository(StatementRepository):
@@ -230,108 +281,87 @@ class CSVStatementRepository(StatementRepository):
         except Exception:
             return False
 
-    def _dict_to_statement_entry(self, data: Dict[str, str]) -> StatementEntry:
-        """Convert dict to StatementEntry."""
-        return StatementEntry(
-            statement_id=data.get('Statement ID', ''),
-            value_date=data.get('Value Date', ''),
-            currency=data.get('Currency', ''),
-            amount=data.get('Amount', ''),
-            dr_cr=data.get('DR / CR', ''),
-            description=data.get('Description', ''),
-            reference=data.get('Reference', '')
-        )
-
     def get_nostro_entries(self) -> List[StatementEntry]:
         """Get all nostro statement entries."""
-        data = self._load_csv_data(self.nostro_file)
-        return [self._dict_to_statement_entry(row) for row in data]
+        columns = self.get_nostro_columns()
+        return [StatementEntry(*values) for values in zip(*columns.values())]
 
     def get_vostro_entries(self) -> List[StatementEntry]:
         """Get all vostro statement entries."""
-        data = self._load_csv_data(self.vostro_file)
-        return [self._dict_to_statement_entry(row) for row in data]
+        columns = self.get_vostro_columns()
+        return [StatementEntry(*values) for values in zip(*columns.values())]
+
+    def get_nostro_columns(self) -> ColumnBatch:
+        """Get all nostro statement entries as columns keyed by StatementEntry field name."""
+        return _read_columns(self.nostro_file, _STATEMENT_COLUMNS)
+
+    def get_vostro_columns(self) -> ColumnBatch:
+        """Get all vostro statement entries as columns keyed by StatementEntry field name."""
+        return _read_columns(self.vostro_file, _STATEMENT_COLUMNS)
 
     def find_nostro_match(self, reference: str, uetr: str, amount: float, currency: str) -> Dict[str, Any]:
         """Find matching nostro entry (exact or partial)."""
-        entries = self.get_nostro_entries()
-
-        for entry in entries:
-            # Extract reference and UETR from entry reference field
-            entry_ref = self._extract_reference_from_description(
-                entry.reference)
-            entry_uetr = self._extract_uetr_from_description(entry.reference)
-
-            # Check for exact match
-            if (entry_ref == reference and
-                entry_uetr == uetr and
-                float(entry.amount) == amount and
-                entry.currency == currency and
-                    entry.dr_cr == 'CR'):
-
-                return {
-                    'found': True,
-                    'match_type': 'exact',
-                    'nostro_entry': entry,
-                    'match_details': {
-                        'reference_match': True,
-                        'uetr_match': True,
-                        'amount_match': True,
-                        'currency_match': True,
-                        'credit_match': True
-                    }
-                }
-
-        # Check for partial matches (missing :61: but has :86:)
-        for entry in entries:
-            entry_ref = self._extract_reference_from_description(
-                entry.reference)
-            entry_uetr = self._extract_uetr_from_description(entry.reference)
-
-            if (entry_ref == reference and
-                entry_uetr == uetr and
-                    entry.dr_cr == 'CR'):
-
-                return {
-                    'found': True,
-                    'match_type': 'partial',
-                    'nostro_entry': entry,
-                    'match_details': {
-                        'reference_match': True,
-                        'uetr_match': True,
-                        'amount_match': False,  # Missing :61: amount
-                        'currency_match': False,
-                        'credit_match': True
-                    }
-                }
+        return self.find_nostro_match_batch([(reference, uetr, amount, currency)])[0]
+
+    def find_nostro_match_batch(self, queries: Iterable[NostroMatchQuery]) -> List[Dict[str, Any]]:
+        """
+        Find matching nostro entries for many payments at once.
+
+        The statement is read once and its rows are bucketed by extracted
+        (reference, UETR), so each query only checks the rows sharing its key.
+
+        Args:
+            queries: (reference, uetr, amount, currency) tuples
+
+        Returns:
+            One find_nostro_match result per query, in query order
+        """
+        columns = self.get_nostro_columns()
+
+        # Extract reference and UETR from each entry's reference field once for all queries
+        candidates = bucket_by_key(columns['reference'])
+
+        return [
+            self._match_nostro_candidates(
+                columns, candidates.get((reference, uetr), []), amount, currency)
+            for reference, uetr, amount, currency in queries
+        ]
+
+    def _match_nostro_candidates(self, columns: ColumnBatch, indices: List[int],
+                                 amount: float, currency: str) -> Dict[str, Any]:
+        """Match one payment against the statement rows whose reference and UETR already agree."""
+        index, exact = find_match(
+            indices, columns['amount'], columns['currency'], columns['dr_cr'], amount, currency)
+
+        if index < 0:
+            return {
+                'found': False,
+                'match_type': 'none',
+                'nostro_entry': None,
+                'match_details': {}
+            }
 
+        # Only the matched row becomes a StatementEntry
         return {
-            'found': False,
-            'match_type': 'none',
-            'nostro_entry': None,
-            'match_details': {}
+            'found': True,
+            'match_type': 'exact' if exact else 'partial',
+            'nostro_entry': self._statement_entry_at(columns, index),
+            'match_details': {
+                'reference_match': True,
+                'uetr_match': True,
+                'amount_match': exact,  # Partial matches are missing the :61: amount
+                'currency_match': exact,
+                'credit_match': True
+            }
         }
 
-    def _extract_reference_from_description(self, description: str) -> str:
-        """Extract reference from MT940-style description."""
-        if '/TRN/' in description:
-            parts = description.split('/TRN/')
-            if len(parts) > 1:
-                return parts[1].split('/')[0]
-        return ''
-
-    def _extract_uetr_from_description(self, description: str) -> str:
-        """Extract UETR from MT940-style description."""
-        if '/UETR/' in description:
-            parts = description.split('/UETR/')
-            if len(parts) > 1:
-                return parts[1].split('/')[0]
-        return ''
+    def _statement_entry_at(self, columns: ColumnBatch, index: int) -> StatementEntry:
+        """Build the StatementEntry for one row of a statement ColumnBatch."""
+        return StatementEntry(*(values[index] for values in columns.values()))
 
-    def add_nostro_entry(self, entry: StatementEntry) -> bool:
-        """Add new nostro statement entry."""
-        data = self._load_csv_data(self.nostro_file)
-        new_row = {
+    def _statement_row(self, entry: StatementEntry) -> Dict[str, str]:
+        """Convert a statement entry to CSV row format."""
+        return {
             'Statement ID': entry.statement_id,
             'Value Date': entry.value_date,
             'Currency': entry.currency,
@@ -340,32 +370,44 @@ class CSVStatementRepository(StatementRepository):
             'Description': entry.description,
             'Reference': entry.reference
         }
-        data.append(new_row)
-        return self._save_csv_data(self.nostro_file, data)
+
+    def _append_statement_entries(self, file_path: str, entries: Iterable[StatementEntry]) -> int:
+        """Append entries to a statement file with a single rewrite; returns the number added."""
+        rows = [self._statement_row(entry) for entry in entries]
+        if not rows:
+            return 0
+
+        data = self._load_csv_data(file_path)
+        data.extend(rows)
+        return len(rows) if self._save_csv_data(file_path, data) else 0
+
+    def add_nostro_entry(self, entry: StatementEntry) -> bool:
+        """Add new nostro statement entry."""
+        return self.add_nostro_entries([entry]) == 1
 
     def add_vostro_entry(self, entry: StatementEntry) -> bool:
         """Add new vostro statement entry."""
-        data = self._load_csv_data(self.vostro_file)
-        new_row = {
-            'Statement ID': entry.statement_id,
-            'Value Date': entry.value_date,
-            'Currency': entry.currency,
-            'Amount': entry.amount,
-            'DR / CR': entry.dr_cr,
-            'Description': entry.description,
-            'Reference': entry.reference
-        }
-        data.append(new_row)
-        return self._save_csv_data(self.vostro_file, data)
+        return self.add_vostro_entries([entry]) == 1
+
+    def add_nostro_entries(self, entries: Iterable[StatementEntry]) -> int:
+        """Add several nostro statement entries; returns the number added."""
+        return self._append_statement_entries(self.nostro_file, entries)
 
+    def add_vostro_entries(self, entries: Iterable[StatementEntry]) -> int:
+        """Add several vostro statement entries; returns the number added."""
+        return self._append_statement_entries(self.vostro_file, entries)
 
-class CSVLedgerRepository(LedgerRepository):
+
+class CSVLedgerRepository(IndexedLookupMixin, LedgerRepository):
     """CSV implementation of LedgerRepository."""
 
     def __init__(self, data_dir: str = "data"):
         self.data_dir = data_dir
         self.ledger_file = os.path.join(data_dir, "internal_ledger.csv")
 
+    def _index_version(self) -> Optional[tuple]:
+        return _file_version(self.ledger_file)
+
     def _load_ledger_data(self) -> List[Dict[str, str]]:
         """Load ledger data from CSV file."""
         if not os.path.exists(self.ledger_file):
@@ -395,32 +437,22 @@ class CSVLedgerRepository(LedgerRepository):
 
     def get_ledger_entries(self) -> List[LedgerEntry]:
         """Get all ledger entries."""
-        data = self._load_ledger_data()
-        result = []
-        for row in data:
-            result.append(LedgerEntry(
-                transaction_id=row.get('Transaction ID', ''),
-                value_date=row.get('Value Date', ''),
-                currency=row.get('Currency', ''),
-                amount=row.get('Amount', ''),
-                counterparty=row.get('Counterparty', ''),
-                reference=row.get('Reference', ''),
-                return_reason=row.get('Return Reason', '')
-            ))
-        return result
+        columns = self.get_ledger_columns()
+        return [LedgerEntry(*values) for values in zip(*columns.values())]
+
+    def get_ledger_columns(self) -> ColumnBatch:
+        """Get all ledger entries as columns keyed by LedgerEntry field name."""
+        return _read_columns(self.ledger_file, _LEDGER_COLUMNS)
 
     def get_entry_by_reference(self, reference: str) -> Optional[LedgerEntry]:
         """Get ledger entry by reference."""
-        entries = self.get_ledger_entries()
-        for entry in entries:
-            if entry.reference == reference:
-                return entry
-        return None
+        by_reference = self._ensure_index(
+            'reference', self.get_ledger_entries, lambda e: e.reference)
+        return by_reference.get(reference)
 
-    def add_ledger_entry(self, entry: LedgerEntry) -> bool:
-        """Add new ledger entry."""
-        data = self._load_ledger_data()
-        new_row = {
+    def _ledger_row(self, entry: LedgerEntry) -> Dict[str, str]:
+        """Convert a ledger entry to CSV row format."""
+        return {
             'Transaction ID': entry.transaction_id,
             'Value Date': entry.value_date,
             'Currency': entry.currency,
@@ -429,8 +461,21 @@ class CSVLedgerRepository(LedgerRepository):
             'Reference': entry.reference,
             'Return Reason': entry.return_reason
         }
-        data.append(new_row)
-        return self._save_ledger_data(data)
+
+    def add_ledger_entry(self, entry: LedgerEntry) -> bool:
+        """Add new ledger entry."""
+        return self.add_ledger_entries([entry]) == 1
+
+    def add_ledger_entries(self, entries: Iterable[LedgerEntry]) -> int:
+        """Add several ledger entries with a single rewrite; returns the number added."""
+        rows = [self._ledger_row(entry) for entry in entries]
+        if not rows:
+            return 0
+
+        data = self._load_ledger_data()
+        data.extend(rows)
+        self._invalidate_indexes()
+        return len(rows) if self._save_ledger_data(data) else 0
 
     def update_entry_status(self, reference: str, status: str) -> bool:
         """Update entry status."""
@@ -438,17 +483,21 @@ class CSVLedgerRepository(LedgerRepository):
         for row in data:
             if row.get('Reference', '') == reference:
                 row['Return Reason'] = status
+                self._invalidate_indexes()
                 return self._save_ledger_data(data)
         return False
 
 
-class CSVCustomerRepository(CustomerRepository):
+class CSVCustomerRepository(IndexedLookupMixin, CustomerRepository):
     """CSV implementation of CustomerRepository."""
 
     def __init__(self, data_dir: str = "data"):
         self.data_dir = data_dir
         self.customers_file = os.path.join(data_dir, "customer_data.csv")
 
+    def _index_version(self) -> Optional[tuple]:
+        return _file_version(self.customers_file)
+
     def _load_customers(self) -> List[Dict[str, str]]:
         """Load customers from CSV file."""
         if not os.path.exists(self.customers_file):
@@ -463,21 +512,9 @@ class CSVCustomerRepository(CustomerRepository):
 
     def get_customer_by_account(self, account_number: str) -> Optional[Customer]:
         """Get customer by account number."""
-        customers = self._load_customers()
-        for customer_data in customers:
-            if customer_data.get('Account Number', '') == account_number:
-                return Customer(
-                    customer_name=customer_data.get('Customer Name', ''),
-                    account_name=customer_data.get('Account Name', ''),
-                    account_number=customer_data.get('Account Number', ''),
-                    account_type=customer_data.get('Account Type', ''),
-                    ledger_balance=customer_data.get('Ledger Balance', ''),
-                    available_balance=customer_data.get(
-                        'Available Balance', ''),
-                    account_status=customer_data.get('Account Status', ''),
-                    email=customer_data.get('e-mail', '')
-                )
-        return None
+        by_account = self._ensure_index(
+            'account_number', self.get_all_customers, lambda c: c.account_number)
+        return by_account.get(account_number)
 
     def get_customer_by_iban(self, iban: str) -> Optional[Customer]:
         """Get customer by IBAN."""
@@ -486,42 +523,25 @@ class CSVCustomerRepository(CustomerRepository):
 
     def get_all_customers(self) -> List[Customer]:
         """Get all customers."""
-        customers = self._load_customers()
-        result = []
-        for customer_data in customers:
-            result.append(Customer(
-                customer_name=customer_data.get('Customer Name', ''),
-                account_name=customer_data.get('Account Name', ''),
-                account_number=customer_data.get('Account Number', ''),
-                account_type=customer_data.get('Account Type', ''),
-                ledger_balance=customer_data.get('Ledger Balance', ''),
-                available_balance=customer_data.get('Available Balance', ''),
-                account_status=customer_data.get('Account Status', ''),
-                email=customer_data.get('e-mail', '')
-            ))
-        return result
+        columns = self.get_all_customers_columns()
+        return [Customer(*values) for values in zip(*columns.values())]
+
+    def get_all_customers_columns(self) -> ColumnBatch:
+        """Get all customers as columns keyed by Customer field name."""
+        return _read_columns(self.customers_file, _CUSTOMER_COLUMNS)
 
     def suggest_alternate_account(self, original_account: str) -> Optional[str]:
         """Suggest alternate active account for customer."""
         # Simple implementation: find another active account for the same customer
-        customers = self._load_customers()
-        original_customer = None
-
-        # Find the original customer
-        for customer_data in customers:
-            if customer_data.get('Account Number', '') == original_account:
-                original_customer = customer_data.get('Customer Name', '')
-                break
-
-        if not original_customer:
+        original = self.get_customer_by_account(original_account)
+        if not original or not original.customer_name:
             return None
 
-        # Find another active account for the same customer
-        for customer_data in customers:
-            if (customer_data.get('Customer Name', '') == original_customer and
-                customer_data.get('Account Number', '') != original_account and
-                    customer_data.get('Account Status', '') == 'Active'):
-                return customer_data.get('Account Number', '')
+        by_name = self._group_index(
+            'customer_name', self.get_all_customers, lambda c: c.customer_name)
+        for customer in by_name.get(original.customer_name, ()):
+            if customer.account_number != original_account and customer.account_status == 'Active':
+                return customer.account_number
 
         return None
 
@@ -562,13 +582,12 @@ class CSVAuditRepository(AuditRepository):
         except Exception:
             return False
 
-    def add_audit_event(self, event: Dict[str, Any]) -> bool:
-        """Add audit event."""
-        data = self._load_audit_data()
-
-        # Convert event to CSV row format
-        event_row = {
-            'Timestamp': event.get('timestamp', datetime.now().isoformat()),
+    def _audit_row(self, event: Dict[str, Any]) -> Dict[str, str]:
+        """Convert an audit event to CSV row format."""
+        # Only read the clock for events that arrive without a timestamp
+        timestamp = event['timestamp'] if 'timestamp' in event else datetime.now().isoformat()
+        return {
+            'Timestamp': timestamp,
             'Transaction ID': event.get('transaction_id', ''),
             'Event Type': event.get('event_type', ''),
             'Actor': event.get('actor', ''),
@@ -577,42 +596,61 @@ class CSVAuditRepository(AuditRepository):
             'Level': event.get('level', 'INFO')
         }
 
-        data.append(event_row)
-        return self._save_audit_data(data)
+    def add_audit_event(self, event: Dict[str, Any]) -> bool:
+        """Add audit event."""
+        return self.add_audit_events([event]) == 1
+
+    def add_audit_events(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Add several audit events with a single rewrite of the audit log; returns the number added."""
+        rows = [self._audit_row(event) for event in events]
+        if not rows:
+            return 0
 
-    def get_audit_events(self, transaction_id: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get audit events, optionally filtered by transaction ID."""
         data = self._load_audit_data()
-        result = []
+        data.extend(rows)
+        return len(rows) if self._save_audit_data(data) else 0
 
-        for row in data:
-            if transaction_id and row.get('Transaction ID', '') != transaction_id:
-                continue
-
-            event = {
-                'timestamp': row.get('Timestamp', ''),
-                'transaction_id': row.get('Transaction ID', ''),
-                'event_type': row.get('Event Type', ''),
-                'actor': row.get('Actor', ''),
-                'action': row.get('Action', ''),
-                'details': json.loads(row.get('Details', '{}')),
-                'level': row.get('Level', 'INFO')
-            }
-            result.append(event)
+    def get_audit_events(self, transaction_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Stream audit events from the log file, optionally filtered by transaction ID."""
+        if not os.path.exists(self.audit_file):
+            return
 
-        return result
+        with open(self.audit_file, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if transaction_id and row.get('Transaction ID', '') != transaction_id:
+                    continue
+
+                yield {
+                    'timestamp': row.get('Timestamp', ''),
+                    'transaction_id': row.get('Transaction ID', ''),
+                    'event_type': row.get('Event Type', ''),
+                    'actor': row.get('Actor', ''),
+                    'action': row.get('Action', ''),
+                    'details': json.loads(row.get('Details', '{}')),
+                    'level': row.get('Level', 'INFO')
+                }
 
     def save_run_report(self, run_id: str, report_data: Dict[str, Any]) -> str:
         """Save run report and return file path."""
         filename = f"{run_id}.json"
         file_path = os.path.join(self.reports_dir, filename)
 
+        temp_file_path = file_path + ".tmp"
+
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(report_data, f, indent=2,
-                          ensure_ascii=False, default=str)
+            # Write to a temporary file and rename it into place after the checksum
+            data = dump_run_report(report_data)
+            with open(temp_file_path, 'wb') as f:
+                f.write(data)
+            write_report_checksum(file_path, data)
+            os.replace(temp_file_path, file_path)
             return file_path
         except Exception:
+            if os.path.exists(temp_file_path):
+                try:
+                    os.remove(temp_file_path)
+                except OSError:
+                    pass
             return ""
 
     def get_run_report(self, run_id: str) -> Optional[Dict[str, Any]]:
@@ -624,8 +662,11 @@ class CSVAuditRepository(AuditRepository):
             return None
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            if not verify_report_checksum(file_path, data):
+                return None
+            return load_run_report(data)
         except Exception:
             return None
 
@@ -119,14 +119,14 @@ def migrate_csv_to_sqlite(csv_dir: str = "data", db_path: str = "data/bank_data.
             print(f"Migrating {accounts_file}...")
             with open(accounts_file, 'r', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
-                for row in reader:
-                    conn.execute('''
-                        INSERT OR REPLACE INTO accounts 
-                        (account_number, account_name, account_type, currency, country,
-                         debit_credit_authority, reconciliation_type, gl_code, opening_balance,
-                         last_reconciled_date, cost_center, account_status)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
+                conn.executemany('''
+                    INSERT OR REPLACE INTO accounts 
+                    (account_number, account_name, account_type, currency, country,
+                     debit_credit_authority, reconciliation_type, gl_code, opening_balance,
+                     last_reconciled_date, cost_center, account_status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    (
                         row.get('Account Number', ''),
                         row.get('Account Name', ''),
                         row.get('Account Type', ''),
@@ -139,7 +139,9 @@ def migrate_csv_to_sqlite(csv_dir: str = "data", db_path: str = "data/bank_data.
                         row.get('Last Reconciled Date', ''),
                         row.get('Cost Center', ''),
                         row.get('Account Status', '')
-                    ))
+                    )
+                    for row in reader
+                ))
             print(f"Migrated {accounts_file}")
 
         # Migrate nostro_statement.csv
@@ -148,12 +150,12 @@ def migrate_csv_to_sqlite(csv_dir: str = "data", db_path: str = "data/bank_data.
             print(f"Migrating {nostro_file}...")
             with open(nostro_file, 'r', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
-                for row in reader:
-                    conn.execute('''
-                        INSERT INTO nostro_statements 
-                        (statement_id, value_date, currency, amount, dr_cr, description, reference)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ''', (
+                conn.executemany('''
+                    INSERT INTO nostro_statements 
+                    (statement_id, value_date, currency, amount, dr_cr, description, reference)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    (
                         row.get('Statement ID', ''),
                         row.get('Value Date', ''),
                         row.get('Currency', ''),
@@ -161,7 +163,9 @@ def migrate_csv_to_sqlite(csv_dir: str = "data", db_path: str = "data/bank_data.
                         row.get('DR / CR', ''),
                         row.get('Description', ''),
                         row.get('Reference', '')
-                    ))
+                    )
+                    for row in reader
+                ))
             print(f"Migrated {nostro_file}")
 
         # Migrate vostro_statement.csv
@@ -170,12 +174,12 @@ def migrate_csv_to_sqlite(csv_dir: str = "data", db_path: str = "data/bank_data.
             print(f"Migrating {vostro_file}...")
             with open(vostro_file, 'r', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
-                for row in reader:
-                    conn.execute('''
-                        INSERT INTO vostro_statements 
-                        (statement_id, value_date, currency, amount, dr_cr, description, reference)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ''', (
+                conn.executemany('''
+                    INSERT INTO vostro_statements 
+                    (statement_id, value_date, currency, amount, dr_cr, description, reference)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    (
                         row.get('Statement ID', ''),
                         row.get('Value Date', ''),
                         row.get('Currency', ''),
@@ -183,7 +187,9 @@ def migrate_csv_to_sqlite(csv_dir: str = "data", db_path: str = "data/bank_data.
                         row.get('DR / CR', ''),
                         row.get('Description', ''),
                         row.get('Reference', '')
-                    ))
+                    )
+                    for row in reader
+                ))
             print(f"Migrated {vostro_file}")
 
         # Migrate internal_ledger.csv
@@ -192,12 +198,12 @@ def migrate_csv_to_sqlite(csv_dir: str = "data", db_path: str = "data/bank_data.
             print(f"Migrating {ledger_file}...")
             with open(ledger_file, 'r', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
-                for row in reader:
-                    conn.execute('''
-                        INSERT INTO ledger_entries 
-                        (transaction_id, value_date, currency, amount, counterparty, reference, return_reason)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ''', (
+                conn.executemany('''
+                    INSERT INTO ledger_entries 
+                    (transaction_id, value_date, currency, amount, counterparty, reference, return_reason)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    (
                         row.get('Transaction ID', ''),
                         row.get('Value Date', ''),
                         row.get('Currency', ''),
@@ -205,7 +211,9 @@ def migrate_csv_to_sqlite(csv_dir: str = "data", db_path: str = "data/bank_data.
                         row.get('Counterparty', ''),
                         row.get('Reference', ''),
                         row.get('Return Reason', '')
-                    ))
+                    )
+                    for row in reader
+                ))
             print(f"Migrated {ledger_file}")
 
         # Migrate customer_data.csv
@@ -214,13 +222,13 @@ def migrate_csv_to_sqlite(csv_dir: str = "data", db_path: str = "data/bank_data.
             print(f"Migrating {customers_file}...")
             with open(customers_file, 'r', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
-                for row in reader:
-                    conn.execute('''
-                        INSERT INTO customers 
-                        (customer_name, account_name, account_number, account_type,
-                         ledger_balance, available_balance, account_status, email)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
+                conn.executemany('''
+                    INSERT INTO customers 
+                    (customer_name, account_name, account_number, account_type,
+                     ledger_balance, available_balance, account_status, email)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    (
                         row.get('Customer Name', ''),
                         row.get('Account Name', ''),
                         row.get('Account Number', ''),
@@ -229,7 +237,9 @@ def migrate_csv_to_sqlite(csv_dir: str = "data", db_path: str = "data/bank_data.
                         row.get('Available Balance', ''),
                         row.get('Account Status', ''),
                         row.get('e-mail', '')
-                    ))
+                    )
+                    for row in reader
+                ))
             print(f"Migrated {customers_file}")
 
         # Migrate audit_log.csv if it exists
@@ -238,19 +248,21 @@ def migrate_csv_to_sqlite(csv_dir: str = "data", db_path: str = "data/bank_data.
             print(f"Migrating {audit_file}...")
             with open(audit_file, 'r', encoding='utf-8') as f:
                 reader = csv.DictReader(f)
-                for row in reader:
-                    conn.execute('''
-                        INSERT INTO audit_events 
-                        (transaction_id, event_type, event_data, timestamp, user_id, details)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (
+                conn.executemany('''
+                    INSERT INTO audit_events 
+                    (transaction_id, event_type, event_data, timestamp, user_id, details)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (
+                    (
                         row.get('Transaction ID', ''),
                         row.get('Event Type', ''),
                         row.get('Event Data', '{}'),
                         row.get('Timestamp', ''),
                         row.get('User ID', ''),
                         row.get('Details', '')
-                    ))
+                    )
+                    for row in reader
+                ))
             print(f"Migrated {audit_file}")
 
         conn.commit()
@@ -2,13 +2,25 @@
 Gemini API integration for dynamic email generation.
 Generates customer notification emails while preserving backend data integrity.
 """
+import io
 import os
 import json
 import re
+import time
+import hashlib
+import threading
 import html as html_escape
-from typing import Dict, Optional
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
 from dotenv import load_dotenv
 
+from app.utils._email_fast import (
+    _clean_markdown,
+    _convert_markdown_to_html,
+    _escape_html_preserve_tags,
+)
+
 load_dotenv()
 
 try:
@@ -18,23 +30,362 @@ except ImportError:
     GEMINI_AVAILABLE = False
     print("Warning: google-generativeai not installed. Email generation will use fallback templates.")
 
+# Prefer orjson (C extension) for parsing JSON-mode responses when installed
+try:
+    import orjson
+
+    def _json_loads(text):
+        return orjson.loads(text)
+except ImportError:
+    def _json_loads(text):
+        return json.loads(text)
+
+
+# Set once genai.configure() has succeeded; later calls skip reconfiguration
+_GEMINI_CONFIGURED = False
+_GEMINI_INIT_LOCK = threading.Lock()
+
 
 def initialize_gemini() -> bool:
-    """Initialize Gemini API with credentials from environment."""
+    """
+    Initialize Gemini API with credentials from environment.
+
+    The first successful call also starts a background thread that lists the
+    available models, so the connection is warm before the first email request.
+    Nothing waits for that thread: a request that arrives first, or after the
+    prewarm failed, lists the models itself.
+    """
+    global _GEMINI_CONFIGURED
     if not GEMINI_AVAILABLE:
         return False
+    if _GEMINI_CONFIGURED:
+        return True
 
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         print("Warning: GEMINI_API_KEY not found in environment variables.")
         return False
 
+    with _GEMINI_INIT_LOCK:
+        if _GEMINI_CONFIGURED:
+            return True
+        try:
+            genai.configure(api_key=api_key)
+        except Exception as e:
+            print(f"Error initializing Gemini API: {e}")
+            return False
+        _GEMINI_CONFIGURED = True
+        threading.Thread(target=_prewarm, name="gemini-prewarm", daemon=True).start()
+    return True
+
+
+def _prewarm() -> None:
+    """Open the API connection ahead of time by listing (and caching) available models."""
     try:
-        genai.configure(api_key=api_key)
-        return True
+        _available_models()
     except Exception as e:
-        print(f"Error initializing Gemini API: {e}")
-        return False
+        print(f"Warning: Gemini prewarm failed: {e}")
+
+
+# Fallback models tried after the MODEL environment variable, in order
+_FALLBACK_MODELS = ('gemini-1.5-flash', 'gemini-1.5-pro', 'gemini-pro')
+
+# Model name resolved on first lookup, pinned for the process lifetime
+_RESOLVED_MODEL: Optional[str] = None
+
+
+def _candidate_model_names() -> List[str]:
+    """Build the ordered list of model names to try (user's model first, then fallbacks)."""
+    env_model = os.getenv("MODEL", "").strip()
+
+    model_names = []
+    if env_model:
+        # Handle both formats: "gemini/gemini-2.5-flash-lite" and "gemini-2.5-flash-lite"
+        clean_model = env_model.replace("gemini/", "").strip()
+        model_names.append(clean_model)
+        # Also try with gemini/ prefix if it wasn't there
+        if not env_model.startswith("gemini/"):
+            model_names.append(f"gemini/{clean_model}")
+    model_names.extend(_FALLBACK_MODELS)
+
+    # Remove duplicates while preserving order
+    seen = set()
+    return [m for m in model_names if not (m in seen or seen.add(m))]
+
+
+@lru_cache(maxsize=1)
+def _available_models() -> FrozenSet[str]:
+    """Names of the models supporting generateContent, listed once and cached."""
+    return frozenset(
+        m.name.replace("models/", "", 1)
+        for m in genai.list_models()
+        if 'generateContent' in getattr(m, 'supported_generation_methods', ())
+    )
+
+
+def _resolve_model() -> str:
+    """Pick the first listed candidate model with one metadata call and pin it in _RESOLVED_MODEL."""
+    global _RESOLVED_MODEL
+    model_names = _candidate_model_names()
+    try:
+        available = _available_models()
+    except Exception as e:
+        # Listing failed (permissions/network) - trust the first candidate
+        print(f"Could not list Gemini models, using {model_names[0]}: {e}")
+        _RESOLVED_MODEL = model_names[0]
+        return _RESOLVED_MODEL
+
+    for model_name in model_names:
+        if model_name in available:
+            print(f"Successfully using Gemini model: {model_name}")
+            _RESOLVED_MODEL = model_name
+            return model_name
+
+    raise Exception(
+        f"None of the available models ({', '.join(model_names)}) could be used.")
+
+
+def _invalidate_resolved_model() -> None:
+    """Forget the pinned model and the model listing so the next call re-resolves it."""
+    global _RESOLVED_MODEL
+    _RESOLVED_MODEL = None
+    _available_models.cache_clear()
+
+
+def _is_model_not_found(error: Exception) -> bool:
+    """Check whether an API error means the requested model does not exist."""
+    error_msg = str(error).lower()
+    return '404' in error_msg or 'not found' in error_msg or 'not supported' in error_msg
+
+
+def _generate_with_resolved_model(generate: Callable[[str], str]) -> Tuple[str, str]:
+    """
+    Run generate(model_name) with the pinned model, resolving it on first use.
+
+    If the pinned model reports not-found, the model is re-resolved from a fresh
+    listing and the prompt is sent once more, but only if that picks a
+    different model.
+
+    Returns:
+        (model name used, generated text)
+    """
+    model_name = _RESOLVED_MODEL or _resolve_model()
+    try:
+        return model_name, generate(model_name)
+    except Exception as e:
+        if not _is_model_not_found(e):
+            raise
+        print(f"Model {model_name} not available, re-resolving...")
+        _invalidate_resolved_model()
+        retry_model = _resolve_model()
+        if retry_model == model_name:
+            raise
+    return retry_model, generate(retry_model)
+
+
+# Responses for identical prompts, keyed by a hash of (model, prompt)
+_PROMPT_CACHE_MAX_ENTRIES = 2048
+_PROMPT_CACHE_TTL_SECONDS = 900
+_PROMPT_CACHE: "OrderedDict[bytes, Tuple[float, str]]" = OrderedDict()
+_PROMPT_CACHE_LOCK = threading.Lock()
+
+
+def _prompt_cache_key(model_name: str, prompt: str) -> bytes:
+    return hashlib.blake2b(f"{model_name}\0{prompt}".encode("utf-8"), digest_size=16).digest()
+
+
+def _generate_text(
+    model_name: str,
+    prompt: str,
+    use_cache: bool = True,
+    on_line: Optional[Callable[[str], None]] = None
+) -> str:
+    """
+    Generate text for a prompt, serving repeated prompts from the in-process cache.
+
+    Args:
+        model_name: Gemini model to call on a cache miss
+        prompt: Full prompt text
+        use_cache: If False, always call the API and do not store the result
+        on_line: If given, the response is streamed and each completed line is
+            passed to it as it arrives (not called on cache hits)
+
+    Returns:
+        Stripped response text
+    """
+    key = _prompt_cache_key(model_name, prompt)
+    if use_cache:
+        with _PROMPT_CACHE_LOCK:
+            cached = _PROMPT_CACHE.get(key)
+            if cached is not None:
+                stored_at, text = cached
+                if time.monotonic() - stored_at < _PROMPT_CACHE_TTL_SECONDS:
+                    _PROMPT_CACHE.move_to_end(key)
+                    return text
+                del _PROMPT_CACHE[key]
+
+    model = genai.GenerativeModel(model_name)
+    if on_line is None:
+        text = model.generate_content(prompt).text.strip()
+    else:
+        chunks = []
+        pending = ''
+        for chunk in model.generate_content(prompt, stream=True):
+            chunks.append(chunk.text)
+            *complete, pending = (pending + chunk.text).split('\n')
+            for line in complete:
+                on_line(line)
+        on_line(pending)
+        text = ''.join(chunks).strip()
+
+    if use_cache:
+        with _PROMPT_CACHE_LOCK:
+            _PROMPT_CACHE[key] = (time.monotonic(), text)
+            _PROMPT_CACHE.move_to_end(key)
+            while len(_PROMPT_CACHE) > _PROMPT_CACHE_MAX_ENTRIES:
+                _PROMPT_CACHE.popitem(last=False)
+    return text
+
+
+# Static email prompt skeleton; only the data values are filled in per call
+_PROMPT_DATA_SECTION = """DATA TO INCLUDE (use these values exactly):
+- Recipient Name: {recipient_name}
+- UETR: {uetr}
+- Return Amount: {return_currency} {return_amount}
+- Return Reason: {reason_info} ({reason_code})
+- FX Loss: {fx_loss}
+- Status: {status}
+- Action Required: {action_required}"""
+
+_EMAIL_PROMPT_TEMPLATE = """Generate a professional customer notification email for a payment refund investigation.
+
+REQUIREMENTS:
+- Use professional, courteous tone appropriate for banking communications
+- Preserve ALL data values exactly as provided below - do not modify or interpret them
+- Maintain consistent message intent and tone
+- Use markdown formatting for better readability:
+  * Use **bold** for field labels (e.g., **UETR:**, **Return Amount:**)
+  * Use bullet points (*) for transaction details list
+  * Use **Action Required:** as a bold header for action sections
+{variation_instruction}
+
+""" + _PROMPT_DATA_SECTION + """
+
+EMAIL STRUCTURE:
+1. Professional greeting addressing the customer by name
+2. Brief explanation of the refund investigation
+3. Transaction details in a bulleted list format with bold labels:
+   * **UETR:** [value]
+   * **Return Amount:** [value]
+   * **Return Reason:** [value]
+   * **FX Loss:** [value]
+   * **Status:** [value]
+4. Action required section with **Action Required:** as bold header (if applicable)
+5. Closing with contact information offer
+6. Professional signature: "CBA Refund Investigations Team"
+
+FORMATTING GUIDELINES:
+- Use **text** for bold formatting (field labels, headers)
+- Use * at the start of lines for bullet points
+- Ensure all numerical values, codes, and references are included exactly as provided
+- Use proper line breaks between sections"""
+
+_VARIATION_INSTRUCTION = (
+    "Use varied phrasing and layout while maintaining the exact same meaning, "
+    "tone, and all data values."
+)
+
+# Structured variant: Gemini returns JSON parts and HTML is assembled locally
+_STRUCTURED_EMAIL_PROMPT_TEMPLATE = """Generate a professional customer notification email for a payment refund investigation.
+
+REQUIREMENTS:
+- Use professional, courteous tone appropriate for banking communications
+- Preserve ALL data values exactly as provided below - do not modify or interpret them
+- Maintain consistent message intent and tone
+- Use plain text only inside the JSON values (no markdown, no HTML)
+{variation_instruction}
+
+""" + _PROMPT_DATA_SECTION + """
+
+OUTPUT FORMAT:
+Respond with a single JSON object and nothing else (no code fences), using exactly these keys:
+{{"greeting": "...", "intro": "...", "bullets": ["..."], "action": "...", "closing": "..."}}
+- greeting: greeting addressing the customer by name
+- intro: brief explanation of the refund investigation
+- bullets: transaction details as "Label: value" for UETR, Return Amount, Return Reason, FX Loss and Status
+- action: the action required, or an empty string if none
+- closing: closing sentence offering contact information
+Do not include a signature; it is added automatically."""
+
+_EMAIL_SIGNATURE = "CBA Refund Investigations Team"
+
+
+def _prerender_prompts(template: str) -> Dict[bool, str]:
+    """Pre-render a prompt template per variation mode, leaving only the data slots to format."""
+    return {
+        mode: template.replace(
+            "{variation_instruction}", _VARIATION_INSTRUCTION if mode else "")
+        for mode in (False, True)
+    }
+
+
+_EMAIL_PROMPTS = _prerender_prompts(_EMAIL_PROMPT_TEMPLATE)
+_STRUCTURED_EMAIL_PROMPTS = _prerender_prompts(_STRUCTURED_EMAIL_PROMPT_TEMPLATE)
+
+_CODE_FENCE_RE = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+
+def _structured_output_enabled() -> bool:
+    """Structured (JSON) email output is opt-in via GEMINI_EMAIL_FORMAT=structured."""
+    return os.getenv("GEMINI_EMAIL_FORMAT", "").strip().lower() == "structured"
+
+
+def _render_label_value(item: str) -> str:
+    """Escape a "Label: value" bullet, bolding the label."""
+    label, sep, value = item.partition(':')
+    if not sep:
+        return html_escape.escape(item)
+    return f'<strong>{html_escape.escape(label)}:</strong>{html_escape.escape(value)}'
+
+
+def _render_structured_email(payload: Dict) -> Tuple[str, str]:
+    """
+    Build the plain-text and HTML bodies from a structured Gemini reply.
+
+    Args:
+        payload: Parsed JSON with greeting, intro, bullets, action and closing
+
+    Returns:
+        Tuple of (plain text body, HTML body)
+    """
+    greeting = str(payload.get("greeting") or "").strip()
+    intro = str(payload.get("intro") or "").strip()
+    bullets = [str(b).strip() for b in payload.get("bullets") or [] if str(b).strip()]
+    action = str(payload.get("action") or "").strip()
+    closing = str(payload.get("closing") or "").strip()
+    if not greeting or not bullets:
+        raise ValueError("Structured email response is missing greeting or bullets")
+
+    text_sections = [greeting, intro, '\n'.join(f'* {b}' for b in bullets)]
+    if action:
+        text_sections.append(f'Action Required: {action}')
+    text_sections += [closing, f'Sincerely,\n{_EMAIL_SIGNATURE}']
+    plain_body = '\n\n'.join(section for section in text_sections if section)
+
+    html_sections = [f'<p>{html_escape.escape(greeting)}</p>']
+    if intro:
+        html_sections.append(f'<p>{html_escape.escape(intro)}</p>')
+    html_sections.append(
+        '<ul>' + ''.join(f'<li>{_render_label_value(b)}</li>' for b in bullets) + '</ul>')
+    if action:
+        html_sections.append(_render_action([
+            '<div style="font-weight:700;margin-bottom:4px">Action Required</div>',
+            f'<div>{html_escape.escape(action)}</div>',
+        ]))
+    if closing:
+        html_sections.append(f'<p>{html_escape.escape(closing)}</p>')
+    html_sections.append(f'<p>Sincerely, {_EMAIL_SIGNATURE}</p>')
+    return plain_body, ''.join(html_sections)
 
 
 def generate_customer_email(
@@ -77,119 +428,56 @@ def generate_customer_email(
         )
 
     try:
+        structured = _structured_output_enabled()
+        prompts = _STRUCTURED_EMAIL_PROMPTS if structured else _EMAIL_PROMPTS
+
         # Build the prompt with strict data preservation instructions
-        variation_instruction = (
-            "Use varied phrasing and layout while maintaining the exact same meaning, "
-            "tone, and all data values." if variation_mode else ""
+        prompt = prompts[bool(variation_mode)].format(
+            recipient_name=recipient_name,
+            uetr=uetr,
+            return_currency=return_currency,
+            return_amount=return_amount,
+            reason_info=reason_info,
+            reason_code=reason_code if reason_code else 'N/A',
+            fx_loss='AUD ' + format(fx_loss_aud, '.2f') if fx_loss_aud is not None else 'N/A',
+            status=status,
+            action_required=action_required,
         )
 
-        prompt = f"""Generate a professional customer notification email for a payment refund investigation.
-
-REQUIREMENTS:
-- Use professional, courteous tone appropriate for banking communications
-- Preserve ALL data values exactly as provided below - do not modify or interpret them
-- Maintain consistent message intent and tone
-- Use markdown formatting for better readability:
-  * Use **bold** for field labels (e.g., **UETR:**, **Return Amount:**)
-  * Use bullet points (*) for transaction details list
-  * Use **Action Required:** as a bold header for action sections
-{variation_instruction}
-
-DATA TO INCLUDE (use these values exactly):
-- Recipient Name: {recipient_name}
-- UETR: {uetr}
-- Return Amount: {return_currency} {return_amount}
-- Return Reason: {reason_info} ({reason_code if reason_code else 'N/A'})
-- FX Loss: {'AUD ' + format(fx_loss_aud, '.2f') if fx_loss_aud is not None else 'N/A'}
-- Status: {status}
-- Action Required: {action_required}
-
-EMAIL STRUCTURE:
-1. Professional greeting addressing the customer by name
-2. Brief explanation of the refund investigation
-3. Transaction details in a bulleted list format with bold labels:
-   * **UETR:** [value]
-   * **Return Amount:** [value]
-   * **Return Reason:** [value]
-   * **FX Loss:** [value]
-   * **Status:** [value]
-4. Action required section with **Action Required:** as bold header (if applicable)
-5. Closing with contact information offer
-6. Professional signature: "CBA Refund Investigations Team"
-
-FORMATTING GUIDELINES:
-- Use **text** for bold formatting (field labels, headers)
-- Use * at the start of lines for bullet points
-- Ensure all numerical values, codes, and references are included exactly as provided
-- Use proper line breaks between sections"""
-
-        # Generate content using Gemini
-        # Get model name from environment variable, with fallbacks
-        env_model = os.getenv("MODEL", "").strip()
-
-        # Build list of models to try (user's model first, then fallbacks)
-        model_names = []
-        if env_model:
-            # Handle both formats: "gemini/gemini-2.5-flash-lite" and "gemini-2.5-flash-lite"
-            clean_model = env_model.replace("gemini/", "").strip()
-            model_names.append(clean_model)
-            # Also try with gemini/ prefix if it wasn't there
-            if not env_model.startswith("gemini/"):
-                model_names.append(f"gemini/{clean_model}")
-
-        # Add fallback models
-        model_names.extend(
-            ['gemini-1.5-flash', 'gemini-1.5-pro', 'gemini-pro'])
-
-        # Remove duplicates while preserving order
-        seen = set()
-        model_names = [m for m in model_names if not (
-            m in seen or seen.add(m))]
-
-        model = None
-        response = None
-        last_error = None
-
-        for model_name in model_names:
-            try:
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(prompt)
-                # If we get here, the model worked
-                print(f"Successfully using Gemini model: {model_name}")
-                break
-            except Exception as e:
-                error_msg = str(e)
-                last_error = e
-                # If it's a 404 or model not found, try next model
-                if '404' in error_msg or 'not found' in error_msg.lower() or 'not supported' in error_msg.lower():
-                    print(f"Model {model_name} not available, trying next...")
-                    continue
-                else:
-                    # For other errors, re-raise
-                    print(f"Error with model {model_name}: {error_msg}")
-                    raise
-
-        if not response:
-            error_detail = f"Last error: {str(last_error)}" if last_error else "No models available"
-            raise Exception(
-                f"None of the available models ({', '.join(model_names)}) could be used. {error_detail}")
-
-        email_body = response.text.strip()
-
-        # Remove subject line if it was included in the body (some models include it)
-        # Check if the body starts with "Subject:" and remove that line
-        if email_body.startswith("Subject:"):
-            lines = email_body.split('\n', 1)
-            if len(lines) > 1:
-                email_body = lines[1].strip()
-
-        # Also check for subject in the first few lines
-        lines = email_body.split('\n')
-        if len(lines) > 0 and lines[0].strip().startswith("Subject:"):
-            email_body = '\n'.join(lines[1:]).strip()
-
-        # Note: We'll convert markdown to HTML in _convert_to_html
-        # This preserves formatting like **bold** and converts them to <strong> tags
+        # Variation mode wants fresh wording, so it never reads from the prompt cache
+        use_cache = not variation_mode
+        # Markdown body lines are rendered to HTML while generation continues;
+        # structured JSON can only be used once complete, so it is not streamed
+        renderer = _EmailHtmlRenderer()
+
+        def generate_body(model_name: str) -> str:
+            nonlocal renderer
+            # Each attempt starts a fresh rendering of the streamed lines
+            renderer = _EmailHtmlRenderer()
+            return _generate_text(
+                model_name, prompt, use_cache,
+                None if structured else _skip_subject_lines(renderer.feed))
+
+        # Generate content using Gemini with the model pinned for this process
+        model_name, email_body = _generate_with_resolved_model(generate_body)
+
+        html_body = None
+        if structured:
+            # Assemble both bodies from the JSON parts - no markdown parsing needed
+            payload = _json_loads(_CODE_FENCE_RE.sub('', email_body))
+            email_body, html_body = _render_structured_email(payload)
+        else:
+            # Remove subject line if it was included in the body (some models include it)
+            # Check if the body starts with "Subject:" and remove that line
+            if email_body.startswith("Subject:"):
+                lines = email_body.split('\n', 1)
+                if len(lines) > 1:
+                    email_body = lines[1].strip()
+
+            # Also check for subject in the first few lines
+            lines = email_body.split('\n')
+            if len(lines) > 0 and lines[0].strip().startswith("Subject:"):
+                email_body = '\n'.join(lines[1:]).strip()
 
         # Generate subject line using the same model
         subject_prompt = f"""Generate a concise, professional email subject line for a refund investigation notification.
@@ -202,8 +490,8 @@ Context:
 Generate only the subject line as plain text (no "Subject:" prefix, no markdown, no quotes, max 80 characters)."""
 
         try:
-            subject_response = model.generate_content(subject_prompt)
-            subject = subject_response.text.strip().replace('Subject:', '').strip()
+            subject = _generate_text(model_name, subject_prompt, use_cache)
+            subject = subject.replace('Subject:', '').strip()
         except Exception:
             # Fallback subject if generation fails
             subject = f"Refund Status – Action Required for Transaction UETR {uetr}"
@@ -214,10 +502,10 @@ Generate only the subject line as plain text (no "Subject:" prefix, no markdown,
         if len(subject) > 80:
             subject = f"Refund Status – Action Required for Transaction UETR {uetr}"
 
-        # Convert plain text body to HTML for better display
-        # Always convert to HTML (we cleaned markdown, so it should be plain text now)
-        html_body = _convert_to_html(
-            email_body, recipient_name, recipient_email, uetr)
+        if html_body is None:
+            # Use the HTML rendered while streaming; cache hits feed no lines, so convert here
+            html_body = renderer.close() or _convert_to_html(
+                email_body, recipient_name, recipient_email, uetr)
 
         # Ensure html_body is not empty
         if not html_body or not html_body.strip():
@@ -284,241 +572,167 @@ CBA Refund Investigations Team"""
     }
 
 
-def _clean_markdown(text: str) -> str:
-    """Remove markdown formatting symbols from text and convert to plain text."""
-    if not text:
-        return text
+# Line classes assigned by _classify_line before HTML emission
+_LINE_BLANK, _LINE_LIST, _LINE_ACTION, _LINE_SIGN_OFF, _LINE_TEXT = range(5)
 
-    # Remove markdown bold (**text** or __text__) - keep the text, we'll handle bold in HTML conversion
-    # For now, just remove the markers but preserve the text content
-    text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)
-    text = re.sub(r'__(.+?)__', r'\1', text)
+_BULLET_MARKER_RE = re.compile(r'^\s*[-*+]\s+')
+_NUMBER_MARKER_RE = re.compile(r'^\s*\d+\.\s+')
+_ACTION_REQUIRED_RE = re.compile(r'Action Required', re.IGNORECASE)
+_ACTION_HEADER_BOLD_RE = re.compile(r'\*\*Action Required:\*\*', re.IGNORECASE)
+_ACTION_HEADER_RE = re.compile(r'Action Required:', re.IGNORECASE)
+_SIGN_OFF_PREFIXES = ('Sincerely', 'Best regards', 'CBA Refund')
 
-    # Remove markdown italic (*text* or _text_) - keep the text
-    text = re.sub(r'(?<!\*)\*(?!\*)([^*]+?)(?<!\*)\*(?!\*)', r'\1', text)
-    text = re.sub(r'(?<!_)_(?!_)([^_]+?)(?<!_)_(?!_)', r'\1', text)
+_ACTION_BOX_STYLE = 'margin:14px 0;padding:12px 14px;border-radius:10px;background:#fff3cd;border:1px solid #ffe69c;color:#7a5b00'
 
-    # Remove markdown code blocks (`text`)
-    text = re.sub(r'`([^`]+?)`', r'\1', text)
 
-    # Remove markdown headers (# Header)
-    text = re.sub(r'^#+\s+', '', text, flags=re.MULTILINE)
+def _classify_line(line: str) -> int:
+    """Tag a raw line as blank, list item, action header, sign-off or text."""
+    line_stripped = line.strip()
+    if not line_stripped:
+        return _LINE_BLANK
+    # List markers are checked BEFORE markdown conversion (* item, - item, 1. item)
+    if _BULLET_MARKER_RE.match(line) or _NUMBER_MARKER_RE.match(line):
+        return _LINE_LIST
+    if _ACTION_REQUIRED_RE.search(line):
+        return _LINE_ACTION
+    if line_stripped.startswith(_SIGN_OFF_PREFIXES):
+        return _LINE_SIGN_OFF
+    return _LINE_TEXT
 
-    # Handle markdown lists - convert to plain text with line breaks
-    # Bullet lists (* item, - item, + item) - remove markers but keep text
-    text = re.sub(r'^\s*[-*+]\s+', '', text, flags=re.MULTILINE)
-    # Numbered lists (1. item, 2. item) - remove markers but keep text
-    text = re.sub(r'^\s*\d+\.\s+', '', text, flags=re.MULTILINE)
 
-    # Remove markdown links [text](url) -> text
-    text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
+def _render_inline(text: str) -> str:
+    """Convert inline markdown to HTML, then escape while preserving our tags."""
+    return _escape_html_preserve_tags(_convert_markdown_to_html(text))
 
-    # Remove horizontal rules
-    text = re.sub(r'^[-*_]{3,}$', '', text, flags=re.MULTILINE)
 
-    return text.strip()
+def _render_paragraph(parts: List[str]) -> str:
+    return f'<p>{_render_inline(" ".join(parts))}</p>'
 
 
-def _convert_markdown_to_html(text: str) -> str:
-    """Convert markdown-formatted text to HTML, preserving formatting."""
-    # Handle bold text (**text** or __text__) - non-greedy match
-    text = re.sub(r'\*\*([^*]+?)\*\*', r'<strong>\1</strong>', text)
-    text = re.sub(r'__([^_]+?)__', r'<strong>\1</strong>', text)
+def _render_list(items: List[str]) -> str:
+    return '<ul>' + ''.join(f'<li>{_render_inline(item)}</li>' for item in items) + '</ul>'
 
-    # Handle italic text (*text* or _text_) - but avoid conflicts with bold
-    # Only match single * if not part of **
-    text = re.sub(r'(?<!\*)\*([^*]+?)\*(?!\*)', r'<em>\1</em>', text)
-    text = re.sub(r'(?<!_)_([^_]+?)_(?!_)', r'<em>\1</em>', text)
 
-    # Handle inline code (`text`)
-    text = re.sub(r'`([^`]+?)`', r'<code>\1</code>', text)
+def _render_action(action_lines: List[str]) -> str:
+    return f'<div style="{_ACTION_BOX_STYLE}">{"".join(action_lines)}</div>'
 
-    # Convert markdown list items (* item, - item) to HTML list items
-    # But we'll handle this in the paragraph processing to preserve structure
 
-    return text
+class _EmailHtmlRenderer:
+    """
+    Incremental markdown-ish text to HTML converter.
 
+    Lines can be fed one at a time as they arrive (e.g. from a streamed Gemini
+    response); close() flushes any open list, paragraph or action section.
+    """
 
-def _convert_to_html(
-    plain_text: str,
-    recipient_name: str,
-    recipient_email: str,
-    uetr: str
-) -> str:
-    """Convert plain text email to HTML format, handling markdown-like formatting."""
-    # Split into lines first to identify list items before markdown conversion
-    lines = plain_text.split('\n')
-    html_paragraphs = []
-    current_paragraph = []
-    current_list_items = []
-    in_action_section = False
-    action_lines = []
-
-    for line in lines:
+    def __init__(self) -> None:
+        self.out = io.StringIO()
+        self.current_paragraph: List[str] = []
+        self.current_list_items: List[str] = []
+        self.in_action_section = False
+        self.action_lines: List[str] = []
+
+    def _flush_paragraph(self) -> None:
+        if self.current_paragraph:
+            self.out.write(_render_paragraph(self.current_paragraph))
+            self.current_paragraph.clear()
+
+    def _flush_list(self) -> None:
+        if self.current_list_items:
+            self.out.write(_render_list(self.current_list_items))
+            self.current_list_items.clear()
+
+    def _flush_action(self) -> None:
+        if self.action_lines:
+            self.out.write(_render_action(self.action_lines))
+            self.action_lines.clear()
+
+    def feed(self, line: str) -> None:
+        kind = _classify_line(line)
         line_stripped = line.strip()
 
-        # Check if this is a list item (starts with *, -, +, or number) BEFORE markdown conversion
-        is_list_item = bool(
-            re.match(r'^\s*[-*+]\s+', line) or re.match(r'^\s*\d+\.\s+', line))
-
-        # Skip empty lines (they separate paragraphs/lists)
-        if not line_stripped:
-            # Finish current list if any
-            if current_list_items:
-                # Convert markdown in each list item, then escape
-                list_items_html = []
-                for item in current_list_items:
-                    # Convert markdown to HTML first
-                    item_html = _convert_markdown_to_html(item)
-                    # Then escape while preserving HTML tags
-                    item_html = _escape_html_preserve_tags(item_html)
-                    list_items_html.append(f'<li>{item_html}</li>')
-                list_html = '<ul>' + ''.join(list_items_html) + '</ul>'
-                html_paragraphs.append(list_html)
-                current_list_items = []
-
-            # Finish current paragraph if any
-            if current_paragraph:
-                para_text = ' '.join(current_paragraph)
-                # Convert markdown to HTML, then escape
-                para_text = _convert_markdown_to_html(para_text)
-                para_text = _escape_html_preserve_tags(para_text)
-                html_paragraphs.append(f'<p>{para_text}</p>')
-                current_paragraph = []
-            continue
-
-        # Handle list items - extract content BEFORE markdown conversion
-        if is_list_item:
-            # Finish any current paragraph
-            if current_paragraph:
-                para_text = ' '.join(current_paragraph)
-                para_text = _convert_markdown_to_html(para_text)
-                para_text = _escape_html_preserve_tags(para_text)
-                html_paragraphs.append(f'<p>{para_text}</p>')
-                current_paragraph = []
-
-            # Remove list marker and add to list (content will be converted to HTML later)
-            list_content = re.sub(r'^\s*[-*+]\s+', '', line_stripped)
-            list_content = re.sub(r'^\s*\d+\.\s+', '', list_content)
-            current_list_items.append(list_content)
-            continue
-        else:
-            # If we were in a list, finish it
-            if current_list_items:
-                list_items_html = []
-                for item in current_list_items:
-                    item_html = _convert_markdown_to_html(item)
-                    item_html = _escape_html_preserve_tags(item_html)
-                    list_items_html.append(f'<li>{item_html}</li>')
-                list_html = '<ul>' + ''.join(list_items_html) + '</ul>'
-                html_paragraphs.append(list_html)
-                current_list_items = []
-
-        # Check for "Action Required" section (before markdown conversion)
-        # Check the original line for "Action Required" pattern
-        if re.search(r'Action Required', line, re.IGNORECASE):
-            # Finish any current paragraph
-            if current_paragraph:
-                para_text = ' '.join(current_paragraph)
-                para_text = _convert_markdown_to_html(para_text)
-                para_text = _escape_html_preserve_tags(para_text)
-                html_paragraphs.append(f'<p>{para_text}</p>')
-                current_paragraph = []
-
-            in_action_section = True
+        # Anything other than another list item closes the current list
+        if kind != _LINE_LIST:
+            self._flush_list()
+
+        # Empty lines separate paragraphs/lists
+        if kind == _LINE_BLANK:
+            self._flush_paragraph()
+            return
+
+        if kind == _LINE_LIST:
+            self._flush_paragraph()
+            # Remove list marker; content is converted to HTML when the list closes
+            list_content = _BULLET_MARKER_RE.sub('', line_stripped)
+            list_content = _NUMBER_MARKER_RE.sub('', list_content)
+            self.current_list_items.append(list_content)
+            return
+
+        if kind == _LINE_ACTION:
+            self._flush_paragraph()
+            self.in_action_section = True
             # Extract action header - remove "Action Required:" or "**Action Required:**" etc.
-            # Remove markdown bold markers first, then extract the header
-            action_header = re.sub(
-                r'\*\*Action Required:\*\*', '', line_stripped, flags=re.IGNORECASE)
-            action_header = re.sub(r'Action Required:',
-                                   '', action_header, flags=re.IGNORECASE)
-            action_header = action_header.strip()
-            # Convert markdown to HTML for the header
-            action_header = _convert_markdown_to_html(action_header)
-            action_header = _escape_html_preserve_tags(action_header)
+            action_header = _ACTION_HEADER_BOLD_RE.sub('', line_stripped)
+            action_header = _ACTION_HEADER_RE.sub('', action_header).strip()
+            action_header = _render_inline(action_header)
             # Use "Action Required" as header if nothing was extracted
             if not action_header:
                 action_header = "Action Required"
-            action_lines = [
+            self.action_lines = [
                 f'<div style="font-weight:700;margin-bottom:4px">{action_header}</div>']
-            continue
-
-        # Check if we're ending action section (signature or closing)
-        if in_action_section and (line_stripped.startswith('Sincerely') or line_stripped.startswith('Best regards') or line_stripped.startswith('CBA Refund')):
-            # Close action section
-            if action_lines:
-                action_html = ''.join(action_lines)
-                html_paragraphs.append(
-                    f'<div style="margin:14px 0;padding:12px 14px;border-radius:10px;background:#fff3cd;border:1px solid #ffe69c;color:#7a5b00">{action_html}</div>'
-                )
-                action_lines = []
-            in_action_section = False
-
-        # Add line to appropriate section
-        if in_action_section:
-            escaped_line = _convert_markdown_to_html(line_stripped)
-            escaped_line = _escape_html_preserve_tags(escaped_line)
-            action_lines.append(f'<div>{escaped_line}</div>')
+            return
+
+        # Signature or closing ends the action section
+        if kind == _LINE_SIGN_OFF and self.in_action_section:
+            self._flush_action()
+            self.in_action_section = False
+
+        if self.in_action_section:
+            self.action_lines.append(f'<div>{_render_inline(line_stripped)}</div>')
         else:
-            current_paragraph.append(line_stripped)
-
-    # Finish any remaining list
-    if current_list_items:
-        list_items_html = []
-        for item in current_list_items:
-            item_html = _convert_markdown_to_html(item)
-            item_html = _escape_html_preserve_tags(item_html)
-            list_items_html.append(f'<li>{item_html}</li>')
-        list_html = '<ul>' + ''.join(list_items_html) + '</ul>'
-        html_paragraphs.append(list_html)
-        current_list_items = []
-
-    # Finish any remaining paragraph
-    if current_paragraph:
-        para_text = ' '.join(current_paragraph)
-        para_text = _convert_markdown_to_html(para_text)
-        para_text = _escape_html_preserve_tags(para_text)
-        html_paragraphs.append(f'<p>{para_text}</p>')
-
-    # Finish any remaining action section
-    if action_lines:
-        action_html = ''.join(action_lines)
-        html_paragraphs.append(
-            f'<div style="margin:14px 0;padding:12px 14px;border-radius:10px;background:#fff3cd;border:1px solid #ffe69c;color:#7a5b00">{action_html}</div>'
-        )
+            self.current_paragraph.append(line_stripped)
 
-    # If no paragraphs were created, create a simple one
-    if not html_paragraphs:
-        converted_text = _convert_markdown_to_html(plain_text)
-        escaped_text = _escape_html_preserve_tags(converted_text)
-        html_paragraphs.append(
-            f'<p>{escaped_text.replace(chr(10), "<br>")}</p>')
-
-    return ''.join(html_paragraphs)
-
-
-def _escape_html_preserve_tags(text: str) -> str:
-    """Escape HTML special characters but preserve HTML tags we added (like <strong>, <em>, etc.)."""
-    # First, protect our HTML tags
-    protected_tags = {
-        '<strong>': '___STRONG_OPEN___',
-        '</strong>': '___STRONG_CLOSE___',
-        '<em>': '___EM_OPEN___',
-        '</em>': '___EM_CLOSE___',
-        '<code>': '___CODE_OPEN___',
-        '</code>': '___CODE_CLOSE___',
-    }
+    def close(self) -> str:
+        """Finish any remaining list, paragraph and action section and return the HTML."""
+        self._flush_list()
+        self._flush_paragraph()
+        self._flush_action()
+        return self.out.getvalue()
 
-    # Replace tags with placeholders
-    for tag, placeholder in protected_tags.items():
-        text = text.replace(tag, placeholder)
 
-    # Escape HTML
-    text = html_escape.escape(text)
+def _skip_subject_lines(feed: Callable[[str], None]) -> Callable[[str], None]:
+    """Wrap a line consumer so leading "Subject:" lines (some models include them) are dropped."""
+    state = {"leading": True, "skipped": 0}
 
-    # Restore tags
-    reverse_map = {v: k for k, v in protected_tags.items()}
-    for placeholder, tag in reverse_map.items():
-        text = text.replace(placeholder, tag)
+    def consume(line: str) -> None:
+        if state["leading"]:
+            line_stripped = line.strip()
+            if not line_stripped:
+                return
+            if line_stripped.startswith("Subject:") and state["skipped"] < 2:
+                state["skipped"] += 1
+                return
+            state["leading"] = False
+        feed(line)
 
-    return text
+    return consume
+
+
+def _convert_to_html(
+    plain_text: str,
+    recipient_name: str,
+    recipient_email: str,
+    uetr: str
+) -> str:
+    """Convert plain text email to HTML format, handling markdown-like formatting."""
+    renderer = _EmailHtmlRenderer()
+    for line in plain_text.split('\n'):
+        renderer.feed(line)
+    html_body = renderer.close()
+
+    # If no paragraphs were created, create a simple one
+    if not html_body:
+        escaped_text = _render_inline(plain_text)
+        html_body = f'<p>{escaped_text.replace(chr(10), "<br>")}</p>'
+
+    return html_body
@@ -1,11 +1,23 @@
-from typing import Dict
+from typing import Dict, List
 
 # Placeholder. In real integration, query SWIFT or internal datastore.
 
+_SENT_SUFFIXES = frozenset("02468")
+
 
 def get_mt103_status(uetr: str) -> Dict:
     # Simulate: if uetr endswith certain char, mark as sent
     if not uetr:
         return {"available": False}
-    status = "SENT" if uetr[-1] in "02468" else "NULL_AND_VOID"
+    status = "SENT" if uetr[-1] in _SENT_SUFFIXES else "NULL_AND_VOID"
     return {"available": True, "status": status}
+
+
+def get_mt103_status_batch(uetrs: List[str]) -> List[Dict]:
+    """Look up MT103 status for many UETRs in one call, preserving input order."""
+    sent = _SENT_SUFFIXES
+    return [
+        {"available": True, "status": "SENT" if u[-1] in sent else "NULL_AND_VOID"}
+        if u else {"available": False}
+        for u in uetrs
+    ]
@@ -14,13 +14,20 @@ REASON_MAP = {
 }
 
 
-def analyze_return_reason(code: str, addtl: str | None = None) -> Dict:
-    info = REASON_MAP.get(
-        code or "", {"label": "Unknown", "next": "manual_review", "auto_refund": False})
-    return {
+# Flattened analysis per known code, built once since REASON_MAP is static
+_FLAT_REASONS = {
+    code: {
         "code": code,
         "label": info["label"],
         "action": info["next"],
         "auto_refund_eligible": info.get("auto_refund", False),
-        "details": addtl
     }
+    for code, info in REASON_MAP.items()
+}
+_UNKNOWN_REASON = {"code": None, "label": "Unknown",
+                   "action": "manual_review", "auto_refund_eligible": False}
+
+
+def analyze_return_reason(code: str, addtl: str | None = None) -> Dict:
+    base = _FLAT_REASONS.get(code or "", _UNKNOWN_REASON)
+    return {**base, "code": code, "details": addtl}
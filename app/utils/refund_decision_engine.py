@@ -3,7 +3,8 @@ Refund Decision Engine
 Implements the complete decision tree from refund_flow_.md using CSV-based operations.
 """
 
-from typing import Dict, List, Optional, Any, Tuple
+import logging
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from datetime import datetime
 from dataclasses import dataclass
 from enum import Enum
@@ -11,6 +12,9 @@ from enum import Enum
 from app.utils.csv_reconciliation import csv_reconciliation_engine
 from app.utils.debit_authority import debit_authority_manager
 from app.utils.csv_store import load_accounts_csv, suggest_alternate_active
+from app.utils._accounts_index import build_indices
+
+logger = logging.getLogger(__name__)
 
 
 class DecisionNode(Enum):
@@ -26,7 +30,24 @@ class DecisionNode(Enum):
     D9_VALID_EMAIL = "D9"
 
 
-@dataclass
+# Node -> audit value, avoiding enum .value descriptor lookups per hop
+_NODE_VALUE = {node: node.value for node in DecisionNode}
+
+# Markets routing for D5/D8; the POC treats every refund as a non-Markets case
+MARKETS_ENABLED = False
+
+# Actions that end the decision traversal
+TERMINAL_ACTIONS = frozenset({'SUBMIT_CASE_TO_CLOSED', 'FUNDS_IN_OB'})
+
+# Field order of the tuples recorded during processing; rows become dicts once per refund
+_DECISION_FIELDS = ('timestamp', 'type', 'node', 'decision', 'reason', 'next_node')
+_ACTION_FIELDS = ('timestamp', 'type', 'action', 'description')
+_OPERATION_FIELDS = ('operation_type', 'account_number', 'account_name', 'account_type',
+                     'currency', 'amount', 'balance_before', 'balance_after',
+                     'reason', 'reference', 'uetr')
+
+
+@dataclass(frozen=True, slots=True)
 class DecisionResult:
     """Result of a decision node."""
     node: DecisionNode
@@ -34,18 +55,56 @@ class DecisionResult:
     reason: str
     next_node: Optional[DecisionNode] = None
     action_taken: Optional[str] = None
-    data: Optional[Dict] = None
+    nostro_result: Optional[Any] = None  # ReconciliationResult from D2/D4
+
+
+@dataclass(slots=True)
+class P004View:
+    """PACS.004 fields used by the account actions, parsed once per refund."""
+    e2e: str  # OrgnlEndToEndId, also the return reference
+    uetr: str
+    amount: float
+    currency: str
+
+
+# Results of the Markets nodes when Markets routing is off; they never vary, so
+# the same (frozen) instances are returned every time
+_D5_RESULT_NO = DecisionResult(
+    node=DecisionNode.D5_MARKETS,
+    decision=False,
+    reason="Markets case (POC default: NO)",
+    next_node=DecisionNode.D8_MARKETS_FINAL,
+    action_taken="SEND_REFUND_DAILY_LIST"
+)
+_D8_RESULT_NO = DecisionResult(
+    node=DecisionNode.D8_MARKETS_FINAL,
+    decision=False,
+    reason="Markets case (POC default: NO)",
+    next_node=DecisionNode.D9_VALID_EMAIL
+)
+
+
+@dataclass(slots=True)
+class DecisionContext:
+    """Per-refund inputs shared by every decision node."""
+    p004_data: Dict
+    p008_data: Dict
+    customers_csv_path: str
+    view: P004View
+    reason: str
+    reason_info: str
+    creditor_agent_bic: str
 
 
-@dataclass
+@dataclass(slots=True)
 class RefundProcessingResult:
     """Complete result of refund processing."""
     success: bool
     decision_path: List[DecisionResult]
-    final_action: str
+    final_action: Optional[str]
     accounts_affected: List[Dict]
-    account_operations: List[Dict] = None
-    audit_trail: List[Dict] = None
+    account_operations: Optional[List[Dict]] = None
+    audit_trail: Optional[List[Dict]] = None
     error: Optional[str] = None
 
 
@@ -55,9 +114,39 @@ class RefundDecisionEngine:
     def __init__(self, data_dir: str = "data"):
         self.data_dir = data_dir
         self.decision_path: List[DecisionResult] = []
-        self.audit_trail: List[Dict] = []
+        # Recorded as tuples while processing, converted to result dicts by _materialize_audit
+        self.audit_trail: List[tuple] = []
         self.accounts_affected: List[Dict] = []
-        self.account_operations: List[Dict] = []
+        self.account_operations: List[tuple] = []
+        self._accounts_cache: Optional[List[Dict]] = None
+        self._accounts_by_number: Dict[str, Dict] = {}
+        self._nostro_by_ccy: Dict[str, List[Dict]] = {}
+        self._nostro_ccy_cache: Dict[str, Optional[str]] = {}
+        # Timestamp shared by every audit entry logged during the current decision hop
+        self._tick_ts: Optional[str] = None
+        # Set by _submit_case_to_closed, the only way a refund completes successfully
+        self._closed: bool = False
+        # Bank account balance updates, written to bank_accounts.csv once per refund
+        self._pending_updates: List[Tuple[str, float, str]] = []
+
+        # Decision node -> handler, so each hop is a single dict lookup
+        self._handlers: Dict[DecisionNode, Callable[[DecisionContext], DecisionResult]] = {
+            DecisionNode.D1_FOREIGN_CURRENCY: lambda ctx: self._d1_foreign_currency(ctx.view.currency),
+            DecisionNode.D2_NOSTRO_FOUND: lambda ctx: self._d2_nostro_found(
+                ctx.view.e2e, ctx.view.uetr, ctx.view.amount, ctx.view.currency),
+            DecisionNode.D3_FCA_REFUND: lambda ctx: self._d3_fca_refund(
+                ctx.view, ctx.p008_data, ctx.customers_csv_path),
+            DecisionNode.D4_NOSTRO_FOUND_AFTER_SCR: lambda ctx: self._d4_nostro_found_after_scr(
+                ctx.view.e2e, ctx.view.uetr, ctx.view.amount, ctx.view.currency),
+            DecisionNode.D5_MARKETS: lambda ctx: self._d5_markets(),
+            DecisionNode.D6_VOSTRO_AUTHORITY: lambda ctx: self._d6_vostro_authority(
+                ctx.creditor_agent_bic, ctx.view.currency, ctx.view.amount, ctx.view.e2e,
+                ctx.view.uetr, ctx.reason_info),
+            DecisionNode.D7_BRANCH_PAYMENT: lambda ctx: self._d7_branch_payment(
+                ctx.p004_data, ctx.p008_data, ctx.view),
+            DecisionNode.D8_MARKETS_FINAL: lambda ctx: self._d8_markets_final(),
+            DecisionNode.D9_VALID_EMAIL: lambda ctx: self._d9_valid_email(ctx.p004_data),
+        }
 
     def process_refund(self, p004_data: Dict, p008_data: Dict, customers_csv_path: str = "data/customer_data.csv") -> RefundProcessingResult:
         """Process refund following the complete decision tree."""
@@ -67,100 +156,86 @@ class RefundDecisionEngine:
             self.audit_trail = []
             self.accounts_affected = []
             self.account_operations = []
-
-            # Extract key data
-            return_reference = p004_data.get('e2e', '')  # OrgnlEndToEndId
-            uetr = p004_data.get('uetr', '')
-            amount = float(p004_data.get('rtr_amount', 0))
-            currency = p004_data.get('rtr_ccy', '')
-            reason = p004_data.get('rsn', '')
-            reason_info = p004_data.get('rsn_info', '')
-            creditor_agent_bic = self._extract_creditor_agent_bic(p004_data)
+            self._accounts_cache = None
+            self._nostro_ccy_cache = {}
+            self._closed = False
+            self._pending_updates = []
+
+            # Extract key data once for all decision nodes
+            ctx = DecisionContext(
+                p004_data=p004_data,
+                p008_data=p008_data,
+                customers_csv_path=customers_csv_path,
+                view=P004View(
+                    e2e=p004_data.get('e2e', ''),
+                    uetr=p004_data.get('uetr', ''),
+                    amount=float(p004_data.get('rtr_amount', 0)),
+                    currency=p004_data.get('rtr_ccy', ''),
+                ),
+                reason=p004_data.get('rsn', ''),
+                reason_info=p004_data.get('rsn_info', ''),
+                creditor_agent_bic=self._extract_creditor_agent_bic(p004_data),
+            )
 
             # Start decision tree at D1
-            current_node = DecisionNode.D1_FOREIGN_CURRENCY
+            current_node: Optional[DecisionNode] = DecisionNode.D1_FOREIGN_CURRENCY
+            final_action: Optional[str] = 'UNKNOWN'
 
             while current_node:
-                decision_result = self._process_decision_node(
-                    current_node, p004_data, p008_data, customers_csv_path,
-                    return_reference, uetr, amount, currency, reason, reason_info, creditor_agent_bic
-                )
+                self._tick_ts = datetime.now().isoformat()
+                decision_result = self._process_decision_node(current_node, ctx)
 
                 self.decision_path.append(decision_result)
                 self._log_decision(decision_result)
 
                 # Determine next node
                 current_node = decision_result.next_node
+                final_action = decision_result.action_taken
 
                 # Check for terminal conditions
-                if decision_result.action_taken in ['SUBMIT_CASE_TO_CLOSED', 'FUNDS_IN_OB']:
+                if final_action in TERMINAL_ACTIONS:
                     break
 
-            # Determine final result
-            success = any(result.action_taken ==
-                          'SUBMIT_CASE_TO_CLOSED' for result in self.decision_path)
-            final_action = self.decision_path[-1].action_taken if self.decision_path else 'UNKNOWN'
-
+            balances_saved = self._flush_balance_updates()
+            audit_trail, account_operations = self._materialize_audit()
             return RefundProcessingResult(
-                success=success,
+                success=self._closed and balances_saved,
                 decision_path=self.decision_path,
                 final_action=final_action,
                 accounts_affected=self.accounts_affected,
-                account_operations=self.account_operations,
-                audit_trail=self.audit_trail
+                account_operations=account_operations,
+                audit_trail=audit_trail,
+                error=None if balances_saved else "Bank account balance updates were not saved"
             )
 
         except Exception as e:
+            # Keep the balance updates applied before the failure, as per-operation writes did
+            self._flush_balance_updates()
+            audit_trail, account_operations = self._materialize_audit()
             return RefundProcessingResult(
                 success=False,
                 decision_path=self.decision_path,
                 final_action='ERROR',
                 accounts_affected=self.accounts_affected,
-                account_operations=self.account_operations,
-                audit_trail=self.audit_trail,
+                account_operations=account_operations,
+                audit_trail=audit_trail,
                 error=str(e)
             )
+        finally:
+            self._tick_ts = None
 
-    def _process_decision_node(self, node: DecisionNode, p004_data: Dict, p008_data: Dict,
-                               customers_csv_path: str, return_reference: str, uetr: str,
-                               amount: float, currency: str, reason: str, reason_info: str,
-                               creditor_agent_bic: str) -> DecisionResult:
+    def _process_decision_node(self, node: DecisionNode, ctx: DecisionContext) -> DecisionResult:
         """Process a specific decision node."""
+        handler = self._handlers.get(node)
+        if handler is not None:
+            return handler(ctx)
 
-        if node == DecisionNode.D1_FOREIGN_CURRENCY:
-            return self._d1_foreign_currency(currency)
-
-        elif node == DecisionNode.D2_NOSTRO_FOUND:
-            return self._d2_nostro_found(return_reference, uetr, amount, currency)
-
-        elif node == DecisionNode.D3_FCA_REFUND:
-            return self._d3_fca_refund(p004_data, p008_data, customers_csv_path)
-
-        elif node == DecisionNode.D4_NOSTRO_FOUND_AFTER_SCR:
-            return self._d4_nostro_found_after_scr(return_reference, uetr, amount, currency)
-
-        elif node == DecisionNode.D5_MARKETS:
-            return self._d5_markets()
-
-        elif node == DecisionNode.D6_VOSTRO_AUTHORITY:
-            return self._d6_vostro_authority(creditor_agent_bic, currency, amount, return_reference, uetr, reason_info)
-
-        elif node == DecisionNode.D7_BRANCH_PAYMENT:
-            return self._d7_branch_payment(p004_data, p008_data)
-
-        elif node == DecisionNode.D8_MARKETS_FINAL:
-            return self._d8_markets_final()
-
-        elif node == DecisionNode.D9_VALID_EMAIL:
-            return self._d9_valid_email(p004_data)
-
-        else:
-            return DecisionResult(
-                node=node,
-                decision=False,
-                reason=f"Unknown decision node: {node}",
-                next_node=None
-            )
+        return DecisionResult(
+            node=node,
+            decision=False,
+            reason=f"Unknown decision node: {node}",
+            next_node=None
+        )
 
     def _d1_foreign_currency(self, currency: str) -> DecisionResult:
         """D1: Is the returned amount foreign currency?"""
@@ -198,10 +273,10 @@ class RefundDecisionEngine:
             decision=nostro_result.found,
             reason=f"Nostro item {'found' if nostro_result.found else 'not found'}",
             next_node=next_node,
-            data={'nostro_result': nostro_result}
+            nostro_result=nostro_result
         )
 
-    def _d3_fca_refund(self, p004_data: Dict, p008_data: Dict, customers_csv_path: str) -> DecisionResult:
+    def _d3_fca_refund(self, view: P004View, p008_data: Dict, customers_csv_path: str) -> DecisionResult:
         """D3: Are we refunding the FCA?"""
         # Check if customer has FCA account
         customer_iban = p008_data.get('dbtr_iban', '')
@@ -215,21 +290,21 @@ class RefundDecisionEngine:
             self._fca_same_name_verification(customer_record)
 
             # Debit Nostro
-            nostro_debit_result = self._debit_nostro(p004_data)
+            nostro_debit_result = self._debit_nostro(view)
 
             # Credit FCA
-            fca_credit_result = self._credit_fca(customer_record, p004_data)
+            fca_credit_result = self._credit_fca(customer_record, view)
 
             # Update SNDR Ref
-            self._update_sndr_ref(p004_data)
+            self._update_sndr_ref(view)
 
             next_node = DecisionNode.D5_MARKETS
         else:
             # Debit Nostro Payment Input Screen
-            self._debit_nostro_payment_input_screen(p004_data)
+            self._debit_nostro_payment_input_screen(view)
 
             # Update SNDR Ref
-            self._update_sndr_ref(p004_data)
+            self._update_sndr_ref(view)
 
             next_node = DecisionNode.D7_BRANCH_PAYMENT
 
@@ -260,30 +335,26 @@ class RefundDecisionEngine:
             decision=nostro_result.found,
             reason=f"Nostro item {'found' if nostro_result.found else 'still not found'} after SCR",
             next_node=next_node,
-            action_taken="SEND_NOSTRO_NOT_CREDITED" if not nostro_result.found else "ATTACH_SC_LC"
+            action_taken="SEND_NOSTRO_NOT_CREDITED" if not nostro_result.found else "ATTACH_SC_LC",
+            nostro_result=nostro_result
         )
 
     def _d5_markets(self) -> DecisionResult:
         """D5: Is Markets?"""
-        # POC default is NO
-        is_markets = False
-
-        if is_markets:
+        if MARKETS_ENABLED:
             # Send Refund FCA Email
             self._send_refund_fca_email()
-            next_node = DecisionNode.D8_MARKETS_FINAL
-        else:
-            # Send Refund (Daily List/Full List)
-            self._send_refund_daily_list()
-            next_node = DecisionNode.D8_MARKETS_FINAL
+            return DecisionResult(
+                node=DecisionNode.D5_MARKETS,
+                decision=True,
+                reason="Markets case (POC default: NO)",
+                next_node=DecisionNode.D8_MARKETS_FINAL,
+                action_taken="SEND_REFUND_FCA_EMAIL"
+            )
 
-        return DecisionResult(
-            node=DecisionNode.D5_MARKETS,
-            decision=is_markets,
-            reason="Markets case (POC default: NO)",
-            next_node=next_node,
-            action_taken="SEND_REFUND_FCA_EMAIL" if is_markets else "SEND_REFUND_DAILY_LIST"
-        )
+        # Send Refund (Daily List/Full List)
+        self._send_refund_daily_list()
+        return _D5_RESULT_NO
 
     def _d6_vostro_authority(self, creditor_agent_bic: str, currency: str, amount: float,
                              return_reference: str, uetr: str, reason_info: str) -> DecisionResult:
@@ -321,7 +392,7 @@ class RefundDecisionEngine:
             action_taken="DEBIT_VOSTRO" if authority_check['authority_exists'] else "FUNDS_IN_OB"
         )
 
-    def _d7_branch_payment(self, p004_data: Dict, p008_data: Dict) -> DecisionResult:
+    def _d7_branch_payment(self, p004_data: Dict, p008_data: Dict, view: P004View) -> DecisionResult:
         """D7: Is this a Branch payment?"""
         # Determine if this is a branch payment (simplified logic)
         is_branch = self._is_branch_payment(p004_data)
@@ -331,7 +402,7 @@ class RefundDecisionEngine:
             self._credit_branch_sait(p004_data)
         else:
             # Credit Client Original Debited Account
-            self._credit_client_original(p004_data, p008_data)
+            self._credit_client_original(view, p008_data)
 
         next_node = DecisionNode.D8_MARKETS_FINAL
 
@@ -345,21 +416,18 @@ class RefundDecisionEngine:
 
     def _d8_markets_final(self) -> DecisionResult:
         """D8: Is Markets?"""
-        is_markets = False  # POC default
-
-        if is_markets:
+        if MARKETS_ENABLED:
             # Send Refund Sent Email
             self._send_refund_sent_email()
-        else:
-            next_node = DecisionNode.D9_VALID_EMAIL
+            return DecisionResult(
+                node=DecisionNode.D8_MARKETS_FINAL,
+                decision=True,
+                reason="Markets case (POC default: NO)",
+                next_node=None,
+                action_taken="SEND_REFUND_SENT_EMAIL"
+            )
 
-        return DecisionResult(
-            node=DecisionNode.D8_MARKETS_FINAL,
-            decision=is_markets,
-            reason="Markets case (POC default: NO)",
-            next_node=next_node if not is_markets else None,
-            action_taken="SEND_REFUND_SENT_EMAIL" if is_markets else None
-        )
+        return _D8_RESULT_NO
 
     def _d9_valid_email(self, p004_data: Dict) -> DecisionResult:
         """D9: Does client have valid email address?"""
@@ -405,63 +473,39 @@ class RefundDecisionEngine:
         self._log_action(
             "FCA_SAME_NAME", f"Verified FCA same name for customer: {customer_record.get('account_holder_name', 'Unknown')}")
 
-    def _debit_nostro(self, p004_data: Dict) -> bool:
+    def _debit_nostro(self, view: P004View) -> bool:
         """Debit Nostro account; check MT940 :61: and :86: for traceability."""
-        amount = float(p004_data.get('rtr_amount', 0))
-        currency = p004_data.get('rtr_ccy', '')
+        amount = view.amount
+        currency = view.currency
 
         # Find nostro account for currency
         nostro_account = self._get_nostro_account_for_currency(currency)
         if nostro_account:
             # Get current balance before debit
-            accounts_data = csv_reconciliation_engine.load_csv_data(
-                'data/bank_accounts.csv')
-            current_balance = None
-            account_name = None
-            for account in accounts_data:
-                if account.get('Account Number', '') == nostro_account:
-                    current_balance = account.get('Opening Balance', '')
-                    account_name = account.get('Account Name', '')
-                    break
-
-            success = csv_reconciliation_engine.update_bank_account_balance(
-                nostro_account, amount, 'debit')
+            account = self._get_account(nostro_account)
+            current_balance = account.get('Opening Balance', '') if account else None
+            account_name = account.get('Account Name', '') if account else None
 
-            # Get new balance after debit
-            accounts_data_after = csv_reconciliation_engine.load_csv_data(
-                'data/bank_accounts.csv')
-            new_balance = None
-            for account in accounts_data_after:
-                if account.get('Account Number', '') == nostro_account:
-                    new_balance = account.get('Opening Balance', '')
-                    break
+            success = self._queue_balance_update(
+                nostro_account, account, amount, 'debit')
+            new_balance = account.get('Opening Balance', '') if account else None
 
             # Record detailed account operation
-            operation = {
-                'operation_type': 'DEBIT',
-                'account_number': nostro_account,
-                'account_name': account_name,
-                'account_type': 'Nostro',
-                'currency': currency,
-                'amount': amount,
-                'balance_before': current_balance,
-                'balance_after': new_balance,
-                'reason': 'Return processing - nostro debit',
-                'reference': p004_data.get('e2e', ''),
-                'uetr': p004_data.get('uetr', '')
-            }
-            self.account_operations.append(operation)
+            self.account_operations.append((
+                'DEBIT', nostro_account, account_name, 'Nostro', currency, amount,
+                current_balance, new_balance, 'Return processing - nostro debit',
+                view.e2e, view.uetr))
 
             self._log_action(
                 "DEBIT_NOSTRO", f"Debited {currency} {amount} from nostro account {nostro_account} ({account_name})")
             return success
         return False
 
-    def _credit_fca(self, customer_record: Dict, p004_data: Dict) -> bool:
+    def _credit_fca(self, customer_record: Dict, view: P004View) -> bool:
         """Update client's FCA balance."""
-        amount = float(p004_data.get('rtr_amount', 0))
+        amount = view.amount
         account_number = customer_record.get('account_number', '')
-        currency = p004_data.get('rtr_ccy', '')
+        currency = view.currency
 
         # Get current balance before credit
         current_balance = customer_record.get('ledger_balance', '0')
@@ -470,86 +514,52 @@ class RefundDecisionEngine:
             account_number, amount, 'credit')
 
         # Record detailed account operation
-        operation = {
-            'operation_type': 'CREDIT',
-            'account_number': account_number,
-            'account_name': customer_record.get('account_holder_name', 'Unknown'),
-            'account_type': 'FCA',
-            'currency': currency,
-            'amount': amount,
-            'balance_before': current_balance,
-            'balance_after': f"{float(current_balance) + amount:.2f}",
-            'reason': 'Return processing - FCA credit',
-            'reference': p004_data.get('e2e', ''),
-            'uetr': p004_data.get('uetr', '')
-        }
-        self.account_operations.append(operation)
+        self.account_operations.append((
+            'CREDIT', account_number, customer_record.get('account_holder_name', 'Unknown'),
+            'FCA', currency, amount, current_balance, f"{float(current_balance) + amount:.2f}",
+            'Return processing - FCA credit', view.e2e, view.uetr))
 
         self._log_action(
             "CREDIT_FCA", f"Credited {currency} {amount} to FCA account {account_number} ({customer_record.get('account_holder_name', 'Unknown')})")
         return success
 
-    def _credit_client_original(self, p004_data: Dict, p008_data: Dict) -> bool:
+    def _credit_client_original(self, view: P004View, p008_data: Dict) -> bool:
         """Credit client's original account."""
-        amount = float(p004_data.get('rtr_amount', 0))
-        currency = p004_data.get('rtr_ccy', '')
+        amount = view.amount
+        currency = view.currency
         client_iban = p008_data.get('dbtr_iban', '')
         client_name = p008_data.get('dbtr_name', 'Unknown')
 
         # Get current balance before credit
-        accounts_data = csv_reconciliation_engine.load_csv_data(
-            'data/bank_accounts.csv')
-        current_balance = None
-        account_name = None
-        for account in accounts_data:
-            if account.get('Account Number', '') == client_iban:
-                current_balance = account.get('Opening Balance', '')
-                account_name = account.get('Account Name', '')
-                break
+        account = self._get_account(client_iban)
+        current_balance = account.get('Opening Balance', '') if account else None
+        account_name = account.get('Account Name', '') if account else None
 
         # Update the client account balance
-        success = csv_reconciliation_engine.update_bank_account_balance(
-            client_iban, amount, 'credit')
-
-        # Get new balance after credit
-        accounts_data_after = csv_reconciliation_engine.load_csv_data(
-            'data/bank_accounts.csv')
-        new_balance = None
-        for account in accounts_data_after:
-            if account.get('Account Number', '') == client_iban:
-                new_balance = account.get('Opening Balance', '')
-                break
+        success = self._queue_balance_update(
+            client_iban, account, amount, 'credit')
+        new_balance = account.get('Opening Balance', '') if account else None
 
         # Record detailed account operation
-        operation = {
-            'operation_type': 'CREDIT',
-            'account_number': client_iban,
-            'account_name': account_name or client_name,
-            'account_type': 'Client',
-            'currency': currency,
-            'amount': amount,
-            'balance_before': current_balance or 'N/A',
-            'balance_after': new_balance or 'N/A',
-            'reason': 'Return processing - credit client original account',
-            'reference': p004_data.get('e2e', ''),
-            'uetr': p004_data.get('uetr', '')
-        }
-        self.account_operations.append(operation)
+        self.account_operations.append((
+            'CREDIT', client_iban, account_name or client_name, 'Client', currency, amount,
+            current_balance or 'N/A', new_balance or 'N/A',
+            'Return processing - credit client original account',
+            view.e2e, view.uetr))
 
         self._log_action(
             "CREDIT_CLIENT_ORIGINAL", f"Credited {currency} {amount} to client account {client_iban} ({account_name or client_name})")
         return success
 
-    def _update_sndr_ref(self, p004_data: Dict):
+    def _update_sndr_ref(self, view: P004View):
         """Use Nostro reference from MT940/return messages."""
-        reference = p004_data.get('e2e', '')
         self._log_action("UPDATE_SNDR_REF",
-                         f"Updated SNDR reference: {reference}")
+                         f"Updated SNDR reference: {view.e2e}")
 
-    def _debit_nostro_payment_input_screen(self, p004_data: Dict):
+    def _debit_nostro_payment_input_screen(self, view: P004View):
         """Payment input screen per SOP - debit nostro account."""
         # Actually debit the nostro account
-        nostro_debit_result = self._debit_nostro(p004_data)
+        nostro_debit_result = self._debit_nostro(view)
 
         self._log_action("DEBIT_NOSTRO_PAYMENT_INPUT",
                          f"Processed payment input screen per SOP - nostro debit: {nostro_debit_result}")
@@ -632,6 +642,7 @@ class RefundDecisionEngine:
 
     def _submit_case_to_closed(self):
         """Submit Case to Closed - END OF THE PROCESS."""
+        self._closed = True
         self._log_action("SUBMIT_CASE_TO_CLOSED",
                          "Submitted case to closed - END OF THE PROCESS")
 
@@ -641,46 +652,117 @@ class RefundDecisionEngine:
         # This would need to be implemented based on actual PACS.004 structure
         return "CHASUS33XXX"  # Default for testing
 
+    def _get_accounts(self, refresh: bool = False) -> List[Dict]:
+        """Load bank_accounts.csv once per refund; balance updates are mirrored into the cache."""
+        if refresh or self._accounts_cache is None:
+            accounts_data, by_number, nostro_by_ccy = build_indices(
+                csv_reconciliation_engine.bank_accounts_path)
+
+            self._accounts_cache = accounts_data
+            self._accounts_by_number = by_number
+            self._nostro_by_ccy = nostro_by_ccy
+        return self._accounts_cache
+
+    def _get_account(self, account_number: str) -> Optional[Dict]:
+        """Look up a bank account row by account number."""
+        self._get_accounts()
+        return self._accounts_by_number.get(account_number)
+
+    def _apply_balance_delta(self, account: Optional[Dict], amount: float, operation: str) -> Optional[str]:
+        """Mirror update_bank_account_balance on the cached row and return the new balance."""
+        if account is None:
+            return None
+        current_balance = account['_balance']
+        if current_balance is None:
+            raise ValueError(
+                f"could not parse balance {account.get('Opening Balance')!r}")
+        new_balance = current_balance - amount if operation == 'debit' else current_balance + amount
+        # Keep the 2dp value that update_bank_account_balance reads back from the CSV
+        account['_balance'] = round(new_balance, 2)
+        account['Opening Balance'] = csv_reconciliation_engine.format_balance(
+            account.get('Currency', 'AUD'), new_balance)
+        account['Last Reconciled Date'] = datetime.now().strftime('%Y-%m-%d')
+        return account['Opening Balance']
+
+    def _queue_balance_update(self, account_number: str, account: Optional[Dict],
+                              amount: float, operation: str) -> bool:
+        """Apply a balance update to the cached row and queue it for the end-of-refund CSV write."""
+        try:
+            self._apply_balance_delta(account, amount, operation)
+        except Exception as e:
+            logger.error("Error updating bank account balance for %s: %s", account_number, e)
+            return False
+        self._pending_updates.append((account_number, amount, operation))
+        return True
+
+    def _flush_balance_updates(self) -> bool:
+        """
+        Write the queued bank account balance updates in a single CSV rewrite.
+
+        Returns:
+            False if the updates could not be saved; the failure is added to the audit trail
+        """
+        if not self._pending_updates:
+            return True
+        updates, self._pending_updates = self._pending_updates, []
+        if csv_reconciliation_engine.apply_updates_batch(updates):
+            return True
+        logger.error("Failed to save %d bank account balance update(s)", len(updates))
+        self._log_action("BALANCE_UPDATE_FAILED",
+                         f"Failed to save {len(updates)} bank account balance update(s) to bank_accounts.csv")
+        return False
+
     def _get_nostro_account_for_currency(self, currency: str) -> Optional[str]:
         """Get nostro account number for given currency from CSV dynamically."""
+        currency_upper = (currency or '').upper()
+        if currency_upper in self._nostro_ccy_cache:
+            return self._nostro_ccy_cache[currency_upper]
+
+        nostro_account = None
         try:
-            accounts_data = csv_reconciliation_engine.load_csv_data(
-                'data/bank_accounts.csv')
-            currency_upper = (currency or '').upper()
-            # Prefer active Nostro accounts matching currency
-            for account in accounts_data:
-                if (account.get('Account Type', '').strip().lower() == 'nostro' and
-                        (account.get('Currency', '').strip().upper() == currency_upper) and
-                        (account.get('Account Status', '').strip().lower() == 'active')):
-                    return account.get('Account Number')
-            # Fallback: any Nostro with currency match regardless of status
-            for account in accounts_data:
-                if (account.get('Account Type', '').strip().lower() == 'nostro' and
-                        (account.get('Currency', '').strip().upper() == currency_upper)):
-                    return account.get('Account Number')
+            self._get_accounts()
+            # Prefer active Nostro accounts matching currency, else any Nostro in that currency
+            candidates = self._nostro_by_ccy.get(currency_upper)
+            if candidates:
+                nostro_account = candidates[0].get('Account Number')
         except Exception:
-            pass
-        return None
+            # Don't memoize a failed load
+            return None
+
+        # Balance updates never change which nostro is selected, so memoize per refund
+        self._nostro_ccy_cache[currency_upper] = nostro_account
+        return nostro_account
 
     def _log_decision(self, decision_result: DecisionResult):
         """Log decision result."""
-        self.audit_trail.append({
-            'timestamp': datetime.now().isoformat(),
-            'type': 'DECISION',
-            'node': decision_result.node.value,
-            'decision': decision_result.decision,
-            'reason': decision_result.reason,
-            'next_node': decision_result.next_node.value if decision_result.next_node else None
-        })
+        self.audit_trail.append((
+            self._tick_ts or datetime.now().isoformat(),
+            'DECISION',
+            _NODE_VALUE[decision_result.node],
+            decision_result.decision,
+            decision_result.reason,
+            _NODE_VALUE[decision_result.next_node] if decision_result.next_node else None
+        ))
 
     def _log_action(self, action_type: str, description: str):
         """Log action taken."""
-        self.audit_trail.append({
-            'timestamp': datetime.now().isoformat(),
-            'type': 'ACTION',
-            'action': action_type,
-            'description': description
-        })
+        self.audit_trail.append((
+            self._tick_ts or datetime.now().isoformat(),
+            'ACTION',
+            action_type,
+            description
+        ))
+
+    def _materialize_audit(self) -> Tuple[List[Dict], List[Dict]]:
+        """Convert the recorded audit and account operation tuples into result dicts."""
+        audit_trail = [
+            dict(zip(_DECISION_FIELDS if entry[1] == 'DECISION' else _ACTION_FIELDS, entry))
+            for entry in self.audit_trail
+        ]
+        account_operations = [
+            dict(zip(_OPERATION_FIELDS, operation)) for operation in self.account_operations
+        ]
+        return audit_trail, account_operations
 
 
 # Global refund decision engine instance
@@ -3,12 +3,157 @@ Repository interfaces for data access layer.
 Abstract interfaces that can be implemented with CSV, SQLite, or other backends.
 """
 
+import hashlib
+import json
+import os
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
-
-
-@dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Any, Sequence, Tuple, Type
+from dataclasses import asdict, dataclass, fields, is_dataclass
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Column-oriented bulk result: field name -> values in row order. Scans that only
+# look at a few fields use these instead of building one object per row. The
+# columns are plain tuples, not Arrow record batches or Polars frames, since
+# pyarrow and polars are not dependencies of this project.
+ColumnBatch = Dict[str, Sequence[Any]]
+
+# (reference, uetr, amount, currency), as passed to find_nostro_match
+NostroMatchQuery = Tuple[str, str, float, str]
+
+# Prefer orjson (C extension) for run reports when installed. Datetimes and
+# dataclasses are passed through to default=str so the output matches json.dump.
+try:
+    import orjson
+
+    _REPORT_JSON_OPTIONS = (orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS |
+                            orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS)
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+
+def to_minor_units(amount: Any) -> int:
+    """
+    Convert a decimal amount (e.g. '1,234.50' or 1234.5) to integer minor units, rounding half up.
+
+    Raises:
+        ValueError: If the amount is not a finite number
+    """
+    try:
+        value = Decimal(str(amount).replace(',', '').strip())
+        return int((value * 100).to_integral_value(rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError, OverflowError):
+        raise ValueError(f"Invalid amount: {amount!r}")
+
+
+def format_minor_units(minor: int) -> str:
+    """Format integer minor units as a grouped two-decimal amount, e.g. 123450 -> '1,234.50'."""
+    sign = '-' if minor < 0 else ''
+    units, cents = divmod(abs(minor), 100)
+    return f"{sign}{units:,}.{cents:02d}"
+
+
+def dump_run_report(report_data: Dict[str, Any]) -> bytes:
+    """Serialize a run report as indented UTF-8 JSON, writing unsupported values with str()."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(report_data, default=str, option=_REPORT_JSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            pass  # e.g. integers beyond 64 bits; the stdlib encoder handles them
+    return json.dumps(report_data, indent=2, ensure_ascii=False, default=str).encode('utf-8')
+
+
+def load_run_report(data: bytes) -> Any:
+    """Parse a run report written by dump_run_report (or json.dump)."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # e.g. NaN, which only the stdlib parser accepts
+    return json.loads(data)
+
+
+# Run reports are written with a sidecar holding the BLAKE2b digest of their bytes
+REPORT_CHECKSUM_SUFFIX = '.blake2b'
+
+
+def load_event_data(text: Optional[str]) -> Any:
+    """Parse a stored audit event_data JSON document; empty text reads as {}."""
+    if not text:
+        return {}
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass  # e.g. NaN, which only the stdlib parser accepts
+    return json.loads(text)
+
+
+def run_report_checksum(data: bytes) -> str:
+    """Hex BLAKE2b digest of a serialized run report."""
+    return hashlib.blake2b(data, digest_size=32).hexdigest()
+
+
+def write_report_checksum(file_path: str, data: bytes) -> None:
+    """
+    Atomically write the checksum sidecar for the report bytes about to be saved at file_path.
+
+    Call this before the report itself is moved into place: a crash in between
+    then leaves a checksum without its report, never a new report with a stale
+    checksum that get_run_report would reject.
+    """
+    sidecar_path = file_path + REPORT_CHECKSUM_SUFFIX
+    temp_path = sidecar_path + '.tmp'
+    with open(temp_path, 'w', encoding='ascii') as f:
+        f.write(run_report_checksum(data))
+    os.replace(temp_path, sidecar_path)
+
+
+def verify_report_checksum(file_path: str, data: bytes) -> bool:
+    """
+    Check report bytes read from file_path against its checksum sidecar.
+
+    Returns:
+        False if the sidecar exists and does not match; reports saved without
+        a sidecar are accepted
+    """
+    try:
+        with open(file_path + REPORT_CHECKSUM_SUFFIX, 'r', encoding='ascii') as f:
+            expected = f.read().strip()
+    except FileNotFoundError:
+        return True
+    return expected == run_report_checksum(data)
+
+
+def entity_fields(entity_type: Type) -> List[str]:
+    """Constructor field names of a repository dataclass, in declaration order."""
+    return [f.name for f in fields(entity_type) if f.init]
+
+
+def entities_to_json(entities: Iterable[Any]) -> bytes:
+    """Serialize entities (or plain dicts) as a compact UTF-8 JSON array of objects."""
+    entities = list(entities)
+    if orjson is not None:
+        try:
+            return orjson.dumps(entities, default=str)  # serializes dataclasses natively
+        except orjson.JSONEncodeError:
+            pass  # e.g. integers beyond 64 bits; the stdlib encoder handles them
+    rows = [asdict(entity) if is_dataclass(entity) and not isinstance(entity, type) else entity
+            for entity in entities]
+    return json.dumps(rows, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def columns_from_entities(entities: Iterable[Any], entity_type: Type) -> ColumnBatch:
+    """Transpose a list of dataclass instances into a ColumnBatch."""
+    names = entity_fields(entity_type)
+    rows = [tuple(getattr(entity, name) for name in names) for entity in entities]
+    if not rows:
+        return {name: () for name in names}
+    return dict(zip(names, zip(*rows)))
+
+
+# Entities are slotted and frozen, so the bulk readers hand them out directly:
+# per-row size is close to a NamedTuple's and callers can still use asdict().
+@dataclass(slots=True, frozen=True)
 class Account:
     """Bank account data structure."""
     account_number: str
@@ -25,7 +170,7 @@ class Account:
     account_status: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class StatementEntry:
     """Statement entry data structure."""
     statement_id: str
@@ -37,7 +182,7 @@ class StatementEntry:
     reference: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class LedgerEntry:
     """Internal ledger entry data structure."""
     transaction_id: str
@@ -49,7 +194,7 @@ class LedgerEntry:
     return_reason: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Customer:
     """Customer data structure."""
     customer_name: str
@@ -62,6 +207,80 @@ class Customer:
     email: str
 
 
+class IndexedLookupMixin:
+    """
+    Lazily built lookup indexes for repository point queries.
+
+    An index is built from one pass over the repository's entities on first use and
+    reused until _invalidate_indexes() is called (after local writes) or
+    _index_version() changes (for stores that other components also write).
+    """
+
+    _indexes: Optional[Dict[str, Dict[Any, Any]]] = None
+    _indexes_version: Any = None
+
+    def _index_version(self) -> Any:
+        """Token for the current state of the backing store; indexes are rebuilt when it changes."""
+        return None
+
+    def _invalidate_indexes(self):
+        """Drop all lookup indexes so the next lookup rebuilds them."""
+        self._indexes = None
+
+    def _ensure_index(self, name: str, load: Callable[[], Iterable[Any]],
+                      key_fn: Callable[[Any], Any]) -> Dict[Any, Any]:
+        """
+        Get the named index, building it if needed.
+
+        Args:
+            name: Index name, unique within the repository
+            load: Returns the entities to index, in store order
+            key_fn: Extracts the lookup key from an entity
+
+        Returns:
+            Dict of key -> first entity with that key, as a linear scan would find it
+        """
+        indexes = self._current_indexes()
+        index = indexes.get(name)
+        if index is None:
+            index = {}
+            for entity in load():
+                index.setdefault(key_fn(entity), entity)
+            indexes[name] = index
+        return index
+
+    def _group_index(self, name: str, load: Callable[[], Iterable[Any]],
+                     key_fn: Callable[[Any], Any]) -> Dict[Any, List[Any]]:
+        """
+        Get the named grouping index, building it if needed.
+
+        Args:
+            name: Index name, unique within the repository
+            load: Returns the entities to index, in store order
+            key_fn: Extracts the grouping key from an entity
+
+        Returns:
+            Dict of key -> all entities with that key, in store order. Callers
+            must copy a group before handing it out.
+        """
+        indexes = self._current_indexes()
+        index = indexes.get(name)
+        if index is None:
+            index = {}
+            for entity in load():
+                index.setdefault(key_fn(entity), []).append(entity)
+            indexes[name] = index
+        return index
+
+    def _current_indexes(self) -> Dict[str, Dict[Any, Any]]:
+        """Index storage, emptied first if the backing store has changed."""
+        version = self._index_version()
+        if self._indexes is None or self._indexes_version != version:
+            self._indexes = {}
+            self._indexes_version = version
+        return self._indexes
+
+
 class AccountRepository(ABC):
     """Abstract interface for bank account operations."""
 
@@ -90,6 +309,18 @@ class AccountRepository(ABC):
         """Get all accounts."""
         pass
 
+    def iter_all_accounts(self) -> Iterator[Account]:
+        """Stream all accounts without materializing them as a list."""
+        return iter(self.get_all_accounts())
+
+    def get_all_accounts_columns(self) -> ColumnBatch:
+        """Get all accounts as columns keyed by Account field name."""
+        return columns_from_entities(self.get_all_accounts(), Account)
+
+    def get_all_accounts_json(self) -> bytes:
+        """Get all accounts as a JSON array of objects keyed by Account field name."""
+        return entities_to_json(self.iter_all_accounts())
+
 
 class StatementRepository(ABC):
     """Abstract interface for statement operations."""
@@ -104,11 +335,39 @@ class StatementRepository(ABC):
         """Get all vostro statement entries."""
         pass
 
+    def iter_nostro_entries(self) -> Iterator[StatementEntry]:
+        """Stream all nostro statement entries without materializing them as a list."""
+        return iter(self.get_nostro_entries())
+
+    def iter_vostro_entries(self) -> Iterator[StatementEntry]:
+        """Stream all vostro statement entries without materializing them as a list."""
+        return iter(self.get_vostro_entries())
+
+    def get_nostro_columns(self) -> ColumnBatch:
+        """Get all nostro statement entries as columns keyed by StatementEntry field name."""
+        return columns_from_entities(self.get_nostro_entries(), StatementEntry)
+
+    def get_vostro_columns(self) -> ColumnBatch:
+        """Get all vostro statement entries as columns keyed by StatementEntry field name."""
+        return columns_from_entities(self.get_vostro_entries(), StatementEntry)
+
     @abstractmethod
     def find_nostro_match(self, reference: str, uetr: str, amount: float, currency: str) -> Dict[str, Any]:
         """Find matching nostro entry (exact or partial)."""
         pass
 
+    def find_nostro_match_batch(self, queries: Iterable[NostroMatchQuery]) -> List[Dict[str, Any]]:
+        """
+        Find matching nostro entries for many payments at once.
+
+        Args:
+            queries: (reference, uetr, amount, currency) tuples
+
+        Returns:
+            One find_nostro_match result per query, in query order
+        """
+        return [self.find_nostro_match(*query) for query in queries]
+
     @abstractmethod
     def add_nostro_entry(self, entry: StatementEntry) -> bool:
         """Add new nostro statement entry."""
@@ -119,6 +378,14 @@ class StatementRepository(ABC):
         """Add new vostro statement entry."""
         pass
 
+    def add_nostro_entries(self, entries: Iterable[StatementEntry]) -> int:
+        """Add several nostro statement entries; returns the number added."""
+        return sum(1 for entry in entries if self.add_nostro_entry(entry))
+
+    def add_vostro_entries(self, entries: Iterable[StatementEntry]) -> int:
+        """Add several vostro statement entries; returns the number added."""
+        return sum(1 for entry in entries if self.add_vostro_entry(entry))
+
 
 class LedgerRepository(ABC):
     """Abstract interface for internal ledger operations."""
@@ -128,6 +395,14 @@ class LedgerRepository(ABC):
         """Get all ledger entries."""
         pass
 
+    def iter_ledger_entries(self) -> Iterator[LedgerEntry]:
+        """Stream all ledger entries without materializing them as a list."""
+        return iter(self.get_ledger_entries())
+
+    def get_ledger_columns(self) -> ColumnBatch:
+        """Get all ledger entries as columns keyed by LedgerEntry field name."""
+        return columns_from_entities(self.get_ledger_entries(), LedgerEntry)
+
     @abstractmethod
     def get_entry_by_reference(self, reference: str) -> Optional[LedgerEntry]:
         """Get ledger entry by reference."""
@@ -138,6 +413,10 @@ class LedgerRepository(ABC):
         """Add new ledger entry."""
         pass
 
+    def add_ledger_entries(self, entries: Iterable[LedgerEntry]) -> int:
+        """Add several ledger entries; returns the number added."""
+        return sum(1 for entry in entries if self.add_ledger_entry(entry))
+
     @abstractmethod
     def update_entry_status(self, reference: str, status: str) -> bool:
         """Update entry status."""
@@ -162,6 +441,18 @@ class CustomerRepository(ABC):
         """Get all customers."""
         pass
 
+    def iter_all_customers(self) -> Iterator[Customer]:
+        """Stream all customers without materializing them as a list."""
+        return iter(self.get_all_customers())
+
+    def get_all_customers_columns(self) -> ColumnBatch:
+        """Get all customers as columns keyed by Customer field name."""
+        return columns_from_entities(self.get_all_customers(), Customer)
+
+    def get_all_customers_json(self) -> bytes:
+        """Get all customers as a JSON array of objects keyed by Customer field name."""
+        return entities_to_json(self.iter_all_customers())
+
     @abstractmethod
     def suggest_alternate_account(self, original_account: str) -> Optional[str]:
         """Suggest alternate active account for customer."""
@@ -176,11 +467,43 @@ class AuditRepository(ABC):
         """Add audit event."""
         pass
 
+    def add_audit_events(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Add several audit events; returns the number added."""
+        return sum(1 for event in events if self.add_audit_event(event))
+
     @abstractmethod
-    def get_audit_events(self, transaction_id: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get audit events, optionally filtered by transaction ID."""
+    def get_audit_events(self, transaction_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream audit events, optionally filtered by transaction ID.
+
+        Events are read lazily; wrap the result in list() to keep or reuse them.
+        """
         pass
 
+    def get_audit_events_json(self, transaction_id: Optional[str] = None) -> bytes:
+        """Get audit events, as returned by get_audit_events, serialized as a JSON array."""
+        return entities_to_json(self.get_audit_events(transaction_id))
+
+    def get_audit_events_projection(self, fields: Sequence[str],
+                                    transaction_id: Optional[str] = None) -> Iterator[Tuple[Any, ...]]:
+        """
+        Stream selected top-level event_data fields of audit events as tuples.
+
+        Args:
+            fields: event_data keys to read, in tuple order; missing keys read as None
+            transaction_id: Only return events for this transaction when given
+        """
+        for event in self.get_audit_events(transaction_id):
+            event_data = event.get('event_data') or {}
+            yield tuple(event_data.get(field) for field in fields)
+
+    def add_audit_event_async(self, event: Dict[str, Any]) -> None:
+        """Add audit event without waiting for it to be written, where the backend supports it."""
+        self.add_audit_event(event)
+
+    def flush_audit_events(self) -> None:
+        """Wait until audit events added with add_audit_event_async have been written."""
+
     @abstractmethod
     def save_run_report(self, run_id: str, report_data: Dict[str, Any]) -> str:
         """Save run report and return file path."""
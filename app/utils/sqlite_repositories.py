@@ -2,174 +2,618 @@
 SQLite implementations of repository interfaces.
 """
 
+import atexit
+import logging
+import queue
 import sqlite3
 import json
 import os
+import threading
 import uuid
-from typing import Dict, List, Optional, Any
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Any, Sequence, Tuple, Type
 from datetime import datetime
 from contextlib import contextmanager
 
+from .db_init import migrate_csv_to_sqlite
 from .repositories import (
     AccountRepository, StatementRepository, LedgerRepository,
     CustomerRepository, AuditRepository,
-    Account, StatementEntry, LedgerEntry, Customer
+    Account, StatementEntry, LedgerEntry, Customer, ColumnBatch, entity_fields,
+    NostroMatchQuery, dump_run_report, load_run_report,
+    write_report_checksum, verify_report_checksum, load_event_data
 )
 
+logger = logging.getLogger(__name__)
+
+# Idle connections kept per database; extra connections are closed when returned
+_POOL_MAX_IDLE = 8
+_POOLS: Dict[str, queue.Queue] = {}
+_POOLS_LOCK = threading.Lock()
+
+# Rows pulled per fetchmany() call when streaming whole tables
+_FETCH_BATCH_SIZE = 1000
+
+# Most events the background audit writer inserts per transaction
+_AUDIT_WRITE_BATCH = 500
+
+# UPDATE ... RETURNING needs SQLite 3.35; older libraries check rowcount instead
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+def _balance_after(balance: str, delta: float) -> str:
+    """SQL function applying a balance change with the same float arithmetic as Python."""
+    return str(float(balance) + delta)
+
+
+def _open_connection(db_path: str) -> sqlite3.Connection:
+    """Open a connection with the settings every repository relies on."""
+    # Pooled connections live long, so their statement caches see real reuse
+    conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    conn.create_function('balance_after', 2, _balance_after, deterministic=True)
+    # WAL lets writers proceed alongside readers; NORMAL sync is safe under WAL,
+    # a power loss can only drop the latest commits
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    # Statement scans read whole tables; map the file and keep more pages cached
+    conn.execute('PRAGMA mmap_size=268435456')
+    conn.execute('PRAGMA cache_size=-131072')
+    return conn
+
+
+def _fsync_directory(path: str) -> None:
+    """Flush a directory's entries to disk so a rename into it survives a crash (POSIX only)."""
+    if os.name != 'posix':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _database_key(db_path: str) -> str:
+    """Absolute path of a database, so every spelling of one file shares a pool."""
+    return os.path.abspath(db_path)
+
+
+@contextmanager
+def _pooled_connection(db_path: str):
+    """
+    Borrow an open connection to db_path from the process-wide pool.
+
+    Uncommitted work is rolled back before the connection is returned, matching
+    what closing a per-call connection used to do. All repositories on one file
+    share its pool, and so the page caches of its connections; SQLite's
+    shared-cache mode is not used as it is discouraged together with WAL.
+    """
+    key = _database_key(db_path)
+    pool = _POOLS.get(key)
+    if pool is None:
+        with _POOLS_LOCK:
+            pool = _POOLS.setdefault(key, queue.Queue(maxsize=_POOL_MAX_IDLE))
+
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = _open_connection(key)
+
+    try:
+        yield conn
+    finally:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            pool.put_nowait(conn)
+        except (sqlite3.Error, queue.Full):
+            conn.close()
+
+
+def _analyze_once(conn: sqlite3.Connection, table: str) -> None:
+    """Gather planner statistics for table unless ANALYZE has already covered it."""
+    analyzed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'").fetchone()
+    if analyzed and conn.execute('SELECT 1 FROM sqlite_stat1 WHERE tbl = ?', (table,)).fetchone():
+        return
+    conn.execute(f'ANALYZE {table}')
+
+
+@contextmanager
+def _write_transaction(db_path: str):
+    """
+    Borrow a pooled connection inside a BEGIN IMMEDIATE transaction.
+
+    The write lock is taken up front, so a writer never has to upgrade a read
+    transaction (and fail with SQLITE_BUSY); the transaction commits when the
+    block exits normally and is rolled back by the pool otherwise.
+    """
+    with _pooled_connection(db_path) as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        yield conn
+        conn.commit()
+
+
+class _LookupCache:
+    """
+    Memoized single-row lookups for one database file, least recently used first out.
+
+    A dedicated connection polls PRAGMA data_version, which changes whenever any
+    other connection (pooled or in another process) commits to the database; the
+    whole cache is dropped then, so cached rows are never staler than the last
+    commit. Cached values are frozen entities or strings, safe to share.
+    """
+
+    def __init__(self, db_path: str, maxsize: int):
+        self._watcher = _open_connection(db_path)
+        self._maxsize = maxsize
+        self._version: Optional[int] = None
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, arg: Any, load: Callable[[Any], Any]) -> Any:
+        """Cached load(arg), keyed by (kind, arg)."""
+        key = (kind, arg)
+        with self._lock:
+            version = self._watcher.execute('PRAGMA data_version').fetchone()[0]
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            elif key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        value = load(arg)
+        with self._lock:
+            # A commit seen meanwhile has cleared the cache; don't refill it with this value
+            if self._version == version:
+                self._entries[key] = value
+                if len(self._entries) > self._maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+
+_LOOKUP_CACHE_SIZE = 10000
+_LOOKUP_CACHES: Dict[str, _LookupCache] = {}
+
+
+def _lookup_cache(db_path: str) -> _LookupCache:
+    """The process-wide lookup cache for a database file."""
+    key = _database_key(db_path)
+    cache = _LOOKUP_CACHES.get(key)
+    if cache is None:
+        with _POOLS_LOCK:
+            cache = _LOOKUP_CACHES.get(key)
+            if cache is None:
+                cache = _LOOKUP_CACHES[key] = _LookupCache(key, _LOOKUP_CACHE_SIZE)
+    return cache
+
+
+def _select_entity_columns(entity_type) -> str:
+    """Column list matching the constructor order of a repository dataclass."""
+    return ', '.join(entity_fields(entity_type))
+
+
+def _tuple_cursor(conn: sqlite3.Connection) -> sqlite3.Cursor:
+    """Cursor that returns plain tuples instead of sqlite3.Row objects."""
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    return cursor
+
+
+def _fetch_tuple(conn: sqlite3.Connection, sql: str, params: tuple) -> Optional[tuple]:
+    """First row of a query as a plain tuple, skipping the sqlite3.Row wrapper."""
+    return _tuple_cursor(conn).execute(sql, params).fetchone()
+
+
+def _fetch_json_array(conn: sqlite3.Connection, sql: str, params: tuple) -> bytes:
+    """UTF-8 bytes of a _json_array_sql query, whose aggregate always yields one row."""
+    return _tuple_cursor(conn).execute(sql, params).fetchone()[0].encode('utf-8')
+
+
+def _iter_entities(db_path: str, sql: str, entity_type: Type) -> Iterator[Any]:
+    """
+    Stream query rows as entity_type instances, fetching _FETCH_BATCH_SIZE rows at a time.
+
+    The pooled connection is held until the generator is exhausted or closed.
+    """
+    with _pooled_connection(db_path) as conn:
+        # Entities are built positionally, so tuples are all the rows need to be
+        cursor = _tuple_cursor(conn).execute(sql)
+        while True:
+            rows = cursor.fetchmany(_FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield entity_type(*row)
+
+
+def _fetch_columns(conn: sqlite3.Connection, table: str, entity_type) -> ColumnBatch:
+    """Select a table's entity columns and transpose them into a ColumnBatch."""
+    names = entity_fields(entity_type)
+    rows = _tuple_cursor(conn).execute(
+        f'SELECT {_select_entity_columns(entity_type)} FROM {table}').fetchall()
+    if not rows:
+        return {name: () for name in names}
+    return dict(zip(names, zip(*rows)))
+
+
+# Statements run on every call are module constants: each pooled connection
+# compiles them once and reuses the prepared statement from its cache
+_ACCOUNT_COLUMNS = _select_entity_columns(Account)
+_STATEMENT_COLUMNS = _select_entity_columns(StatementEntry)
+_LEDGER_COLUMNS = _select_entity_columns(LedgerEntry)
+_CUSTOMER_COLUMNS = _select_entity_columns(Customer)
+
+_SQL_GET_ACCOUNT = f'SELECT {_ACCOUNT_COLUMNS} FROM accounts WHERE account_number = ?'
+_SQL_ACCOUNTS_BY_TYPE = f'SELECT {_ACCOUNT_COLUMNS} FROM accounts WHERE account_type = ?'
+_SQL_NOSTRO_ACCOUNT_FOR_CURRENCY = (
+    'SELECT account_number FROM accounts WHERE account_type = "Nostro" AND currency = ? LIMIT 1')
+_SQL_APPLY_BALANCE_DELTA = (
+    'UPDATE accounts SET opening_balance = balance_after(opening_balance, ?) '
+    'WHERE account_number = ?')
+_SQL_APPLY_BALANCE_DELTA_RETURNING = _SQL_APPLY_BALANCE_DELTA + ' RETURNING opening_balance'
+_SQL_ALL_ACCOUNTS = f'SELECT {_ACCOUNT_COLUMNS} FROM accounts'
+
+_SQL_ALL_NOSTRO = f'SELECT {_STATEMENT_COLUMNS} FROM nostro_statements'
+_SQL_ALL_VOSTRO = f'SELECT {_STATEMENT_COLUMNS} FROM vostro_statements'
+_SQL_NOSTRO_EXACT_MATCH = (
+    f'SELECT {_STATEMENT_COLUMNS} FROM nostro_statements '
+    'WHERE reference = ? AND amount = ? AND currency = ?')
+# Exact matches for a JSON array of [reference, amount, currency] queries in one
+# statement; each query joins to its first matching row and comes back keyed by
+# its array index, so queries without an exact match are simply absent
+_SQL_NOSTRO_EXACT_MATCH_BATCH = (
+    'SELECT q.key, ' + ', '.join(f'n.{name}' for name in entity_fields(StatementEntry)) + ' '
+    'FROM json_each(?) AS q JOIN nostro_statements AS n ON n.id = ('
+    'SELECT id FROM nostro_statements WHERE reference = q.value ->> 0 '
+    'AND amount = q.value ->> 1 AND currency = q.value ->> 2 ORDER BY id LIMIT 1)')
+_SQL_NOSTRO_PARTIAL_MATCH = (
+    f'SELECT {_STATEMENT_COLUMNS} FROM nostro_statements '
+    'WHERE reference LIKE ? AND currency = ? ORDER BY id')
+# Trigram LIKE narrows the candidates; the plain LIKE keeps its exact semantics
+_SQL_NOSTRO_PARTIAL_MATCH_FTS = (
+    f'SELECT {_STATEMENT_COLUMNS} FROM nostro_statements '
+    'WHERE id IN (SELECT rowid FROM nostro_statements_fts WHERE reference LIKE ?) '
+    'AND reference LIKE ? AND currency = ? ORDER BY id')
+_SQL_CREATE_NOSTRO_FTS = '''
+    CREATE VIRTUAL TABLE nostro_statements_fts USING fts5(
+        reference, content='nostro_statements', content_rowid='id', tokenize='trigram'
+    )
+'''
+_SQL_NOSTRO_FTS_TRIGGERS = (
+    '''
+    CREATE TRIGGER IF NOT EXISTS nostro_statements_fts_insert
+    AFTER INSERT ON nostro_statements BEGIN
+        INSERT INTO nostro_statements_fts (rowid, reference) VALUES (new.id, new.reference);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS nostro_statements_fts_delete
+    AFTER DELETE ON nostro_statements BEGIN
+        INSERT INTO nostro_statements_fts (nostro_statements_fts, rowid, reference)
+        VALUES ('delete', old.id, old.reference);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS nostro_statements_fts_update
+    AFTER UPDATE OF reference ON nostro_statements BEGIN
+        INSERT INTO nostro_statements_fts (nostro_statements_fts, rowid, reference)
+        VALUES ('delete', old.id, old.reference);
+        INSERT INTO nostro_statements_fts (rowid, reference) VALUES (new.id, new.reference);
+    END
+    ''',
+)
+_SQL_INSERT_NOSTRO = '''
+    INSERT INTO nostro_statements
+    (statement_id, value_date, currency, amount, dr_cr, description, reference)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+_SQL_INSERT_VOSTRO = '''
+    INSERT INTO vostro_statements
+    (statement_id, value_date, currency, amount, dr_cr, description, reference)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+_SQL_ALL_LEDGER = f'SELECT {_LEDGER_COLUMNS} FROM ledger_entries'
+_SQL_LEDGER_BY_REFERENCE = f'SELECT {_LEDGER_COLUMNS} FROM ledger_entries WHERE reference = ?'
+_SQL_INSERT_LEDGER = '''
+    INSERT INTO ledger_entries
+    (transaction_id, value_date, currency, amount, counterparty, reference, return_reason)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+_SQL_UPDATE_ENTRY_STATUS = 'UPDATE ledger_entries SET status = ? WHERE reference = ?'
+
+_SQL_CUSTOMER_BY_ACCOUNT = f'SELECT {_CUSTOMER_COLUMNS} FROM customers WHERE account_number = ?'
+_SQL_ALL_CUSTOMERS = f'SELECT {_CUSTOMER_COLUMNS} FROM customers'
+# The owner is taken from the first row holding the original account, and the
+# first matching row (by id) of that owner is suggested
+_SQL_ALTERNATE_ACCOUNT = '''
+    SELECT alternate.account_number
+    FROM customers AS original
+    JOIN customers AS alternate ON alternate.customer_name = original.customer_name
+    WHERE original.id = (SELECT id FROM customers WHERE account_number = ? ORDER BY id LIMIT 1)
+      AND alternate.account_number != ? AND alternate.account_status = "Active"
+    ORDER BY alternate.id
+    LIMIT 1
+'''
+
+_SQL_INSERT_AUDIT_EVENT = '''
+    INSERT INTO audit_events
+    (transaction_id, event_type, event_data, timestamp, user_id, details)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+_SQL_AUDIT_EVENTS = 'SELECT * FROM audit_events ORDER BY timestamp'
+# One top-level event_data value by exact key; empty event_data reads as no keys
+_SQL_EVENT_DATA_FIELD = "(SELECT value FROM json_each(NULLIF(event_data, '')) WHERE key = ?)"
+
+
+def _json_array_sql(columns: Sequence[str], source: str,
+                    expressions: Optional[Dict[str, str]] = None) -> str:
+    """SELECT building one JSON array of objects from source, keyed by column name."""
+    expressions = expressions or {}
+    pairs = ', '.join(f"'{name}', {expressions.get(name, name)}" for name in columns)
+    return f'SELECT json_group_array(json_object({pairs})) FROM {source}'
+
+
+# List endpoints can take the JSON array straight from SQLite without building entities
+_SQL_ALL_ACCOUNTS_JSON = _json_array_sql(entity_fields(Account), 'accounts')
+_SQL_ALL_CUSTOMERS_JSON = _json_array_sql(entity_fields(Customer), 'customers')
+_AUDIT_EVENT_JSON_COLUMNS = (
+    'id', 'transaction_id', 'event_type', 'event_data', 'timestamp', 'user_id', 'details')
+# event_data is embedded as JSON, not as a string; empty text reads as {} as in get_audit_events.
+# json() must be applied inside json_object(): a subquery column would lose its JSON type.
+_AUDIT_EVENT_JSON_EXPRESSIONS = {'event_data': "json(COALESCE(NULLIF(event_data, ''), '{}'))"}
+_SQL_AUDIT_EVENTS_JSON = _json_array_sql(
+    _AUDIT_EVENT_JSON_COLUMNS, '(SELECT * FROM audit_events ORDER BY timestamp)',
+    _AUDIT_EVENT_JSON_EXPRESSIONS)
+_SQL_AUDIT_EVENTS_FOR_TRANSACTION_JSON = _json_array_sql(
+    _AUDIT_EVENT_JSON_COLUMNS,
+    '(SELECT * FROM audit_events WHERE transaction_id = ? ORDER BY timestamp)',
+    _AUDIT_EVENT_JSON_EXPRESSIONS)
+_SQL_AUDIT_EVENTS_FOR_TRANSACTION = (
+    'SELECT * FROM audit_events WHERE transaction_id = ? ORDER BY timestamp')
+
+
+# Every repository table, index and trigger, created together by initialize_schema()
+_SCHEMA_STATEMENTS = (
+    '''
+    CREATE TABLE IF NOT EXISTS accounts (
+        account_number TEXT PRIMARY KEY,
+        account_name TEXT NOT NULL,
+        account_type TEXT NOT NULL,
+        currency TEXT NOT NULL,
+        country TEXT NOT NULL,
+        debit_credit_authority TEXT NOT NULL,
+        reconciliation_type TEXT NOT NULL,
+        gl_code TEXT NOT NULL,
+        opening_balance TEXT NOT NULL,
+        last_reconciled_date TEXT NOT NULL,
+        cost_center TEXT NOT NULL,
+        account_status TEXT NOT NULL
+    )
+    ''',
+    # Single-column so rows of one type still come back in table order
+    'CREATE INDEX IF NOT EXISTS idx_accounts_account_type ON accounts (account_type)',
+    '''
+    CREATE TABLE IF NOT EXISTS nostro_statements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        statement_id TEXT NOT NULL,
+        value_date TEXT NOT NULL,
+        currency TEXT NOT NULL,
+        amount TEXT NOT NULL,
+        dr_cr TEXT NOT NULL,
+        description TEXT NOT NULL,
+        reference TEXT NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS vostro_statements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        statement_id TEXT NOT NULL,
+        value_date TEXT NOT NULL,
+        currency TEXT NOT NULL,
+        amount TEXT NOT NULL,
+        dr_cr TEXT NOT NULL,
+        description TEXT NOT NULL,
+        reference TEXT NOT NULL
+    )
+    ''',
+    # find_nostro_match filters on currency plus an exact or LIKE reference
+    '''
+    CREATE INDEX IF NOT EXISTS idx_nostro_statements_currency_reference
+    ON nostro_statements (currency, reference)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS ledger_entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transaction_id TEXT NOT NULL,
+        value_date TEXT NOT NULL,
+        currency TEXT NOT NULL,
+        amount TEXT NOT NULL,
+        counterparty TEXT NOT NULL,
+        reference TEXT NOT NULL,
+        return_reason TEXT NOT NULL,
+        status TEXT DEFAULT 'pending'
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_ledger_entries_reference ON ledger_entries (reference)',
+    '''
+    CREATE TABLE IF NOT EXISTS customers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer_name TEXT NOT NULL,
+        account_name TEXT NOT NULL,
+        account_number TEXT NOT NULL,
+        account_type TEXT NOT NULL,
+        ledger_balance TEXT NOT NULL,
+        available_balance TEXT NOT NULL,
+        account_status TEXT NOT NULL,
+        email TEXT NOT NULL
+    )
+    ''',
+    # Customer lookups and alternate-account suggestions
+    'CREATE INDEX IF NOT EXISTS idx_customers_account_number ON customers (account_number)',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_customers_name_status
+    ON customers (customer_name, account_status)
+    ''',
+    # Superseded by idx_customers_name_status
+    'DROP INDEX IF EXISTS idx_customers_customer_name',
+    '''
+    CREATE TABLE IF NOT EXISTS audit_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transaction_id TEXT,
+        event_type TEXT NOT NULL,
+        event_data TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        user_id TEXT,
+        details TEXT
+    )
+    ''',
+    # Events are read back per transaction in timestamp order
+    '''
+    CREATE INDEX IF NOT EXISTS idx_audit_events_transaction
+    ON audit_events (transaction_id, timestamp)
+    ''',
+    # Unfiltered reads come back in timestamp order too
+    'CREATE INDEX IF NOT EXISTS idx_audit_events_timestamp ON audit_events (timestamp)',
+)
+_ANALYZED_TABLES = ('accounts', 'nostro_statements', 'ledger_entries', 'customers', 'audit_events')
+
+# Database key -> whether the nostro reference FTS index is available there
+_INITIALIZED_SCHEMAS: Dict[str, bool] = {}
+_SCHEMA_LOCK = threading.Lock()
+
+
+def initialize_schema(db_path: str) -> None:
+    """
+    Create every repository table and index in db_path, once per process.
+
+    All statements run on one connection in a single transaction; later calls
+    for the same path return immediately.
+    """
+    key = _database_key(db_path)
+    if key in _INITIALIZED_SCHEMAS:
+        return
+    with _SCHEMA_LOCK:
+        if key in _INITIALIZED_SCHEMAS:
+            return
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with _write_transaction(db_path) as conn:
+            for statement in _SCHEMA_STATEMENTS:
+                conn.execute(statement)
+            nostro_fts = _ensure_nostro_fts(conn)
+            for table in _ANALYZED_TABLES:
+                _analyze_once(conn, table)
+        _INITIALIZED_SCHEMAS[key] = nostro_fts
+
+
+def _ensure_nostro_fts(conn: sqlite3.Connection) -> bool:
+    """
+    Keep a trigram full-text index of nostro references for the UETR fallback.
+
+    The index is an external-content FTS5 table kept in sync by triggers, so
+    rows written by any connection are covered. Returns False when this
+    SQLite build lacks FTS5, in which case the plain LIKE scan is used.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'nostro_statements_fts'").fetchone()
+    if not exists:
+        try:
+            conn.execute(_SQL_CREATE_NOSTRO_FTS)
+        except sqlite3.OperationalError:
+            return False
+    for trigger in _SQL_NOSTRO_FTS_TRIGGERS:
+        conn.execute(trigger)
+    if not exists:
+        conn.execute(
+            "INSERT INTO nostro_statements_fts (nostro_statements_fts) VALUES ('rebuild')")
+    return True
+
 
 class SQLiteAccountRepository(AccountRepository):
     """SQLite implementation of AccountRepository."""
 
     def __init__(self, db_path: str = "data/bank_data.db"):
         self.db_path = db_path
-        self._ensure_db_exists()
+        initialize_schema(db_path)
+        self._lookups = _lookup_cache(db_path)
 
-    def _ensure_db_exists(self):
-        """Ensure database and tables exist."""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        with self._get_connection() as conn:
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS accounts (
-                    account_number TEXT PRIMARY KEY,
-                    account_name TEXT NOT NULL,
-                    account_type TEXT NOT NULL,
-                    currency TEXT NOT NULL,
-                    country TEXT NOT NULL,
-                    debit_credit_authority TEXT NOT NULL,
-                    reconciliation_type TEXT NOT NULL,
-                    gl_code TEXT NOT NULL,
-                    opening_balance TEXT NOT NULL,
-                    last_reconciled_date TEXT NOT NULL,
-                    cost_center TEXT NOT NULL,
-                    account_status TEXT NOT NULL
-                )
-            ''')
-
-    @contextmanager
     def _get_connection(self):
-        """Get database connection with proper error handling."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-        finally:
-            conn.close()
+        """Get a pooled database connection."""
+        return _pooled_connection(self.db_path)
+
+    def _write_connection(self):
+        """Get a pooled database connection inside a write transaction."""
+        return _write_transaction(self.db_path)
 
     def get_account(self, account_number: str) -> Optional[Account]:
         """Get account by account number."""
+        return self._lookups.get('account', account_number, self._load_account)
+
+    def _load_account(self, account_number: str) -> Optional[Account]:
+        """Read an account from the database, bypassing the lookup cache."""
         with self._get_connection() as conn:
-            cursor = conn.execute(
-                'SELECT * FROM accounts WHERE account_number = ?',
-                (account_number,)
-            )
-            row = cursor.fetchone()
+            row = _fetch_tuple(conn, _SQL_GET_ACCOUNT, (account_number,))
             if row:
-                return Account(
-                    account_number=row['account_number'],
-                    account_name=row['account_name'],
-                    account_type=row['account_type'],
-                    currency=row['currency'],
-                    country=row['country'],
-                    debit_credit_authority=row['debit_credit_authority'],
-                    reconciliation_type=row['reconciliation_type'],
-                    gl_code=row['gl_code'],
-                    opening_balance=row['opening_balance'],
-                    last_reconciled_date=row['last_reconciled_date'],
-                    cost_center=row['cost_center'],
-                    account_status=row['account_status']
-                )
+                return Account(*row)
         return None
 
     def get_accounts_by_type(self, account_type: str) -> List[Account]:
         """Get all accounts of a specific type."""
         with self._get_connection() as conn:
-            cursor = conn.execute(
-                'SELECT * FROM accounts WHERE account_type = ?',
-                (account_type,)
-            )
-            rows = cursor.fetchall()
-            return [
-                Account(
-                    account_number=row['account_number'],
-                    account_name=row['account_name'],
-                    account_type=row['account_type'],
-                    currency=row['currency'],
-                    country=row['country'],
-                    debit_credit_authority=row['debit_credit_authority'],
-                    reconciliation_type=row['reconciliation_type'],
-                    gl_code=row['gl_code'],
-                    opening_balance=row['opening_balance'],
-                    last_reconciled_date=row['last_reconciled_date'],
-                    cost_center=row['cost_center'],
-                    account_status=row['account_status']
-                ) for row in rows
-            ]
+            cursor = _tuple_cursor(conn).execute(_SQL_ACCOUNTS_BY_TYPE, (account_type,))
+            return [Account(*row) for row in cursor]
 
     def get_nostro_account_for_currency(self, currency: str) -> Optional[str]:
         """Get nostro account number for a currency."""
+        return self._lookups.get('nostro_currency', currency, self._load_nostro_account)
+
+    def _load_nostro_account(self, currency: str) -> Optional[str]:
+        """Read the nostro account for a currency, bypassing the lookup cache."""
         with self._get_connection() as conn:
-            cursor = conn.execute(
-                'SELECT account_number FROM accounts WHERE account_type = "Nostro" AND currency = ? LIMIT 1',
-                (currency,)
-            )
-            row = cursor.fetchone()
-            return row['account_number'] if row else None
+            row = _fetch_tuple(conn, _SQL_NOSTRO_ACCOUNT_FOR_CURRENCY, (currency,))
+            return row[0] if row else None
 
     def update_account_balance(self, account_number: str, amount: float, operation: str) -> bool:
         """Update account balance (debit/credit)."""
+        if operation.lower() == 'debit':
+            delta = -amount
+        elif operation.lower() == 'credit':
+            delta = amount
+        else:
+            return False
+
         try:
-            with self._get_connection() as conn:
-                # Get current balance
-                cursor = conn.execute(
-                    'SELECT opening_balance FROM accounts WHERE account_number = ?',
-                    (account_number,)
-                )
-                row = cursor.fetchone()
-                if not row:
-                    return False
-
-                current_balance = float(row['opening_balance'])
-
-                # Calculate new balance
-                if operation.lower() == 'debit':
-                    new_balance = current_balance - amount
-                elif operation.lower() == 'credit':
-                    new_balance = current_balance + amount
-                else:
-                    return False
-
-                # Update balance
-                conn.execute(
-                    'UPDATE accounts SET opening_balance = ? WHERE account_number = ?',
-                    (str(new_balance), account_number)
-                )
-                conn.commit()
-                return True
-        except Exception as e:
-            print(f"Error updating account balance: {e}")
+            # One statement reads and rewrites the balance, so no lock is held across calls;
+            # a balance float() rejects makes balance_after raise and the update fail
+            with self._write_connection() as conn:
+                params = (delta, account_number)
+                if _HAS_RETURNING:
+                    return len(conn.execute(_SQL_APPLY_BALANCE_DELTA_RETURNING, params).fetchall()) == 1
+                return conn.execute(_SQL_APPLY_BALANCE_DELTA, params).rowcount == 1
+        except sqlite3.Error:
+            logger.exception("Error updating account balance")
             return False
 
     def get_all_accounts(self) -> List[Account]:
         """Get all accounts."""
+        return list(self.iter_all_accounts())
+
+    def iter_all_accounts(self) -> Iterator[Account]:
+        """Stream all accounts in batches of rows."""
+        return _iter_entities(self.db_path, _SQL_ALL_ACCOUNTS, Account)
+
+    def get_all_accounts_columns(self) -> ColumnBatch:
+        """Get all accounts as columns keyed by Account field name."""
         with self._get_connection() as conn:
-            cursor = conn.execute('SELECT * FROM accounts')
-            rows = cursor.fetchall()
-            return [
-                Account(
-                    account_number=row['account_number'],
-                    account_name=row['account_name'],
-                    account_type=row['account_type'],
-                    currency=row['currency'],
-                    country=row['country'],
-                    debit_credit_authority=row['debit_credit_authority'],
-                    reconciliation_type=row['reconciliation_type'],
-                    gl_code=row['gl_code'],
-                    opening_balance=row['opening_balance'],
-                    last_reconciled_date=row['last_reconciled_date'],
-                    cost_center=row['cost_center'],
-                    account_status=row['account_status']
-                ) for row in rows
-            ]
+            return _fetch_columns(conn, 'accounts', Account)
+
+    def get_all_accounts_json(self) -> bytes:
+        """Get all accounts as a JSON array, serialized by SQLite's json_group_array."""
+        with self._get_connection() as conn:
+            return _fetch_json_array(conn, _SQL_ALL_ACCOUNTS_JSON, ())
 
 
 class SQLiteStatementRepository(StatementRepository):
@@ -177,165 +621,144 @@ class SQLiteStatementRepository(StatementRepository):
 
     def __init__(self, db_path: str = "data/bank_data.db"):
         self.db_path = db_path
-        self._ensure_db_exists()
+        initialize_schema(db_path)
+        self._nostro_fts = _INITIALIZED_SCHEMAS[_database_key(db_path)]
 
-    def _ensure_db_exists(self):
-        """Ensure database and tables exist."""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        with self._get_connection() as conn:
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS nostro_statements (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    statement_id TEXT NOT NULL,
-                    value_date TEXT NOT NULL,
-                    currency TEXT NOT NULL,
-                    amount TEXT NOT NULL,
-                    dr_cr TEXT NOT NULL,
-                    description TEXT NOT NULL,
-                    reference TEXT NOT NULL
-                )
-            ''')
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS vostro_statements (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    statement_id TEXT NOT NULL,
-                    value_date TEXT NOT NULL,
-                    currency TEXT NOT NULL,
-                    amount TEXT NOT NULL,
-                    dr_cr TEXT NOT NULL,
-                    description TEXT NOT NULL,
-                    reference TEXT NOT NULL
-                )
-            ''')
-
-    @contextmanager
     def _get_connection(self):
-        """Get database connection with proper error handling."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-        finally:
-            conn.close()
+        """Get a pooled database connection."""
+        return _pooled_connection(self.db_path)
+
+    def _write_connection(self):
+        """Get a pooled database connection inside a write transaction."""
+        return _write_transaction(self.db_path)
 
     def get_nostro_entries(self) -> List[StatementEntry]:
         """Get all nostro statement entries."""
+        return list(self.iter_nostro_entries())
+
+    def iter_nostro_entries(self) -> Iterator[StatementEntry]:
+        """Stream all nostro statement entries in batches of rows."""
+        return _iter_entities(self.db_path, _SQL_ALL_NOSTRO, StatementEntry)
+
+    def get_nostro_columns(self) -> ColumnBatch:
+        """Get all nostro statement entries as columns keyed by StatementEntry field name."""
         with self._get_connection() as conn:
-            cursor = conn.execute('SELECT * FROM nostro_statements')
-            rows = cursor.fetchall()
-            return [
-                StatementEntry(
-                    statement_id=row['statement_id'],
-                    value_date=row['value_date'],
-                    currency=row['currency'],
-                    amount=row['amount'],
-                    dr_cr=row['dr_cr'],
-                    description=row['description'],
-                    reference=row['reference']
-                ) for row in rows
-            ]
+            return _fetch_columns(conn, 'nostro_statements', StatementEntry)
 
     def get_vostro_entries(self) -> List[StatementEntry]:
         """Get all vostro statement entries."""
+        return list(self.iter_vostro_entries())
+
+    def iter_vostro_entries(self) -> Iterator[StatementEntry]:
+        """Stream all vostro statement entries in batches of rows."""
+        return _iter_entities(self.db_path, _SQL_ALL_VOSTRO, StatementEntry)
+
+    def get_vostro_columns(self) -> ColumnBatch:
+        """Get all vostro statement entries as columns keyed by StatementEntry field name."""
         with self._get_connection() as conn:
-            cursor = conn.execute('SELECT * FROM vostro_statements')
-            rows = cursor.fetchall()
-            return [
-                StatementEntry(
-                    statement_id=row['statement_id'],
-                    value_date=row['value_date'],
-                    currency=row['currency'],
-                    amount=row['amount'],
-                    dr_cr=row['dr_cr'],
-                    description=row['description'],
-                    reference=row['reference']
-                ) for row in rows
-            ]
+            return _fetch_columns(conn, 'vostro_statements', StatementEntry)
 
     def find_nostro_match(self, reference: str, uetr: str, amount: float, currency: str) -> Dict[str, Any]:
         """Find matching nostro entry (exact or partial)."""
         with self._get_connection() as conn:
-            # Try exact match first
-            cursor = conn.execute(
-                'SELECT * FROM nostro_statements WHERE reference = ? AND amount = ? AND currency = ?',
-                (reference, str(amount), currency)
-            )
-            row = cursor.fetchone()
+            return self._match_nostro(conn, reference, uetr, amount, currency)
 
-            if row:
-                return {
-                    'found': True,
-                    'match_type': 'exact',
-                    'nostro_entry': StatementEntry(
-                        statement_id=row['statement_id'],
-                        value_date=row['value_date'],
-                        currency=row['currency'],
-                        amount=row['amount'],
-                        dr_cr=row['dr_cr'],
-                        description=row['description'],
-                        reference=row['reference']
-                    )
-                }
+    def find_nostro_match_batch(self, queries: Iterable[NostroMatchQuery]) -> List[Dict[str, Any]]:
+        """
+        Find matching nostro entries for many payments at once.
 
-            # Try partial match by UETR
-            cursor = conn.execute(
-                'SELECT * FROM nostro_statements WHERE reference LIKE ? AND currency = ?',
-                (f'%{uetr}%', currency)
-            )
-            row = cursor.fetchone()
+        The exact matches for every query come from one SQL join; only the
+        queries without one fall back to the partial UETR match.
 
-            if row:
-                return {
-                    'found': True,
-                    'match_type': 'partial',
-                    'nostro_entry': StatementEntry(
-                        statement_id=row['statement_id'],
-                        value_date=row['value_date'],
-                        currency=row['currency'],
-                        amount=row['amount'],
-                        dr_cr=row['dr_cr'],
-                        description=row['description'],
-                        reference=row['reference']
-                    )
-                }
+        Args:
+            queries: (reference, uetr, amount, currency) tuples
+
+        Returns:
+            One find_nostro_match result per query, in query order
+        """
+        queries = list(queries)
+        keys = json.dumps([[reference, str(amount), currency]
+                           for reference, _, amount, currency in queries])
+        with self._get_connection() as conn:
+            exact = {row[0]: row[1:] for row in
+                     _tuple_cursor(conn).execute(_SQL_NOSTRO_EXACT_MATCH_BATCH, (keys,))}
+            return [
+                self._exact_nostro_match(exact[index]) if index in exact
+                else self._match_nostro_partial(conn, uetr, currency)
+                for index, (_, uetr, _, currency) in enumerate(queries)
+            ]
+
+    def _match_nostro(self, conn: sqlite3.Connection, reference: str, uetr: str,
+                      amount: float, currency: str) -> Dict[str, Any]:
+        """Run the exact then partial nostro match queries on an open connection."""
+        # Try exact match first
+        row = _fetch_tuple(conn, _SQL_NOSTRO_EXACT_MATCH, (reference, str(amount), currency))
 
-            return {'found': False, 'match_type': 'none', 'nostro_entry': None}
+        if row:
+            return self._exact_nostro_match(row)
+
+        return self._match_nostro_partial(conn, uetr, currency)
+
+    @staticmethod
+    def _exact_nostro_match(row: tuple) -> Dict[str, Any]:
+        """find_nostro_match result for an exactly matched statement row."""
+        return {
+            'found': True,
+            'match_type': 'exact',
+            'nostro_entry': StatementEntry(*row)
+        }
+
+    def _match_nostro_partial(self, conn: sqlite3.Connection, uetr: str, currency: str) -> Dict[str, Any]:
+        """Match a payment by UETR alone, after its exact match failed."""
+        pattern = f'%{uetr}%'
+        if self._nostro_fts:
+            row = _fetch_tuple(conn, _SQL_NOSTRO_PARTIAL_MATCH_FTS, (pattern, pattern, currency))
+        else:
+            row = _fetch_tuple(conn, _SQL_NOSTRO_PARTIAL_MATCH, (pattern, currency))
+
+        if row:
+            return {
+                'found': True,
+                'match_type': 'partial',
+                'nostro_entry': StatementEntry(*row)
+            }
+
+        return {'found': False, 'match_type': 'none', 'nostro_entry': None}
 
     def add_nostro_entry(self, entry: StatementEntry) -> bool:
         """Add new nostro statement entry."""
-        try:
-            with self._get_connection() as conn:
-                conn.execute('''
-                    INSERT INTO nostro_statements 
-                    (statement_id, value_date, currency, amount, dr_cr, description, reference)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    entry.statement_id, entry.value_date, entry.currency,
-                    entry.amount, entry.dr_cr, entry.description, entry.reference
-                ))
-                conn.commit()
-                return True
-        except Exception as e:
-            print(f"Error adding nostro entry: {e}")
-            return False
+        return self.add_nostro_entries([entry]) == 1
 
     def add_vostro_entry(self, entry: StatementEntry) -> bool:
         """Add new vostro statement entry."""
+        return self.add_vostro_entries([entry]) == 1
+
+    def add_nostro_entries(self, entries: Iterable[StatementEntry]) -> int:
+        """Add several nostro statement entries in one transaction; returns the number added."""
         try:
-            with self._get_connection() as conn:
-                conn.execute('''
-                    INSERT INTO vostro_statements 
-                    (statement_id, value_date, currency, amount, dr_cr, description, reference)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    entry.statement_id, entry.value_date, entry.currency,
-                    entry.amount, entry.dr_cr, entry.description, entry.reference
-                ))
-                conn.commit()
-                return True
-        except Exception as e:
-            print(f"Error adding vostro entry: {e}")
-            return False
+            return self._insert_statement_entries(_SQL_INSERT_NOSTRO, entries)
+        except sqlite3.Error:
+            logger.exception("Error adding nostro entry")
+            return 0
+
+    def add_vostro_entries(self, entries: Iterable[StatementEntry]) -> int:
+        """Add several vostro statement entries in one transaction; returns the number added."""
+        try:
+            return self._insert_statement_entries(_SQL_INSERT_VOSTRO, entries)
+        except sqlite3.Error:
+            logger.exception("Error adding vostro entry")
+            return 0
+
+    def _insert_statement_entries(self, sql: str, entries: Iterable[StatementEntry]) -> int:
+        """Insert statement entries with executemany using a statement table's INSERT."""
+        params = [
+            (entry.statement_id, entry.value_date, entry.currency,
+             entry.amount, entry.dr_cr, entry.description, entry.reference)
+            for entry in entries
+        ]
+        with self._write_connection() as conn:
+            conn.executemany(sql, params)
+        return len(params)
 
 
 class SQLiteLedgerRepository(LedgerRepository):
@@ -343,103 +766,64 @@ class SQLiteLedgerRepository(LedgerRepository):
 
     def __init__(self, db_path: str = "data/bank_data.db"):
         self.db_path = db_path
-        self._ensure_db_exists()
+        initialize_schema(db_path)
 
-    def _ensure_db_exists(self):
-        """Ensure database and tables exist."""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        with self._get_connection() as conn:
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS ledger_entries (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    transaction_id TEXT NOT NULL,
-                    value_date TEXT NOT NULL,
-                    currency TEXT NOT NULL,
-                    amount TEXT NOT NULL,
-                    counterparty TEXT NOT NULL,
-                    reference TEXT NOT NULL,
-                    return_reason TEXT NOT NULL,
-                    status TEXT DEFAULT 'pending'
-                )
-            ''')
-
-    @contextmanager
     def _get_connection(self):
-        """Get database connection with proper error handling."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-        finally:
-            conn.close()
+        """Get a pooled database connection."""
+        return _pooled_connection(self.db_path)
+
+    def _write_connection(self):
+        """Get a pooled database connection inside a write transaction."""
+        return _write_transaction(self.db_path)
 
     def get_ledger_entries(self) -> List[LedgerEntry]:
         """Get all ledger entries."""
+        return list(self.iter_ledger_entries())
+
+    def iter_ledger_entries(self) -> Iterator[LedgerEntry]:
+        """Stream all ledger entries in batches of rows."""
+        return _iter_entities(self.db_path, _SQL_ALL_LEDGER, LedgerEntry)
+
+    def get_ledger_columns(self) -> ColumnBatch:
+        """Get all ledger entries as columns keyed by LedgerEntry field name."""
         with self._get_connection() as conn:
-            cursor = conn.execute('SELECT * FROM ledger_entries')
-            rows = cursor.fetchall()
-            return [
-                LedgerEntry(
-                    transaction_id=row['transaction_id'],
-                    value_date=row['value_date'],
-                    currency=row['currency'],
-                    amount=row['amount'],
-                    counterparty=row['counterparty'],
-                    reference=row['reference'],
-                    return_reason=row['return_reason']
-                ) for row in rows
-            ]
+            return _fetch_columns(conn, 'ledger_entries', LedgerEntry)
 
     def get_entry_by_reference(self, reference: str) -> Optional[LedgerEntry]:
         """Get ledger entry by reference."""
         with self._get_connection() as conn:
-            cursor = conn.execute(
-                'SELECT * FROM ledger_entries WHERE reference = ?',
-                (reference,)
-            )
-            row = cursor.fetchone()
+            row = _fetch_tuple(conn, _SQL_LEDGER_BY_REFERENCE, (reference,))
             if row:
-                return LedgerEntry(
-                    transaction_id=row['transaction_id'],
-                    value_date=row['value_date'],
-                    currency=row['currency'],
-                    amount=row['amount'],
-                    counterparty=row['counterparty'],
-                    reference=row['reference'],
-                    return_reason=row['return_reason']
-                )
+                return LedgerEntry(*row)
         return None
 
     def add_ledger_entry(self, entry: LedgerEntry) -> bool:
         """Add new ledger entry."""
+        return self.add_ledger_entries([entry]) == 1
+
+    def add_ledger_entries(self, entries: Iterable[LedgerEntry]) -> int:
+        """Add several ledger entries in one transaction; returns the number added."""
         try:
-            with self._get_connection() as conn:
-                conn.execute('''
-                    INSERT INTO ledger_entries 
-                    (transaction_id, value_date, currency, amount, counterparty, reference, return_reason)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    entry.transaction_id, entry.value_date, entry.currency,
-                    entry.amount, entry.counterparty, entry.reference, entry.return_reason
-                ))
-                conn.commit()
-                return True
-        except Exception as e:
-            print(f"Error adding ledger entry: {e}")
-            return False
+            params = [
+                (entry.transaction_id, entry.value_date, entry.currency,
+                 entry.amount, entry.counterparty, entry.reference, entry.return_reason)
+                for entry in entries
+            ]
+            with self._write_connection() as conn:
+                conn.executemany(_SQL_INSERT_LEDGER, params)
+            return len(params)
+        except sqlite3.Error:
+            logger.exception("Error adding ledger entry")
+            return 0
 
     def update_entry_status(self, reference: str, status: str) -> bool:
         """Update entry status."""
         try:
-            with self._get_connection() as conn:
-                conn.execute(
-                    'UPDATE ledger_entries SET status = ? WHERE reference = ?',
-                    (status, reference)
-                )
-                conn.commit()
+            with self._write_connection() as conn:
+                conn.execute(_SQL_UPDATE_ENTRY_STATUS, (status, reference))
                 return True
-        except Exception as e:
-            print(f"Error updating entry status: {e}")
+        except sqlite3.Error:
+            logger.exception("Error updating entry status")
             return False
 
 
@@ -448,55 +832,23 @@ class SQLiteCustomerRepository(CustomerRepository):
 
     def __init__(self, db_path: str = "data/bank_data.db"):
         self.db_path = db_path
-        self._ensure_db_exists()
+        initialize_schema(db_path)
+        self._lookups = _lookup_cache(db_path)
 
-    def _ensure_db_exists(self):
-        """Ensure database and tables exist."""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        with self._get_connection() as conn:
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS customers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    customer_name TEXT NOT NULL,
-                    account_name TEXT NOT NULL,
-                    account_number TEXT NOT NULL,
-                    account_type TEXT NOT NULL,
-                    ledger_balance TEXT NOT NULL,
-                    available_balance TEXT NOT NULL,
-                    account_status TEXT NOT NULL,
-                    email TEXT NOT NULL
-                )
-            ''')
-
-    @contextmanager
     def _get_connection(self):
-        """Get database connection with proper error handling."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-        finally:
-            conn.close()
+        """Get a pooled database connection."""
+        return _pooled_connection(self.db_path)
 
     def get_customer_by_account(self, account_number: str) -> Optional[Customer]:
         """Get customer by account number."""
+        return self._lookups.get('customer', account_number, self._load_customer)
+
+    def _load_customer(self, account_number: str) -> Optional[Customer]:
+        """Read a customer from the database, bypassing the lookup cache."""
         with self._get_connection() as conn:
-            cursor = conn.execute(
-                'SELECT * FROM customers WHERE account_number = ?',
-                (account_number,)
-            )
-            row = cursor.fetchone()
+            row = _fetch_tuple(conn, _SQL_CUSTOMER_BY_ACCOUNT, (account_number,))
             if row:
-                return Customer(
-                    customer_name=row['customer_name'],
-                    account_name=row['account_name'],
-                    account_number=row['account_number'],
-                    account_type=row['account_type'],
-                    ledger_balance=row['ledger_balance'],
-                    available_balance=row['available_balance'],
-                    account_status=row['account_status'],
-                    email=row['email']
-                )
+                return Customer(*row)
         return None
 
     def get_customer_by_iban(self, iban: str) -> Optional[Customer]:
@@ -506,43 +858,27 @@ class SQLiteCustomerRepository(CustomerRepository):
 
     def get_all_customers(self) -> List[Customer]:
         """Get all customers."""
+        return list(self.iter_all_customers())
+
+    def iter_all_customers(self) -> Iterator[Customer]:
+        """Stream all customers in batches of rows."""
+        return _iter_entities(self.db_path, _SQL_ALL_CUSTOMERS, Customer)
+
+    def get_all_customers_columns(self) -> ColumnBatch:
+        """Get all customers as columns keyed by Customer field name."""
         with self._get_connection() as conn:
-            cursor = conn.execute('SELECT * FROM customers')
-            rows = cursor.fetchall()
-            return [
-                Customer(
-                    customer_name=row['customer_name'],
-                    account_name=row['account_name'],
-                    account_number=row['account_number'],
-                    account_type=row['account_type'],
-                    ledger_balance=row['ledger_balance'],
-                    available_balance=row['available_balance'],
-                    account_status=row['account_status'],
-                    email=row['email']
-                ) for row in rows
-            ]
+            return _fetch_columns(conn, 'customers', Customer)
+
+    def get_all_customers_json(self) -> bytes:
+        """Get all customers as a JSON array, serialized by SQLite's json_group_array."""
+        with self._get_connection() as conn:
+            return _fetch_json_array(conn, _SQL_ALL_CUSTOMERS_JSON, ())
 
     def suggest_alternate_account(self, original_account: str) -> Optional[str]:
         """Suggest alternate active account for customer."""
         with self._get_connection() as conn:
-            # Get customer info from original account
-            cursor = conn.execute(
-                'SELECT customer_name FROM customers WHERE account_number = ?',
-                (original_account,)
-            )
-            row = cursor.fetchone()
-            if not row:
-                return None
-
-            customer_name = row['customer_name']
-
-            # Find another active account for the same customer
-            cursor = conn.execute(
-                'SELECT account_number FROM customers WHERE customer_name = ? AND account_number != ? AND account_status = "Active" LIMIT 1',
-                (customer_name, original_account)
-            )
-            row = cursor.fetchone()
-            return row['account_number'] if row else None
+            row = _fetch_tuple(conn, _SQL_ALTERNATE_ACCOUNT, (original_account, original_account))
+            return row[0] if row else None
 
 
 class SQLiteAuditRepository(AuditRepository):
@@ -551,81 +887,140 @@ class SQLiteAuditRepository(AuditRepository):
     def __init__(self, db_path: str = "data/bank_data.db", reports_dir: str = "csv_reports"):
         self.db_path = db_path
         self.reports_dir = reports_dir
-        self._ensure_db_exists()
+        initialize_schema(db_path)
         os.makedirs(reports_dir, exist_ok=True)
+        # Events from add_audit_event_async, written by one background thread
+        self._pending_events: queue.Queue = queue.Queue()
+        self._audit_writer: Optional[threading.Thread] = None
+        self._audit_writer_lock = threading.Lock()
 
-    def _ensure_db_exists(self):
-        """Ensure database and tables exist."""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        with self._get_connection() as conn:
-            conn.execute('''
-                CREATE TABLE IF NOT EXISTS audit_events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    transaction_id TEXT,
-                    event_type TEXT NOT NULL,
-                    event_data TEXT NOT NULL,
-                    timestamp TEXT NOT NULL,
-                    user_id TEXT,
-                    details TEXT
-                )
-            ''')
-
-    @contextmanager
     def _get_connection(self):
-        """Get database connection with proper error handling."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-        finally:
-            conn.close()
+        """Get a pooled database connection."""
+        return _pooled_connection(self.db_path)
+
+    def _write_connection(self):
+        """Get a pooled database connection inside a write transaction."""
+        return _write_transaction(self.db_path)
+
+    def _audit_params(self, event: Dict[str, Any]) -> tuple:
+        """Convert an audit event to audit_events INSERT parameters."""
+        # Only read the clock for events that arrive without a timestamp
+        timestamp = event['timestamp'] if 'timestamp' in event else datetime.now().isoformat()
+        return (
+            event.get('transaction_id'),
+            event.get('event_type', 'unknown'),
+            json.dumps(event.get('event_data', {})),
+            timestamp,
+            str(event.get('user_id', 'system')),
+            str(event.get('details', ''))
+        )
 
     def add_audit_event(self, event: Dict[str, Any]) -> bool:
         """Add audit event."""
+        return self.add_audit_events([event]) == 1
+
+    def add_audit_events(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Add several audit events in one transaction; returns the number added."""
         try:
-            with self._get_connection() as conn:
-                conn.execute('''
-                    INSERT INTO audit_events 
-                    (transaction_id, event_type, event_data, timestamp, user_id, details)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
-                    event.get('transaction_id'),
-                    event.get('event_type', 'unknown'),
-                    json.dumps(event.get('event_data', {})),
-                    event.get('timestamp', datetime.now().isoformat()),
-                    str(event.get('user_id', 'system')),
-                    str(event.get('details', ''))
-                ))
-                conn.commit()
-                return True
-        except Exception as e:
-            print(f"Error adding audit event: {e}")
-            return False
+            params = [self._audit_params(event) for event in events]
+            with self._write_connection() as conn:
+                conn.executemany(_SQL_INSERT_AUDIT_EVENT, params)
+            return len(params)
+        except (sqlite3.Error, TypeError, ValueError):
+            # TypeError/ValueError: event_data that json.dumps cannot serialize
+            logger.exception("Error adding audit event")
+            return 0
+
+    def add_audit_event_async(self, event: Dict[str, Any]) -> None:
+        """
+        Queue an audit event for the background writer thread.
+
+        Queued events are serialized and inserted in batches; the event must not be
+        modified after it is queued. Call flush_audit_events() to wait for them.
+        """
+        if 'timestamp' not in event:
+            event = {**event, 'timestamp': datetime.now().isoformat()}
+        self._start_audit_writer()
+        self._pending_events.put(event)
+
+    def flush_audit_events(self) -> None:
+        """Block until every queued audit event has been written."""
+        self._pending_events.join()
+
+    def _start_audit_writer(self):
+        """Start the background audit writer on first use."""
+        if self._audit_writer is not None:
+            return
+        with self._audit_writer_lock:
+            if self._audit_writer is None:
+                writer = threading.Thread(
+                    target=self._write_pending_events, name='audit-writer', daemon=True)
+                writer.start()
+                # Daemon threads are killed at exit; write what is still queued first
+                atexit.register(self.flush_audit_events)
+                self._audit_writer = writer
+
+    def _write_pending_events(self):
+        """Writer thread loop: insert queued events in batches of up to _AUDIT_WRITE_BATCH."""
+        while True:
+            batch = [self._pending_events.get()]
+            while len(batch) < _AUDIT_WRITE_BATCH:
+                try:
+                    batch.append(self._pending_events.get_nowait())
+                except queue.Empty:
+                    break
+            self.add_audit_events(batch)
+            for _ in batch:
+                self._pending_events.task_done()
+
+    def get_audit_events_json(self, transaction_id: Optional[str] = None) -> bytes:
+        """Get audit events as a JSON array, serialized by SQLite with event_data embedded as JSON."""
+        with self._get_connection() as conn:
+            if transaction_id:
+                return _fetch_json_array(conn, _SQL_AUDIT_EVENTS_FOR_TRANSACTION_JSON, (transaction_id,))
+            return _fetch_json_array(conn, _SQL_AUDIT_EVENTS_JSON, ())
+
+    def get_audit_events_projection(self, fields: Sequence[str],
+                                    transaction_id: Optional[str] = None) -> Iterator[Tuple[Any, ...]]:
+        """
+        Stream selected top-level event_data fields as tuples, extracted by SQLite.
+
+        Nested objects and arrays come back as JSON text and booleans as 1/0.
+        """
+        # Keys are matched through json_each rather than spliced into a '$."key"'
+        # path, which has no escape for '"' and would miss such keys
+        columns = ', '.join(_SQL_EVENT_DATA_FIELD for _ in fields)
+        params: List[Any] = list(fields)
+        if transaction_id:
+            sql = (f'SELECT {columns} FROM audit_events '
+                   'WHERE transaction_id = ? ORDER BY timestamp')
+            params.append(transaction_id)
+        else:
+            sql = f'SELECT {columns} FROM audit_events ORDER BY timestamp'
+
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            yield from cursor.execute(sql, params)
 
-    def get_audit_events(self, transaction_id: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get audit events, optionally filtered by transaction ID."""
+    def get_audit_events(self, transaction_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Stream audit events from the cursor, optionally filtered by transaction ID."""
         with self._get_connection() as conn:
             if transaction_id:
-                cursor = conn.execute(
-                    'SELECT * FROM audit_events WHERE transaction_id = ? ORDER BY timestamp',
-                    (transaction_id,)
-                )
+                cursor = conn.execute(_SQL_AUDIT_EVENTS_FOR_TRANSACTION, (transaction_id,))
             else:
-                cursor = conn.execute(
-                    'SELECT * FROM audit_events ORDER BY timestamp')
+                cursor = conn.execute(_SQL_AUDIT_EVENTS)
 
-            rows = cursor.fetchall()
-            return [
-                {
+            for row in cursor:
+                yield {
                     'id': row['id'],
                     'transaction_id': row['transaction_id'],
                     'event_type': row['event_type'],
-                    'event_data': json.loads(row['event_data']) if row['event_data'] else {},
+                    'event_data': load_event_data(row['event_data']),
                     'timestamp': row['timestamp'],
                     'user_id': row['user_id'],
                     'details': row['details']
-                } for row in rows
-            ]
+                }
 
     def save_run_report(self, run_id: str, report_data: Dict[str, Any]) -> str:
         """Save run report and return file path."""
@@ -634,25 +1029,28 @@ class SQLiteAuditRepository(AuditRepository):
             temp_file_path = file_path + ".tmp"
 
             # Write to temporary file first to avoid corruption
-            with open(temp_file_path, 'w', encoding='utf-8') as f:
-                json.dump(report_data, f, indent=2,
-                          ensure_ascii=False, default=str)
-
-            # Atomic move to final location
-            import shutil
-            shutil.move(temp_file_path, file_path)
-
-            print(f"Successfully saved run report: {file_path}")
+            data = dump_run_report(report_data)
+            with open(temp_file_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+            # Checksum first, then atomic rename to final location and persist the directory entries
+            write_report_checksum(file_path, data)
+            os.replace(temp_file_path, file_path)
+            _fsync_directory(self.reports_dir)
+
+            logger.info("Successfully saved run report: %s", file_path)
             return file_path
-        except Exception as e:
-            print(f"Error saving run report: {e}")
+        except (OSError, TypeError, ValueError):
+            logger.exception("Error saving run report")
             # Clean up temp file if it exists
             temp_file_path = os.path.join(
                 self.reports_dir, f"{run_id}.json.tmp")
             if os.path.exists(temp_file_path):
                 try:
                     os.remove(temp_file_path)
-                except:
+                except OSError:
                     pass
             return ""
 
@@ -661,10 +1059,14 @@ class SQLiteAuditRepository(AuditRepository):
         try:
             file_path = os.path.join(self.reports_dir, f"{run_id}.json")
             if os.path.exists(file_path):
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except Exception as e:
-            print(f"Error loading run report: {e}")
+                with open(file_path, 'rb') as f:
+                    data = f.read()
+                if not verify_report_checksum(file_path, data):
+                    logger.warning("Run report checksum mismatch: %s", file_path)
+                    return None
+                return load_run_report(data)
+        except (OSError, ValueError):
+            logger.exception("Error loading run report")
         return None
 
     def record_balance_change(self, transaction_id: str, account_number: str,
@@ -694,7 +1096,10 @@ class SQLiteAuditRepository(AuditRepository):
 
 # Factory function to create repository instances
 def create_repositories(db_path: str = "data/bank_data.db", reports_dir: str = "csv_reports"):
-    """Create SQLite repository instances."""
+    """Create SQLite repository instances, seeding a missing database from the CSV files beside it."""
+    if not os.path.exists(db_path):
+        migrate_csv_to_sqlite(os.path.dirname(db_path) or '.', db_path)
+    initialize_schema(db_path)
     return {
         'accounts': SQLiteAccountRepository(db_path),
         'statements': SQLiteStatementRepository(db_path),
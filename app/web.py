@@ -1,18 +1,76 @@
-from flask import Flask, render_template, request, redirect, url_for, send_file, jsonify
+from flask import Flask, Response, render_template, request, redirect, url_for, send_file, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import functools
 import io
-import os
 import json
 import uuid
 import pathlib
-import xml.etree.ElementTree as ET
+import threading
+from lxml import etree
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Type, cast
 from app.graph import build_graph
 from app.utils.csv_repositories import create_repositories
+from app.utils.repositories import dump_run_report, load_run_report
 from app.agents.loggerAg import run_prep_logger
 
+# Prefer orjson (C extension) for API responses when installed
+try:
+    import orjson
+
+    _RESPONSE_JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that encodes with orjson, keeping the default provider's
+    sorted keys and fallback serializer (dates, UUIDs, dataclasses, Decimals).
+    Anything orjson rejects, e.g. integers beyond 64 bits, goes to the default provider.
+    """
+
+    def _encode(self, obj: Any, indent: bool = False) -> bytes | None:
+        if orjson is None:
+            return None
+        option = _RESPONSE_JSON_OPTIONS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option)
+        except orjson.JSONEncodeError:
+            return None
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        encoded = self._encode(obj, bool(kwargs.get('indent')))
+        if encoded is None:
+            return super().dumps(obj, **kwargs)
+        return encoded.decode('utf-8')
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass  # e.g. NaN, which only the stdlib parser accepts
+        return super().loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        encoded = self._encode(obj, pretty)
+        if encoded is None:
+            return super().response(obj)
+        # _app is typed as the sansio App, whose response class takes no body
+        response_class = cast(Type[Response], self._app.response_class)
+        return response_class(encoded + b"\n", mimetype=self.mimetype)
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)  # Enable CORS for all routes
 
 # Use csv_reports directory instead of runs
@@ -36,10 +94,27 @@ CASE_SCENARIOS = {
 }
 
 
-def invoke_graph(pacs004_text: str, pacs008_text: str, fx_loss_aud: float, non_branch: bool, sanctions: bool, case_id: str = None):
+def load_sample(filename: str) -> bytes:
+    """Bytes of a bundled sample message, re-read from samples/ only after the file changes."""
+    path = pathlib.Path("samples", filename)
+    return _read_sample(path, path.stat().st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=64)
+def _read_sample(path: pathlib.Path, mtime_ns: int) -> bytes:
+    """Sample bytes cached per modification time, so an edited sample is never served stale."""
+    return path.read_bytes()
+
+
+@functools.lru_cache(maxsize=1)
+def compiled_graph():
+    """The compiled pipeline, built once per process; it has no checkpointer, so runs share no state."""
+    return build_graph()
+
+
+def invoke_graph(pacs004_text: str | bytes, pacs008_text: str | bytes, fx_loss_aud: float, non_branch: bool, sanctions: bool, case_id: str = None):
     """Invoke the graph pipeline with the new agent-based workflow."""
-    graph = build_graph()
-    return graph.invoke({
+    return compiled_graph().invoke({
         "pacs004_xml": pacs004_text,
         "pacs008_xml": pacs008_text,
         "fx_loss_aud": fx_loss_aud,
@@ -56,7 +131,7 @@ def load_run(run_id: str):
         return None
 
     try:
-        return json.loads(p.read_text())
+        return load_run_report(p.read_bytes())
     except json.JSONDecodeError as e:
         print(f"Warning: Corrupted JSON file {p}: {e}")
         # Try to find a backup or return None
@@ -66,136 +141,209 @@ def load_run(run_id: str):
         return None
 
 
-def parse_pacs_xml(xml_content: str, message_type: str):
+# Namespace versions tried for uploaded messages, in order; the .08 version is
+# assumed when none of them has a MsgId
+PACS_NS_VERSIONS = {
+    'pacs004': [
+        'urn:iso:std:iso:20022:tech:xsd:pacs.004.001.09',
+        'urn:iso:std:iso:20022:tech:xsd:pacs.004.001.08',
+        'urn:iso:std:iso:20022:tech:xsd:pacs.004.001.07'
+    ],
+    'pacs008': [
+        'urn:iso:std:iso:20022:tech:xsd:pacs.008.001.12',
+        'urn:iso:std:iso:20022:tech:xsd:pacs.008.001.08',
+        'urn:iso:std:iso:20022:tech:xsd:pacs.008.001.07'
+    ],
+}
+PACS_DEFAULT_NS = {
+    'pacs004': 'urn:iso:std:iso:20022:tech:xsd:pacs.004.001.08',
+    'pacs008': 'urn:iso:std:iso:20022:tech:xsd:pacs.008.001.08',
+}
+
+# Preview fields by local tag name: (field, required parents nearest first, field
+# whose first element must enclose this one). Every field keeps its first match
+# in document order, per namespace.
+PACS_PREVIEW_FIELDS: Dict[str, Dict[str, tuple]] = {
+    'pacs004': {
+        'MsgId': (('msg_id', (), None),),
+        'RtrId': (('rtr_id', (), None),),
+        'Cd': (('cd', (), None),),
+        'OrgnlUETR': (('uetr', (), None),),
+        'OrgnlTxId': (('tx_id', (), None),),
+        'OrgnlEndToEndId': (('e2e', (), None),),
+        'RtrdIntrBkSttlmAmt': (('rtr_amt', (), None),),
+        'Amt': (('amt', (), None),),
+        'Dbtr': (('debtor', ('OrgnlTxRef',), None),),
+        'Nm': (('debtor_name', (), 'debtor'),),
+        'IBAN': (('debtor_iban', ('Id', 'DbtrAcct', 'OrgnlTxRef'), None),),
+        'Id': (('debtor_org_id', ('Othr', 'OrgId', 'Id', 'Dbtr', 'OrgnlTxRef'), None),),
+    },
+    'pacs008': {
+        'MsgId': (('msg_id', (), None),),
+        'TxId': (('tx_id', (), None), ('pmt_tx_id', ('PmtId',), None)),
+        'UETR': (('uetr', ('PmtId',), None),),
+        'EndToEndId': (('e2e', ('PmtId',), None),),
+        'IntrBkSttlmAmt': (('amt', (), None),),
+        'Dbtr': (('debtor', (), None),),
+        'Cdtr': (('creditor', (), None),),
+        'Nm': (('debtor_name', (), 'debtor'), ('creditor_name', (), 'creditor')),
+        'Id': (('debtor_id', (), 'debtor'), ('creditor_id', (), 'creditor')),
+    },
+}
+
+# Matches ElementTree's defaults for the preview: comments and processing
+# instructions are dropped, whitespace text is kept, entities are not fetched
+PACS_PREVIEW_PARSER = etree.XMLParser(
+    remove_comments=True, remove_pis=True, resolve_entities=False, no_network=True, collect_ids=False)
+
+
+def _has_parents(elem, ns: str, parents: tuple) -> bool:
+    """Whether the element's nearest ancestors have the given local names in namespace ``ns``."""
+    for name in parents:
+        elem = elem.getparent()
+        if elem is None or elem.tag != f'{ns}}}{name}':
+            return False
+    return True
+
+
+def _encloses(scope, elem) -> bool:
+    """Whether ``scope`` is an ancestor of ``elem``."""
+    for ancestor in elem.iterancestors():
+        if ancestor is scope:
+            return True
+    return False
+
+
+def _collect_preview_elements(root, fields: Dict[str, tuple]) -> Dict[str, Dict[str, Any]]:
+    """
+    Walk the document once and keep the first element of every preview field.
+
+    Args:
+        root: Parsed message root
+        fields: Entry of PACS_PREVIEW_FIELDS for the message type
+
+    Returns:
+        Dict of '{namespace' -> field -> element
+    """
+    found: Dict[str, Dict[str, Any]] = {}
+    for elem in root.iter(etree.Element):
+        ns, _, local = elem.tag.rpartition('}')
+        specs = fields.get(local)
+        if specs is None:
+            continue
+        ns_found = found.setdefault(ns, {})
+        for field, parents, scope in specs:
+            if field in ns_found:
+                continue
+            if parents and not _has_parents(elem, ns, parents):
+                continue
+            if scope is not None:
+                scope_elem = ns_found.get(scope)
+                if scope_elem is None or not _encloses(scope_elem, elem):
+                    continue
+            ns_found[field] = elem
+    return found
+
+
+def parse_pacs_xml(xml_content: str | bytes, message_type: str):
     """Parse PACS XML and extract relevant information."""
     try:
-        root = ET.fromstring(xml_content)
-
-        # Common namespace handling - try multiple namespace versions
-        if message_type == 'pacs004':
-            # Try different PACS004 namespace versions
-            ns_versions = [
-                'urn:iso:std:iso:20022:tech:xsd:pacs.004.001.09',
-                'urn:iso:std:iso:20022:tech:xsd:pacs.004.001.08',
-                'urn:iso:std:iso:20022:tech:xsd:pacs.004.001.07'
-            ]
-        else:
-            # Try different PACS008 namespace versions
-            ns_versions = [
-                'urn:iso:std:iso:20022:tech:xsd:pacs.008.001.12',
-                'urn:iso:std:iso:20022:tech:xsd:pacs.008.001.08',
-                'urn:iso:std:iso:20022:tech:xsd:pacs.008.001.07'
-            ]
-
-        # Find working namespace by trying to find a common element
-        namespaces = None
-        for ns_version in ns_versions:
-            test_ns = {'ns': ns_version}
-            test_elem = root.find(
-                './/ns:MsgId', test_ns) if message_type == 'pacs004' else root.find('.//ns:MsgId', test_ns)
-            if test_elem is not None:
-                namespaces = test_ns
-                break
-
-        # Fallback to default if no namespace found
-        if namespaces is None:
-            namespaces = {
-                'ns': 'urn:iso:std:iso:20022:tech:xsd:pacs.004.001.08' if message_type == 'pacs004' else 'urn:iso:std:iso:20022:tech:xsd:pacs.008.001.08'
-            }
+        if isinstance(xml_content, str):
+            xml_content = xml_content.encode('utf-8')
+        root = etree.fromstring(xml_content, PACS_PREVIEW_PARSER)
+
+        # One pass over the document, then pick the working namespace: the first
+        # version with a MsgId, otherwise the default
+        found = _collect_preview_elements(root, PACS_PREVIEW_FIELDS.get(message_type, {}))
+        versions = PACS_NS_VERSIONS.get(message_type, PACS_NS_VERSIONS['pacs008'])
+        default_ns = PACS_DEFAULT_NS.get(message_type, PACS_DEFAULT_NS['pacs008'])
+        elems = next((found['{' + ns_version] for ns_version in versions
+                      if 'msg_id' in found.get('{' + ns_version, ())),
+                     found.get('{' + default_ns, {}))
 
         data = {}
 
         if message_type == 'pacs004':
             # Parse PACS.004 (Payment Return)
-            data['message_id'] = root.find(
-                './/ns:MsgId', namespaces).text if root.find('.//ns:MsgId', namespaces) is not None else None
-            data['transaction_id'] = root.find(
-                './/ns:RtrId', namespaces).text if root.find('.//ns:RtrId', namespaces) is not None else None
-            data['return_reason'] = root.find(
-                './/ns:Cd', namespaces).text if root.find('.//ns:Cd', namespaces) is not None else None
+            msg_id_elem = elems.get('msg_id')
+            data['message_id'] = msg_id_elem.text if msg_id_elem is not None else None
+            rtr_id_elem = elems.get('rtr_id')
+            data['transaction_id'] = rtr_id_elem.text if rtr_id_elem is not None else None
+            cd_elem = elems.get('cd')
+            data['return_reason'] = cd_elem.text if cd_elem is not None else None
 
             # Extract UETR and E2E ID from original transaction reference
-            uetr_elem = root.find('.//ns:OrgnlUETR', namespaces)
+            uetr_elem = elems.get('uetr')
             data['uetr'] = uetr_elem.text if uetr_elem is not None and uetr_elem.text else None
             if not data['uetr']:
                 # Fallback to OrgnlTxId if UETR not found
-                txid_elem = root.find('.//ns:OrgnlTxId', namespaces)
+                txid_elem = elems.get('tx_id')
                 data['uetr'] = txid_elem.text if txid_elem is not None and txid_elem.text else None
 
-            e2e_elem = root.find('.//ns:OrgnlEndToEndId', namespaces)
+            e2e_elem = elems.get('e2e')
             data['e2e'] = e2e_elem.text if e2e_elem is not None and e2e_elem.text else None
 
             # Amount and currency - PACS.004 uses RtrdIntrBkSttlmAmt
-            amt_elem = root.find('.//ns:RtrdIntrBkSttlmAmt', namespaces)
+            amt_elem = elems.get('rtr_amt')
+            if amt_elem is None:
+                # Fallback to original transaction amount
+                amt_elem = elems.get('amt')
             if amt_elem is not None:
                 data['amount'] = amt_elem.text
                 data['currency'] = amt_elem.get('Ccy', 'USD')
-            else:
-                # Fallback to original transaction amount
-                amt_elem = root.find('.//ns:Amt', namespaces)
-                if amt_elem is not None:
-                    data['amount'] = amt_elem.text
-                    data['currency'] = amt_elem.get('Ccy', 'USD')
 
             # Customer information from original transaction reference
-            debtor_elem = root.find('.//ns:OrgnlTxRef/ns:Dbtr', namespaces)
-            if debtor_elem is not None:
-                data['debtor_name'] = debtor_elem.find(
-                    './/ns:Nm', namespaces).text if debtor_elem.find('.//ns:Nm', namespaces) is not None else None
+            if 'debtor' in elems:
+                name_elem = elems.get('debtor_name')
+                data['debtor_name'] = name_elem.text if name_elem is not None else None
                 # Get account from DbtrAcct
-                acct_elem = root.find(
-                    './/ns:OrgnlTxRef/ns:DbtrAcct/ns:Id/ns:IBAN', namespaces)
+                acct_elem = elems.get('debtor_iban')
+                if acct_elem is None:
+                    # Fallback to other ID types
+                    acct_elem = elems.get('debtor_org_id')
                 if acct_elem is not None:
                     data['debtor_account'] = acct_elem.text
-                else:
-                    # Fallback to other ID types
-                    id_elem = root.find(
-                        './/ns:OrgnlTxRef/ns:Dbtr/ns:Id/ns:OrgId/ns:Othr/ns:Id', namespaces)
-                    if id_elem is not None:
-                        data['debtor_account'] = id_elem.text
 
         elif message_type == 'pacs008':
             # Parse PACS.008 (FI to FI Customer Credit Transfer)
-            data['message_id'] = root.find(
-                './/ns:MsgId', namespaces).text if root.find('.//ns:MsgId', namespaces) is not None else None
-            data['transaction_id'] = root.find(
-                './/ns:TxId', namespaces).text if root.find('.//ns:TxId', namespaces) is not None else None
+            msg_id_elem = elems.get('msg_id')
+            data['message_id'] = msg_id_elem.text if msg_id_elem is not None else None
+            tx_id_elem = elems.get('tx_id')
+            data['transaction_id'] = tx_id_elem.text if tx_id_elem is not None else None
 
             # Extract UETR and E2E ID from PmtId
-            uetr_elem = root.find('.//ns:PmtId/ns:UETR', namespaces)
+            uetr_elem = elems.get('uetr')
             data['uetr'] = uetr_elem.text if uetr_elem is not None and uetr_elem.text else None
             if not data['uetr']:
                 # Fallback to TxId if UETR not found
-                txid_elem = root.find('.//ns:PmtId/ns:TxId', namespaces)
+                txid_elem = elems.get('pmt_tx_id')
                 data['uetr'] = txid_elem.text if txid_elem is not None and txid_elem.text else None
 
-            e2e_elem = root.find('.//ns:PmtId/ns:EndToEndId', namespaces)
+            e2e_elem = elems.get('e2e')
             data['e2e'] = e2e_elem.text if e2e_elem is not None and e2e_elem.text else None
 
             # Amount and currency
-            amt_elem = root.find('.//ns:IntrBkSttlmAmt', namespaces)
+            amt_elem = elems.get('amt')
             if amt_elem is not None:
                 data['amount'] = amt_elem.text
                 data['currency'] = amt_elem.get('Ccy', 'USD')
 
             # Customer information
-            debtor_elem = root.find('.//ns:Dbtr', namespaces)
-            if debtor_elem is not None:
-                data['debtor_name'] = debtor_elem.find(
-                    './/ns:Nm', namespaces).text if debtor_elem.find('.//ns:Nm', namespaces) is not None else None
-                data['debtor_account'] = debtor_elem.find(
-                    './/ns:Id', namespaces).text if debtor_elem.find('.//ns:Id', namespaces) is not None else None
-
-            creditor_elem = root.find('.//ns:Cdtr', namespaces)
-            if creditor_elem is not None:
-                data['creditor_name'] = creditor_elem.find(
-                    './/ns:Nm', namespaces).text if creditor_elem.find('.//ns:Nm', namespaces) is not None else None
-                data['creditor_account'] = creditor_elem.find(
-                    './/ns:Id', namespaces).text if creditor_elem.find('.//ns:Id', namespaces) is not None else None
+            if 'debtor' in elems:
+                name_elem = elems.get('debtor_name')
+                data['debtor_name'] = name_elem.text if name_elem is not None else None
+                id_elem = elems.get('debtor_id')
+                data['debtor_account'] = id_elem.text if id_elem is not None else None
+
+            if 'creditor' in elems:
+                name_elem = elems.get('creditor_name')
+                data['creditor_name'] = name_elem.text if name_elem is not None else None
+                id_elem = elems.get('creditor_id')
+                data['creditor_account'] = id_elem.text if id_elem is not None else None
 
         return data
 
-    except ET.ParseError as e:
+    except etree.XMLSyntaxError as e:
         print(f"XML parsing error: {e}")
         return {}
     except Exception as e:
@@ -222,6 +370,62 @@ def get_transaction_reference(pacs004_data: dict, pacs008_data: dict):
     return transaction_ref if transaction_ref else None
 
 
+# Duplicate-check index over CASES_DIR, rebuilt when the directory changes behind
+# save_case (deletes, external writers). Entries are keyed by case file stem;
+# by_id and by_ref map a case ID / lower-cased transaction reference to the
+# first case file carrying it, in directory order.
+_CASE_INDEX_LOCK = threading.Lock()
+_CASE_INDEX: Dict[str, Any] = {'mtime_ns': None, 'files': {}, 'by_id': {}, 'by_ref': {}}
+
+
+def _case_index_entry(case_data: dict) -> Dict[str, Any]:
+    """Fields of a saved case needed by the duplicate check."""
+    transaction_ref = get_transaction_reference(
+        case_data.get('pacs004_data', {}), case_data.get('pacs008_data', {}))
+    return {
+        'case_id': case_data.get('case_id', ''),
+        'ref': transaction_ref.strip().lower() if transaction_ref else None,
+        'status': case_data.get('status'),
+        'created_at': case_data.get('created_at'),
+    }
+
+
+def _add_to_case_index(stem: str, entry: Dict[str, Any]) -> None:
+    _CASE_INDEX['files'][stem] = entry
+    _CASE_INDEX['by_id'].setdefault(entry['case_id'], stem)
+    if entry['ref']:
+        _CASE_INDEX['by_ref'].setdefault(entry['ref'], stem)
+
+
+def _refresh_case_index() -> None:
+    """Rebuild the case index if CASES_DIR changed since it was last read. Caller holds the lock."""
+    mtime_ns = CASES_DIR.stat().st_mtime_ns
+    if mtime_ns == _CASE_INDEX['mtime_ns']:
+        return
+    _CASE_INDEX.update(mtime_ns=mtime_ns, files={}, by_id={}, by_ref={})
+    for case_file in CASES_DIR.glob("*.json"):
+        try:
+            _add_to_case_index(case_file.stem, _case_index_entry(
+                load_run_report(case_file.read_bytes())))
+        except Exception as e:
+            print(f"Error checking case file {case_file}: {e}")
+            continue
+
+
+def _record_saved_case(stem: str, case_data: dict) -> None:
+    """Update the case index after save_case wrote a case file."""
+    with _CASE_INDEX_LOCK:
+        if _CASE_INDEX['mtime_ns'] is None:
+            return  # not built yet; the first lookup reads the directory
+        entry = _case_index_entry(case_data)
+        previous = _CASE_INDEX['files'].get(stem)
+        if previous is not None and (previous['case_id'], previous['ref']) != (entry['case_id'], entry['ref']):
+            _CASE_INDEX['mtime_ns'] = None  # keys moved; rebuild on next lookup
+            return
+        _add_to_case_index(stem, entry)
+        _CASE_INDEX['mtime_ns'] = CASES_DIR.stat().st_mtime_ns
+
+
 def check_for_duplicate_case(pacs004_data: dict, pacs008_data: dict, case_id: str = None):
     """Check if a case already exists based on transaction reference or case ID."""
     # Get transaction reference from PACS data
@@ -240,51 +444,30 @@ def check_for_duplicate_case(pacs004_data: dict, pacs008_data: dict, case_id: st
         print(f"DEBUG: No transaction reference or case ID found, skipping duplicate check")
         return {'is_duplicate': False}
 
-    # Check all existing case files
-    for case_file in CASES_DIR.glob("*.json"):
-        try:
-            with open(case_file, 'r', encoding='utf-8') as f:
-                case_data = json.load(f)
-
-            existing_case_id = case_data.get('case_id', '')
-
-            # Check if case ID already exists
-            if case_id and existing_case_id == case_id:
-                return {
-                    'is_duplicate': True,
-                    'reason': 'case_id',
-                    'existing_case_id': existing_case_id,
-                    'existing_status': case_data.get('status'),
-                    'existing_created_at': case_data.get('created_at')
-                }
-
-            # Check if transaction reference already exists
-            if transaction_ref:
-                existing_pacs004 = case_data.get('pacs004_data', {})
-                existing_pacs008 = case_data.get('pacs008_data', {})
-                existing_transaction_ref = get_transaction_reference(
-                    existing_pacs004, existing_pacs008)
-
-                print(
-                    f"DEBUG comparing - existing_ref: {repr(existing_transaction_ref)}, new_ref: {repr(transaction_ref)}")
-
-                # Normalize both references for comparison (strip whitespace, case-insensitive)
-                if existing_transaction_ref and transaction_ref:
-                    if existing_transaction_ref.strip().lower() == transaction_ref.strip().lower():
-                        print(
-                            f"DEBUG: DUPLICATE FOUND - transaction reference matches: {transaction_ref}")
-                        return {
-                            'is_duplicate': True,
-                            'reason': 'transaction_ref',
-                            'existing_case_id': existing_case_id,
-                            'existing_status': case_data.get('status'),
-                            'existing_created_at': case_data.get('created_at')
-                        }
-        except Exception as e:
-            print(f"Error checking case file {case_file}: {e}")
-            continue
-
-    return {'is_duplicate': False}
+    with _CASE_INDEX_LOCK:
+        _refresh_case_index()
+
+        # Check if case ID already exists, then if the transaction reference does
+        # (normalized: whitespace stripped, case-insensitive)
+        reason, stem = None, None
+        if case_id:
+            reason, stem = 'case_id', _CASE_INDEX['by_id'].get(case_id)
+        if stem is None and transaction_ref:
+            reason, stem = 'transaction_ref', _CASE_INDEX['by_ref'].get(transaction_ref.strip().lower())
+        if stem is None:
+            return {'is_duplicate': False}
+        entry = _CASE_INDEX['files'][stem]
+
+    if reason == 'transaction_ref':
+        print(
+            f"DEBUG: DUPLICATE FOUND - transaction reference matches: {transaction_ref}")
+    return {
+        'is_duplicate': True,
+        'reason': reason,
+        'existing_case_id': entry['case_id'],
+        'existing_status': entry['status'],
+        'existing_created_at': entry['created_at']
+    }
 
 
 def generate_case_id(pacs004_data: dict, pacs008_data: dict):
@@ -415,11 +598,11 @@ def save_case(case_data: dict):
 
     try:
         # Write to temporary file first to avoid corruption
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            json.dump(case_data, f, indent=2, ensure_ascii=False, default=str)
+        temp_file.write_bytes(dump_run_report(case_data))
 
         # Atomic move to final location
         temp_file.replace(case_file)
+        _record_saved_case(case_file.stem, case_data)
     except Exception as e:
         print(f"Error saving case {case_data['case_id']}: {e}")
         # Clean up temp file if it exists
@@ -435,8 +618,7 @@ def load_case(case_id: str):
     """Load case data from file."""
     case_file = CASES_DIR / f"{case_id}.json"
     if case_file.exists():
-        with open(case_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return load_run_report(case_file.read_bytes())
     return None
 
 
@@ -445,9 +627,7 @@ def list_cases():
     cases = []
     for case_file in CASES_DIR.glob("*.json"):
         try:
-            with open(case_file, 'r', encoding='utf-8') as f:
-                case_data = json.load(f)
-                cases.append(case_data)
+            cases.append(load_run_report(case_file.read_bytes()))
         except Exception as e:
             print(f"Error loading case {case_file}: {e}")
             continue
@@ -486,10 +666,8 @@ def run_flow():
             print(f"DEBUG: Loading case files: {p4_filename}, {p8_filename}")
 
             try:
-                with open(os.path.join("samples", p4_filename), "r", encoding="utf-8") as f:
-                    p4_text = f.read()
-                with open(os.path.join("samples", p8_filename), "r", encoding="utf-8") as f:
-                    p8_text = f.read()
+                p4_text = load_sample(p4_filename)
+                p8_text = load_sample(p8_filename)
                 print(f"DEBUG: Successfully loaded case files for {case_id}")
             except FileNotFoundError as e:
                 print(f"DEBUG: Case files not found: {e}")
@@ -497,10 +675,8 @@ def run_flow():
         else:
             # Fallback to default files if no case_id or invalid case_id
             print("DEBUG: Using default sample files")
-            with open(os.path.join("samples", "pacs004_matched.xml"), "r", encoding="utf-8") as f:
-                p4_text = f.read()
-            with open(os.path.join("samples", "pacs008_matched.xml"), "r", encoding="utf-8") as f:
-                p8_text = f.read()
+            p4_text = load_sample("pacs004_matched.xml")
+            p8_text = load_sample("pacs008_matched.xml")
             case_id = "DEFAULT"
 
         print(
@@ -575,15 +751,14 @@ def api_list_reports():
     reports = []
     for file_path in REPORTS_DIR.glob("*.json"):
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                reports.append({
-                    "run_id": file_path.stem,
-                    "timestamp": data.get("timestamp", ""),
-                    "transaction_id": data.get("transaction_id", ""),
-                    "can_process": data.get("summary", {}).get("can_process", False),
-                    "reason": data.get("summary", {}).get("reason", "")
-                })
+            data = load_run_report(file_path.read_bytes())
+            reports.append({
+                "run_id": file_path.stem,
+                "timestamp": data.get("timestamp", ""),
+                "transaction_id": data.get("transaction_id", ""),
+                "can_process": data.get("summary", {}).get("can_process", False),
+                "reason": data.get("summary", {}).get("reason", "")
+            })
         except Exception:
             continue
 
@@ -1135,11 +1310,8 @@ def api_list_pacs_pairs():
 
                 # Try to extract some metadata
                 try:
-                    pacs004_content = pacs004_file.read_text(encoding='utf-8')
-                    pacs004_data = parse_pacs_xml(pacs004_content, 'pacs004')
-
-                    pacs008_content = pacs008_file.read_text(encoding='utf-8')
-                    pacs008_data = parse_pacs_xml(pacs008_content, 'pacs008')
+                    pacs004_data = parse_pacs_xml(pacs004_file.read_bytes(), 'pacs004')
+                    pacs008_data = parse_pacs_xml(pacs008_file.read_bytes(), 'pacs008')
 
                     pairs.append({
                         "id": f"{pacs004_file.name}_{pacs008_file.name}",
@@ -1474,9 +1646,7 @@ def api_get_report_by_identifier(identifier: str):
                     # Save the updated report
                     try:
                         report_file = REPORTS_DIR / f"{run_id}.json"
-                        with open(report_file, 'w', encoding='utf-8') as f:
-                            json.dump(report_data, f, indent=2,
-                                      ensure_ascii=False, default=str)
+                        report_file.write_bytes(dump_run_report(report_data))
                         print(
                             f"DEBUG: Auto-generated and saved email for run_id {run_id}")
                     except Exception as save_error:
@@ -1584,4 +1754,7 @@ def regenerate_email():
 
 
 if __name__ == "__main__":
+    # Configure Gemini up front so its connection is warm before the first email request
+    from app.utils.gemini_email import initialize_gemini
+    initialize_gemini()
     app.run(host="0.0.0.0", port=5000, debug=True)
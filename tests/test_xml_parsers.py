@@ -0,0 +1,253 @@
+"""
+Parity tests for the pacs.008 / pacs.004 parsers against the sample messages.
+
+The tree walk (generated extractors), the streaming parse (_FieldTarget) and
+the result cache (_PARSE_CACHE) must all return what the plain XPath lookups
+below return, for every sample and every supported namespace version.
+"""
+
+import glob
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+import pytest
+from lxml import etree
+
+from app.utils import xml_parsers
+from app.utils.xml_parsers import NS_004_VERSIONS, NS_008_VERSIONS
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "samples")
+SAMPLE_FILES = sorted(glob.glob(os.path.join(SAMPLES_DIR, "*.xml"))
+                      + glob.glob(os.path.join(SAMPLES_DIR, ".samps", "*.xml")))
+
+_XMLNS = re.compile(rb'xmlns="(urn:iso:std:iso:20022:tech:xsd:pacs\.00[48]\.001\.\d+)"')
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _namespace(xml: bytes) -> str:
+    match = _XMLNS.search(xml)
+    assert match, "sample has no pacs Document namespace"
+    return match.group(1).decode("ascii")
+
+
+def _with_namespace(xml: bytes, ns_version: str) -> bytes:
+    return _XMLNS.sub(b'xmlns="' + ns_version.encode("ascii") + b'"', xml, count=1)
+
+
+def _padded(xml: bytes) -> bytes:
+    """The message followed by a comment that takes it past the streaming threshold."""
+    return xml + b"<!--" + b"x" * xml_parsers.STREAMING_PARSE_MIN_BYTES + b"-->"
+
+
+# --- XPath reference ------------------------------------------------------
+
+def _xpath_text(node: etree._Element, xpath: str, ns: Dict[str, str]) -> Optional[str]:
+    found = node.xpath(xpath, namespaces=ns)
+    if not found:
+        return None
+    text = found[0].text
+    return text.strip() if text else None
+
+
+def _first_text(node: etree._Element, xpaths: List[str], ns: Dict[str, str]) -> Optional[str]:
+    for xpath in xpaths:
+        text = _xpath_text(node, xpath, ns)
+        if text:
+            return text
+    return None
+
+
+def _reference_pacs008(xml: bytes) -> Dict[str, Any]:
+    ns = {"ns": _namespace(xml)}
+    tx = etree.fromstring(xml).xpath(".//ns:CdtTrfTxInf", namespaces=ns)[0]
+    amount = tx.xpath(".//ns:IntrBkSttlmAmt", namespaces=ns)
+    amount_el = amount[0] if amount else None
+    return {
+        "e2e": _xpath_text(tx, ".//ns:PmtId/ns:EndToEndId", ns),
+        "uetr": _first_text(tx, [".//ns:PmtId/ns:UETR", ".//ns:PmtId/ns:TxId"], ns),
+        "dbtr_name": _xpath_text(tx, ".//ns:Dbtr/ns:Nm", ns),
+        "dbtr_iban": _first_text(tx, [".//ns:DbtrAcct/ns:Id/ns:IBAN",
+                                      ".//ns:Dbtr/ns:Id/ns:OrgId/ns:Othr/ns:Id",
+                                      ".//ns:Dbtr/ns:Id/ns:Othr/ns:Id"], ns),
+        "ccy": amount_el.get("Ccy") if amount_el is not None else None,
+        "amount": float(amount_el.text) if amount_el is not None and amount_el.text else None,
+    }
+
+
+def _reference_pacs004(xml: bytes) -> Dict[str, Any]:
+    ns = {"ns": _namespace(xml)}
+    tx = etree.fromstring(xml).xpath(".//ns:TxInf", namespaces=ns)[0]
+    amount = tx.xpath(".//ns:RtrdIntrBkSttlmAmt", namespaces=ns)
+    amount_el = amount[0] if amount else None
+    return {
+        "e2e": _xpath_text(tx, "./ns:OrgnlEndToEndId", ns),
+        "uetr": _first_text(tx, ["./ns:OrgnlUETR", "./ns:OrgnlTxId"], ns),
+        "cdtr_name": _xpath_text(tx, ".//ns:Cdtr//ns:Nm", ns),
+        "cdtr_iban": _first_text(tx, [".//ns:CdtrAcct/ns:Id/ns:IBAN",
+                                      ".//ns:Cdtr/ns:Id/ns:OrgId/ns:Othr/ns:Id",
+                                      ".//ns:Cdtr/ns:Id/ns:Othr/ns:Id"], ns),
+        "dbtr_iban": _first_text(tx, [".//ns:DbtrAcct/ns:Id/ns:IBAN",
+                                      ".//ns:Dbtr/ns:Id/ns:OrgId/ns:Othr/ns:Id",
+                                      ".//ns:Dbtr/ns:Id/ns:Othr/ns:Id"], ns),
+        "rtr_ccy": amount_el.get("Ccy") if amount_el is not None else None,
+        "rtr_amount": float(amount_el.text) if amount_el is not None and amount_el.text else None,
+        "rsn": _xpath_text(tx, ".//ns:RtrRsnInf/ns:Rsn/ns:Cd", ns),
+        "rsn_info": _xpath_text(tx, ".//ns:RtrRsnInf/ns:AddtlInf", ns),
+    }
+
+
+# --- Test cases -----------------------------------------------------------
+
+# (sample path, message bytes, parser, uncached parser, XPath reference)
+CASES = []
+for _path in SAMPLE_FILES:
+    _xml = _read(_path)
+    if "pacs.008" in _namespace(_xml):
+        CASES.append((_path, _xml, xml_parsers.parse_pacs008, xml_parsers._parse_pacs008, _reference_pacs008))
+    else:
+        CASES.append((_path, _xml, xml_parsers.parse_pacs004, xml_parsers._parse_pacs004, _reference_pacs004))
+
+CASE_IDS = [os.path.relpath(case[0], SAMPLES_DIR) for case in CASES]
+
+
+def _namespace_cases():
+    params = []
+    for case, case_id in zip(CASES, CASE_IDS):
+        versions = NS_008_VERSIONS if "pacs.008" in _namespace(case[1]) else NS_004_VERSIONS
+        for ns_version in versions:
+            params.append(pytest.param(case, ns_version, id=f"{case_id}-{ns_version.rsplit(':', 1)[1]}"))
+    return params
+
+
+@pytest.fixture(autouse=True)
+def _empty_parse_cache():
+    xml_parsers._PARSE_CACHE.clear()
+    yield
+    xml_parsers._PARSE_CACHE.clear()
+
+
+@pytest.fixture
+def no_tree_parse(monkeypatch):
+    """Fail the test if a message is parsed into a tree instead of streamed."""
+    def fail(xml):
+        raise AssertionError("message was parsed into a tree")
+    monkeypatch.setattr(xml_parsers, "_parse_document", fail)
+
+
+def test_samples_found():
+    assert len(CASES) >= 2
+
+
+@pytest.mark.parametrize("case", CASES, ids=CASE_IDS)
+def test_tree_parse_matches_reference(case):
+    _, xml, _, parse, reference = case
+    assert len(xml) < xml_parsers.STREAMING_PARSE_MIN_BYTES
+    assert parse(xml) == reference(xml)
+    assert parse(xml.decode("utf-8")) == reference(xml)
+
+
+@pytest.mark.parametrize("case", CASES, ids=CASE_IDS)
+def test_streaming_parse_matches_reference(case, no_tree_parse):
+    _, xml, _, parse, reference = case
+    padded = _padded(xml)
+    assert len(padded) >= xml_parsers.STREAMING_PARSE_MIN_BYTES
+    assert parse(padded) == reference(xml)
+
+
+@pytest.mark.parametrize("case, ns_version", _namespace_cases())
+def test_each_namespace_version_matches_reference(case, ns_version):
+    _, xml, _, parse, reference = case
+    xml = _with_namespace(xml, ns_version)
+    expected = reference(xml)
+    assert parse(xml) == expected
+    assert parse(_padded(xml)) == expected
+
+
+# Rewrites of a sample that exercise first-match-wins and split element text
+VARIANTS = {
+    "cdata_text": lambda xml: re.sub(rb"<(Nm|IBAN)>([^<]{2})", rb"<\1>\2<![CDATA[]]>", xml),
+    "entity_text": lambda xml: xml.replace(b"<Nm>", b"<Nm>&#65;"),
+    "duplicate_ids": lambda xml: re.sub(rb"(<PmtId>|<TxInf>)", rb"\1<EndToEndId>DUP</EndToEndId>"
+                                        rb"<OrgnlEndToEndId>DUP</OrgnlEndToEndId>", xml, count=1),
+    "duplicate_amount": lambda xml: re.sub(rb"(<(?:Rtrd)?IntrBkSttlmAmt[^>]*>[^<]*</(?:Rtrd)?IntrBkSttlmAmt>)",
+                                           rb"\1\1", xml, count=1),
+    "nested_party_name": lambda xml: xml.replace(b"<Cdtr>", b"<Cdtr><Agt><Nm>Agent</Nm></Agt>"),
+    "party_in_return_chain": lambda xml: xml.replace(
+        b"<TxInf>", b"<TxInf><RtrChain><Cdtr><Pty><Nm>Chain</Nm></Pty></Cdtr>"
+                    b"<CdtrAcct><Id><IBAN>CHAIN1</IBAN></Id></CdtrAcct></RtrChain>"),
+    "empty_iban": lambda xml: re.sub(rb"<IBAN>[^<]*</IBAN>", b"<IBAN></IBAN>", xml),
+    "no_uetr": lambda xml: re.sub(rb"<(Orgnl)?UETR>[^<]*</(Orgnl)?UETR>", b"", xml),
+}
+
+
+def _variant_cases():
+    params = []
+    for case, case_id in zip(CASES, CASE_IDS):
+        for name, rewrite in VARIANTS.items():
+            params.append(pytest.param(case, rewrite, id=f"{case_id}-{name}"))
+    return params
+
+
+@pytest.mark.parametrize("case, rewrite", _variant_cases())
+def test_variants_match_reference(case, rewrite):
+    _, xml, _, parse, reference = case
+    xml = rewrite(xml)
+    expected = reference(xml)
+    assert parse(xml) == expected
+    assert parse(_padded(xml)) == expected
+
+
+def test_unknown_namespace_has_no_fields():
+    xml = _with_namespace(_read(SAMPLE_FILES[0]), "urn:iso:std:iso:20022:tech:xsd:pacs.008.001.99")
+    for parse in (xml_parsers._parse_pacs008, xml_parsers._parse_pacs004):
+        for message in (xml, _padded(xml)):
+            assert all(value is None for value in parse(message).values())
+
+
+def test_wrapped_document_falls_back_to_tree_parse():
+    # A Document inside an envelope is not streamed; the tree probe still finds it
+    for _, xml, _, parse, reference in CASES:
+        body = re.sub(rb"<\?xml[^>]*\?>", b"", xml)
+        wrapped = b'<Envelope xmlns="urn:x"><AppHdr/>' + body + b"</Envelope>"
+        assert parse(_padded(wrapped)) == reference(xml)
+
+
+@pytest.mark.parametrize("case", CASES, ids=CASE_IDS)
+def test_cached_parse_matches_uncached(case):
+    _, xml, cached_parse, parse, _ = case
+    expected = parse(xml)
+
+    first = cached_parse(xml)
+    assert first == expected
+    assert len(xml_parsers._PARSE_CACHE) == 1
+
+    # Text and bytes of the same message share one entry
+    second = cached_parse(xml.decode("utf-8"))
+    assert second == expected
+    assert len(xml_parsers._PARSE_CACHE) == 1
+
+    # Callers get their own copy, so changing one does not leak into the cache
+    first["uetr"] = "changed"
+    assert second["uetr"] == expected["uetr"]
+    assert cached_parse(xml) == expected
+
+
+def test_cache_keeps_message_types_apart():
+    xml = CASES[0][1]
+    xml_parsers.parse_pacs008(xml)
+    xml_parsers.parse_pacs004(xml)
+    assert len(xml_parsers._PARSE_CACHE) == 2
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(xml_parsers, "_PARSE_CACHE_MAX_ENTRIES", 3)
+    _, xml, parse, _, reference = CASES[0]
+    for index in range(5):
+        message = xml + b"<!--%d-->" % index
+        assert parse(message) == reference(xml)
+    assert len(xml_parsers._PARSE_CACHE) == 3